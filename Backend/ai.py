@@ -1,11 +1,30 @@
 import os
 import sys
+import re
 import json
 import shutil
+import asyncio
+import functools
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 import google.generativeai as genai
 import pandas as pd
 from dotenv import load_dotenv
-from thefuzz import process, fuzz 
+from order_store import OrderStore, clean_order_id, can_cancel, can_return
+from order_journal import OrderJournal
+from product_search import TrigramIndex
+from embedding_service import EmbeddingService
+from retrieval import HybridRetriever, load_bm25
+from langchain_core.documents import Document
+from sessions import SessionManager
+from context_budget import ContextBudget
+from tracing import tracer
+from resources import ResourceRegistry
+from startup import startup
+from tool_cache import ToolCache
+from semantic_cache import SemanticCache
+from intent_router import IntentRouter
+from index_store import load_index, INDEX_FILE, DOCS_FILE
 
 # --- 1. SETUP & IMPORTS ---
 try:
@@ -17,10 +36,13 @@ except ImportError:
 
 load_dotenv()
 
+# FAKE_LLM=1 swaps Gemini for the scripted local model in fake_llm.py (offline testing)
+USE_FAKE_LLM = os.getenv("FAKE_LLM") == "1"
+
 # API KEY
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY") or ""   #Get your own API key 
 
-if not GOOGLE_API_KEY:
+if not GOOGLE_API_KEY and not USE_FAKE_LLM:
     print("❌ Error: Key is missing.")
     sys.exit(1)
 
@@ -28,264 +50,359 @@ genai.configure(api_key=GOOGLE_API_KEY)
 
 # --- 2. AUTHENTICATION (SIMULATED) ---
 print("\n🔒 --- SECURITY LOGIN ---")
-CURRENT_USER_ID = "C0010"
-if not CURRENT_USER_ID:
-    CURRENT_USER_ID = "C0010" # Default for testing
-print(f"✅ Logged in as: {CURRENT_USER_ID}\n")
+CURRENT_USER_ID = "C0010" # Default customer for the CLI and callers without a customer_id
+DEFAULT_SESSION_ID = "default"
+print(f"✅ Default customer: {CURRENT_USER_ID}\n")
+
+# Privacy scope of the turn being processed (set per session in process_user_input)
+_current_user = contextvars.ContextVar("current_user", default=CURRENT_USER_ID)
+
+def current_user_id():
+    return _current_user.get()
 
 
 # --- 3. LOAD RESOURCES ---
-print("🔹 Loading Databases...")
-try:
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    datasets_dir = os.path.join(current_dir, "Database")
-    
-    cat_path = os.path.join(datasets_dir, "product_catalog.json")
-    original_ord_path = os.path.join(datasets_dir, "order_database.json")
-    copy_ord_path = os.path.join(datasets_dir, "order_database_copy.json")
-    
+# Nothing heavy runs at import: each resource is registered with the startup
+# orchestrator (startup.py). Eager ones load in parallel once startup.start() runs,
+# lazy ones on first use; tools fetch them with startup.get(), which waits if needed.
+current_dir = os.path.dirname(os.path.abspath(__file__))
+datasets_dir = os.path.join(current_dir, "Database")
+
+cat_path = os.path.join(datasets_dir, "product_catalog.json")
+original_ord_path = os.path.join(datasets_dir, "order_database.json")
+copy_ord_path = os.path.join(datasets_dir, "order_database_copy.json")
+index_path = os.path.join(current_dir, "faiss_index")
+prod_index_path = os.path.join(current_dir, "faiss_product_index")
+
+def load_orders():
     # Auto-Create Copy
     if os.path.exists(original_ord_path) and not os.path.exists(copy_ord_path):
         print(f"   Creating working copy: {copy_ord_path}")
         shutil.copy(original_ord_path, copy_ord_path)
     
     # Load Dataframes
-    products_df = pd.read_json(cat_path) if os.path.exists(cat_path) else pd.DataFrame()
     orders_df = pd.read_json(copy_ord_path) if os.path.exists(copy_ord_path) else pd.DataFrame()
+    if not orders_df.empty:
+        orders_df.columns = [c.lower().replace(" ", "_") for c in orders_df.columns]
 
+    # --- INDEX ORDERS (O(1) lookups by order_id / customer_id) ---
+    # Snapshot + write-ahead journal replay; mutations append to the journal
+    store = OrderStore(orders_df, journal=OrderJournal(copy_ord_path))
+    # Any status change drops the cached tool results that read that order
+    store.subscribe(lambda order_id, customer_id: tool_cache.invalidate(("order", order_id), ("customer", customer_id)))
+    return store
+
+def load_embeddings():
+    # Query embeddings go through an LRU cache + cross-session micro-batcher
+    return EmbeddingService(HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2"))
+
+def load_catalog():
+    """
+    Catalog + retrieval indexes: everything a catalog edit or a build-rag.py run changes.
+    Returned as one unit so the registry can hot-swap it (orders live in order_store instead).
+    """
+    embeddings = startup.get("embeddings")
+
+    products_df = pd.read_json(cat_path) if os.path.exists(cat_path) else pd.DataFrame()
     if not products_df.empty:
         products_df.columns = [c.lower().replace(" ", "_") for c in products_df.columns]
-    if not orders_df.empty:
-        orders_df.columns = [c.lower().replace(" ", "_") for c in orders_df.columns]
+        products_df = products_df.reset_index(drop=True)
 
-    # --- FLATTEN ORDERS FOR SEARCH ---
-    searchable_orders = pd.DataFrame()
-    if not orders_df.empty and 'products' in orders_df.columns:
-        searchable_orders = orders_df.explode('products')
-        searchable_orders['product_name'] = searchable_orders['products'].apply(lambda x: x.get('product_name') if isinstance(x, dict) else None)
-        print(f"   ✅ Flattened {len(orders_df)} orders into {len(searchable_orders)} searchable items.")
-    else:
-        print("   ⚠️ Warning: Could not flatten order products.")
+    # --- INDEX PRODUCT NAMES (trigram shortlist for fuzzy search) ---
+    product_index = TrigramIndex(products_df['product_name'].tolist() if not products_df.empty else [])
 
-    # Load AI Models
-    embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-    index_path = os.path.join(current_dir, "faiss_index")
-    vector_db = FAISS.load_local(index_path, embeddings, allow_dangerous_deserialization=True)
-    
-    prod_index_path = os.path.join(current_dir, "faiss_product_index")
+    # mmap'd vectors + lazily read docstore (no pickle)
+    vector_db = load_index(index_path, embeddings)
     if os.path.exists(prod_index_path):
-        product_vector_db = FAISS.load_local(prod_index_path, embeddings, allow_dangerous_deserialization=True)
+        product_vector_db = load_index(prod_index_path, embeddings)
         print("   ✅ Product Hybrid Index Loaded.")
     else:
         product_vector_db = None
 
-    print("✅ System Ready.")
-
-except Exception as e:
-    print(f"⚠️ Warning during load: {e}")
-    products_df = pd.DataFrame()
-    orders_df = pd.DataFrame()
-    searchable_orders = pd.DataFrame()
-
+    # --- HYBRID RETRIEVAL (BM25 + FAISS, fused with RRF) ---
+    return {
+        "products_df": products_df,
+        "product_index": product_index,
+        "policy_retriever": HybridRetriever(vector_db, load_bm25(index_path, vector_db)),
+        "product_retriever": HybridRetriever(
+            product_vector_db,
+            load_bm25(prod_index_path, product_vector_db) if product_vector_db is not None else None,
+            key=lambda doc: doc.metadata.get("product_name"),
+        ),
+    }
+
+def empty_catalog():
+    return {"products_df": pd.DataFrame(), "product_index": TrigramIndex([]), "policy_retriever": None, "product_retriever": None}
+
+# --- HOT RELOAD ---
+# A rebuilt index or edited catalog is picked up without a restart (Whisper and the
+# embedding model stay loaded). Each turn pins the snapshot it started on.
+catalog = ResourceRegistry(load_catalog, watch_paths=[cat_path] + [
+    os.path.join(d, f) for d in (index_path, prod_index_path) for f in (INDEX_FILE, DOCS_FILE, "bm25.json", "manifest.json")
+])
+_pinned_catalog = contextvars.ContextVar("pinned_catalog", default=None)
+
+# Seconds between file-watcher polls (0 disables; POST /reload still works)
+RESOURCE_WATCH_S = float(os.getenv("RESOURCE_WATCH_S", 2))
+
+def init_catalog():
+    """First snapshot, then the file watcher. If it fails, tools see an empty catalog."""
+    try:
+        catalog.reload()
+    except Exception:
+        catalog.publish(empty_catalog())
+        raise
+    finally:
+        if RESOURCE_WATCH_S > 0:
+            catalog.watch(RESOURCE_WATCH_S)
+    return catalog
+
+startup.register("orders", load_orders)
+startup.register("embeddings", load_embeddings)
+startup.register("catalog", init_catalog)
+# A later successful reload (watcher or POST /reload) clears a failed first load, so /ready recovers
+catalog.subscribe(lambda snapshot: startup.recover("catalog", catalog))
+
+# Stand-in while the order DB is unavailable (tools answer "Order DB unavailable.")
+EMPTY_ORDERS = OrderStore(pd.DataFrame())
+
+def orders():
+    return startup.get("orders", default=EMPTY_ORDERS)
+
+def live_catalog():
+    startup.get("catalog", default=None)
+    return catalog.current()
+
+def resources():
+    """Catalog snapshot of the current turn (the live one outside a turn)."""
+    return _pinned_catalog.get() or live_catalog()
+
+def reload_catalog():
+    return catalog.reload()
 
-# Assuming your chat object is named 'chat'
-def reset_session():
-    global chat
-    print("🧹 System: Purging chat history...")
-    # This restarts the chat session with an empty history
-    chat = model.start_chat(history=[], enable_automatic_function_calling=True)
 # --- 4. HELPER: SAVE TO DISK ---
+# Single-row mutations are persisted by order_store's journal (fsync'd append).
+# On shutdown the journal is folded into order_database_copy.json and closed.
 def save_to_disk():
+    """Compacts the order journal into the snapshot; True only if the snapshot was written."""
+    store = startup.peek("orders")
+    if store is None:
+        return True   # never loaded, nothing logged
     try:
-        orders_df.to_json(copy_ord_path, orient="records", indent=2)
-        return True
+        return store.flush()
     except Exception as e:
         print(f"❌ Error saving database: {e}")
         return False
 
+def shutdown():
+    """Server/CLI exit: final compaction, then close the journal. Returns save_to_disk()'s result."""
+    saved = save_to_disk()
+    store = startup.peek("orders")
+    if store is not None and store.journal is not None:
+        store.journal.close()
+    print("💾 Orders saved." if saved else "⚠️ Orders not compacted; the journal will be replayed on next start.")
+    return saved
+
 # --- 5. DEFINE TOOLS (WITH PRIVACY) ---
 
-def search_products(query: str):
-    """Searches product catalog using fuzzy matching (Public Data)."""
-    if products_df.empty: return "Catalog unavailable."
-    product_names = products_df['product_name'].tolist()
-    matches = process.extract(query, product_names, limit=3, scorer=fuzz.partial_ratio)
-    final_results = []
-    for match_name, score in matches:
-        if score >= 60:
-            row = products_df[products_df['product_name'] == match_name]
-            if not row.empty:
-                item = row.iloc[0].to_dict()
-                final_results.append(item)
-    if not final_results: return f"I couldn't find any products matching '{query}'."
-    return json.dumps(final_results)
+def _product_filter(res, category="", max_price=0.0, min_rating=0.0, in_stock_only=False):
+    """Structured filters on catalog columns; None when no filter is set."""
+    if not (category or max_price or min_rating or in_stock_only):
+        return None
+
+    def allow(doc):
+        pos = res.product_index.first_row.get(doc.metadata.get("product_name"))
+        if pos is None:
+            return False
+        row = res.products_df.iloc[pos]
+        if category and str(row['category']).lower() != category.lower(): return False
+        if max_price and row['price'] > max_price: return False
+        if min_rating and row['rating'] < min_rating: return False
+        if in_stock_only and row['stock_available'] <= 0: return False
+        return True
+    return allow
+
+def _rank_products(res, query, k=3, allow=None):
+    """Fuzzy-name lane + BM25 + vector lanes, fused. Returns catalog rows, best first."""
+    if res.products_df.empty or res.product_retriever is None: return []
+    fuzzy = [
+        Document(page_content=name, metadata={"product_name": name})
+        for name, score in res.product_index.search(query, limit=res.product_retriever.fetch_k) if score >= 60
+    ]
+    docs = res.product_retriever.search(query, k=k, allow=allow, extra_rankings=[fuzzy])
+    rows = [res.product_index.first_row.get(d.metadata.get("product_name")) for d in docs]
+    return [res.products_df.iloc[pos].to_dict() for pos in rows if pos is not None]
 
-def browse_catalog(description: str):
+def search_products(query: str, category: str = "", max_price: float = 0, min_rating: float = 0, in_stock_only: bool = False):
     """
-    Vector Search: Finds products in the catalog by meaning/description.
-    Useful for: "Show me red shoes", "Do you have any gaming laptops?", "Something for hiking".
+    Searches the product catalog by name OR description (Public Data).
+    Works for exact names ("Luma Monitor Pro") and vague requests ("gaming laptop", "something for hiking").
+    Optional filters: category, max_price, min_rating, in_stock_only.
     """
-    if product_vector_db is None: return "Product Search unavailable."
-    
-    # 1. Use Vector Search to find the top 3 matches
-    docs = product_vector_db.similarity_search(description, k=3)
-    
-    if not docs:
-        return f"I couldn't find any products matching '{description}'."
-    
-    # 2. Format the results for the user
-    results = []
-    for d in docs:
-        results.append(d.page_content) 
-        
-    return "\n---\n".join(results)
+    res = resources()
+    if res.products_df.empty: return "Catalog unavailable."
+    final_results = _rank_products(res, query, k=3, allow=_product_filter(res, category, max_price, min_rating, in_stock_only))
+    if not final_results: return f"I couldn't find any products matching '{query}'."
+    return json.dumps(final_results, default=str)
 
 def find_orders_by_description(description: str):
     """
     Hybrid Search: Finds USER'S orders based on a vague description.
     """
-    if product_vector_db is None: return "Product Search unavailable."
-    if searchable_orders.empty: return "Order DB unavailable."
+    product_retriever = resources().product_retriever
+    if product_retriever is None: return "Product Search unavailable."
+    order_store = orders()
+    if order_store.empty: return "Order DB unavailable."
 
-    # 1. Vector Search
-    docs = product_vector_db.similarity_search(description, k=1)
+    # 1. Hybrid Search (names + BM25 + vectors)
+    docs = product_retriever.search(description, k=3)
     if not docs:
         return f"I couldn't find any products matching '{description}'."
     
-    matched_name = docs[0].metadata.get("product_name")
-    
-    # 2. PRIVACY FILTER + MATCH
-    matches = searchable_orders[
-        (searchable_orders['product_name'] == matched_name) & 
-        (searchable_orders['customer_id'] == CURRENT_USER_ID) # <--- PRIVACY LOCK
-    ]
+    # 2. PRIVACY FILTER + MATCH: best-ranked candidate that this user actually ordered
+    # (product_name -> orders index probe, restricted to the user's orders)
+    user_id = current_user_id()
+    names = [d.metadata.get("product_name") for d in docs]
+    matched_name, positions = names[0], []
+    for name in names:
+        positions = order_store.product_positions(name, customer_id=user_id) # <--- PRIVACY LOCK
+        if positions:
+            matched_name = name
+            break
     
-    if matches.empty:
-        return f"I found the product '{matched_name}' in our catalog, but YOU ({CURRENT_USER_ID}) haven't ordered it."
+    if not positions:
+        return f"I found the product '{matched_name}' in our catalog, but YOU ({user_id}) haven't ordered it."
     
-    results = matches[['order_id', 'order_status', 'product_name', 'order_date']].to_dict(orient="records")
+    results = [
+        {"order_id": row["order_id"], "order_status": row["order_status"], "product_name": matched_name, "order_date": row["order_date"]}
+        for row in order_store.values(positions, ['order_id', 'order_status', 'order_date'])
+    ]
     return json.dumps(results)
 
 def check_order_status(order_id: str):
     """Checks status of a specific order ID (If owned by user)."""
-    if orders_df.empty: return "Order DB unavailable."
-    clean_id = str(order_id).replace(" ", "").strip()
+    order_store = orders()
+    if order_store.empty: return "Order DB unavailable."
     
     # PRIVACY FILTER
-    res = orders_df[
-        (orders_df['order_id'].astype(str) == clean_id) & 
-        (orders_df['customer_id'] == CURRENT_USER_ID)
-    ]
+    pos = order_store.find(order_id, customer_id=current_user_id())
     
-    if res.empty: return "Order not found (or it does not belong to you)."
-    return res.to_json(orient="records")
+    if pos is None: return "Order not found (or it does not belong to you)."
+    return order_store.rows_json([pos])
 
 def cancel_order(order_id: str):
     """Cancels an order (If owned by user) and returns the updated object."""
-    if orders_df.empty: return "Order DB unavailable."
-    clean_id = str(order_id).replace(" ", "").strip()
+    order_store = orders()
+    if order_store.empty: return "Order DB unavailable."
+    clean_id = clean_order_id(order_id)
     
     # PRIVACY FILTER
-    matches = orders_df.index[
-        (orders_df['order_id'].astype(str) == clean_id) & 
-        (orders_df['customer_id'] == CURRENT_USER_ID)
-    ].tolist()
-    
-    if not matches: return "Order not found (or permission denied)."
-    idx = matches[0]
-    
-    current_status = orders_df.at[idx, 'order_status']
+    pos = order_store.find(clean_id, customer_id=current_user_id())
+    if pos is None: return "Order not found (or permission denied)."
     
-    # Validation: Can we actually cancel it?
-    if current_status.lower() in ["delivered", "shipped", "out for delivery", "cancelled"]:
-        return f"Cannot cancel order {clean_id}. It is currently '{current_status}'."
-    
-    # EXECUTE CANCELLATION
-    orders_df.at[idx, 'order_status'] = "Cancelled"
-    save_to_disk()
+    # Validation + EXECUTE CANCELLATION in one step (a concurrent cancel/return can't slip in between)
+    result = order_store.transition(pos, "Cancelled", allowed=can_cancel)
+    if not result.ok:
+        return f"Cannot cancel order {clean_id}. It is currently '{result.status}'."
     
     # --- CRITICAL CHANGE ---
     # Instead of returning a string, we return the UPDATED row as JSON.
     # The 'process_user_input' function will pick this up, send it to React,
     # and the sidebar will re-render showing the Red Cancelled Box.
-    updated_row = orders_df.iloc[[idx]]
-    return updated_row.to_json(orient="records", date_format='iso')
+    return order_store.rows_json([pos], date_format='iso')
 
 def initiate_return(order_id: str, reason: str = "ns"):
     """Returns a delivered order (If owned by user)."""
-    if orders_df.empty: return "Order DB unavailable."
-    clean_id = str(order_id).replace(" ", "").strip()
+    order_store = orders()
+    if order_store.empty: return "Order DB unavailable."
+    clean_id = clean_order_id(order_id)
     
     # PRIVACY FILTER
-    matches = orders_df.index[
-        (orders_df['order_id'].astype(str) == clean_id) & 
-        (orders_df['customer_id'] == CURRENT_USER_ID)
-    ].tolist()
-    
-    if not matches: return "Order not found (or permission denied)."
-    idx = matches[0]
+    pos = order_store.find(clean_id, customer_id=current_user_id())
+    if pos is None: return "Order not found (or permission denied)."
     
-    current_status = orders_df.at[idx, 'order_status']
-    if current_status.lower() != "delivered":
-        return f"Cannot return order {clean_id}. It is '{current_status}' (must be Delivered)."
-        
-    orders_df.at[idx, 'order_status'] = "Return Requested"
-    save_to_disk()
+    result = order_store.transition(pos, "Return Requested", allowed=can_return)
+    if not result.ok:
+        return f"Cannot return order {clean_id}. It is '{result.status}' (must be Delivered)."
     return f"Return initiated for Order {clean_id}."
 
 def get_order_history():
     """Retrieves full order history sorted by newest date."""
-    if orders_df.empty: 
+    order_store = orders()
+    if order_store.empty: 
         return "No orders found."
     
-    # 1. Filter by current user
-    user_orders = orders_df[orders_df['customer_id'] == CURRENT_USER_ID].copy()
-    
-    if user_orders.empty: 
-        return f"No order history found for customer {CURRENT_USER_ID}."
+    # Positions are pre-filtered per customer and presorted by order_date (newest first)
+    user_id = current_user_id()
+    if not order_store.customer_positions(user_id): 
+        return f"No order history found for customer {user_id}."
 
-    user_orders['order_date'] = pd.to_datetime(user_orders['order_date'])
-
-    # 3. Sort by date (ascending=False puts newest at the top)
-    user_orders = user_orders.sort_values(by='order_date', ascending=False)
-
-
-    return user_orders.to_json(orient="records", date_format='iso')
+    return order_store.history_json(user_id)
 
 def admin_update_order(order_id: str, new_status: str):
     """God Mode: Forces an order to any status (Bypasses Privacy - For Admin Demo Only)."""
-    if orders_df.empty: return "Order DB unavailable."
-    clean_id = str(order_id).replace(" ", "").strip()
+    order_store = orders()
+    if order_store.empty: return "Order DB unavailable."
+    clean_id = clean_order_id(order_id)
     
-    matches = orders_df.index[orders_df['order_id'].astype(str) == clean_id].tolist()
-    if not matches: return "Order not found."
-    idx = matches[0]
+    pos = order_store.find(clean_id)
+    if pos is None: return "Order not found."
     
-    orders_df.at[idx, 'order_status'] = new_status
-    save_to_disk()
+    order_store.set_status(pos, new_status)
     return f"Admin Update: Order {clean_id} is now '{new_status}'."
 
 def get_policy_info(question: str):
-    docs = vector_db.similarity_search(question, k=2)
+    """Answers policy / FAQ questions (returns, shipping, warranty, product how-tos)."""
+    policy_retriever = resources().policy_retriever
+    if policy_retriever is None: return "Policy Search unavailable."
+    docs = policy_retriever.search(question, k=2)
     return "\n".join([d.page_content for d in docs])
 
 # --- 6. REGISTER TOOLS ---
-tools = [
-    search_products, 
-    browse_catalog, # <--- General Shopping
-    find_orders_by_description, # <--- Personal History
-    check_order_status, 
+# Read-only tools are memoized. Public ones are shared across customers and keyed on the
+# catalog version (a reload starts fresh); personal ones are keyed on the customer and
+# invalidated by order_store when cancel/return/admin updates touch their orders.
+# Failures ("Order DB unavailable.", "Order not found", "Tool error: ...") are never cached,
+# so a transient outage or a typo'd id isn't replayed for the whole TTL.
+TOOL_FAILURE_PREFIXES = ("Error", "Tool error", "Order not found")
+
+def _cacheable_tool_result(result):
+    return not (isinstance(result, str) and (result.startswith(TOOL_FAILURE_PREFIXES) or result.endswith("unavailable.")))
+
+tool_cache = ToolCache(
+    max_entries=int(os.getenv("TOOL_CACHE_SIZE", 4096)),
+    ttl_s=float(os.getenv("TOOL_CACHE_TTL_S", 600)),
+    cacheable=_cacheable_tool_result,
+)
+
+def _catalog_scope():
+    return resources().version
+
+def _customer_catalog_scope():
+    return (current_user_id(), resources().version)
+
+def _customer_tag(args, scope):
+    return [("customer", current_user_id())]
+
+def _order_tag(args, scope):
+    return [("order", clean_order_id(args["order_id"]))]
+
+# Each tool call is a "tool" span (cache hits included, so hit latency shows up too)
+tools = [tracer.traced(tool) for tool in [
+    tool_cache.wrap(search_products, scope=_catalog_scope), # <--- General Shopping (names + descriptions, one hybrid engine)
+    tool_cache.wrap(find_orders_by_description, scope=_customer_catalog_scope, tags=_customer_tag), # <--- Personal History
+    tool_cache.wrap(check_order_status, scope=current_user_id, tags=_order_tag),
     cancel_order, 
     initiate_return, 
-    get_order_history, 
+    tool_cache.wrap(get_order_history, scope=current_user_id, tags=_customer_tag),
     admin_update_order,
-    get_policy_info
-]
+    tool_cache.wrap(get_policy_info, scope=_catalog_scope),
+]]
 
-system_instruction = f"""
-You are a helpful Voice Support Agent for Customer {CURRENT_USER_ID}.
-1. Use 'search_products' to find items by exact name (e.g. "Iphone").
-2. Use 'browse_catalog' for VAGUE shopping queries (e.g. "show me red shoes", "gifts for dad").
+system_instruction_template = """
+You are a helpful Voice Support Agent for Customer {customer_id}.
+1. Use 'search_products' for ANY shopping query, exact names (e.g. "Iphone") or vague ones (e.g. "show me red shoes", "gifts for dad"). Pass category/max_price/min_rating/in_stock_only when the user states them.
+2. Use 'get_policy_info' for questions about returns, refunds, shipping, warranty or how a product works.
 3. Use 'find_orders_by_description' ONLY when the user asks about THEIR PAST ORDERS (e.g. "Where are my shoes?").
 4. Use 'check_order_status' for specific ID tracking.
 5. Use 'cancel_order' IF the user explicitly asks to cancel.
@@ -295,14 +412,180 @@ You are a helpful Voice Support Agent for Customer {CURRENT_USER_ID}.
 9. Keep answers SHORT (max 4 sentences) and spoken-style.
 """
 
+TOOLS_BY_NAME = {t.__name__: t for t in tools}
+
 # Use Flash for speed
-model = genai.GenerativeModel('gemini-2.5-flash', tools=tools, system_instruction=system_instruction)
-chat = model.start_chat(enable_automatic_function_calling=True)
+def build_chat(customer_id):
+    """Fresh chat for one customer (the system prompt names who we are serving)."""
+    if USE_FAKE_LLM:
+        from fake_llm import FakeGenerativeModel
+        return FakeGenerativeModel(
+            tools=tools,
+            first_token_delay_s=float(os.getenv("FAKE_LLM_FIRST_TOKEN_S", 0.3)),
+            chunk_delay_s=float(os.getenv("FAKE_LLM_CHUNK_S", 0.05)),
+        ).start_chat(enable_automatic_function_calling=True)
+
+    model = genai.GenerativeModel(
+        'gemini-2.5-flash',
+        tools=tools,
+        system_instruction=system_instruction_template.format(customer_id=customer_id)
+    )
+    return model.start_chat(enable_automatic_function_calling=True)
+
+# Older tool payloads become compact references and old turns fold into a summary once
+# the history passes CONTEXT_MAX_TOKENS, so prompt size (and latency) stays flat.
+def _history_types():
+    """Content/Part constructors matching the chat backend build_chat() returns."""
+    if USE_FAKE_LLM:
+        from fake_llm import Content, Part, FunctionResponse
+        return Content, Part, lambda name, response: FunctionResponse(name, response)
+    protos = genai.protos
+    return (lambda role, parts: protos.Content(role=role, parts=parts), protos.Part,
+            lambda name, response: protos.FunctionResponse(name=name, response=response))
+
+_Content, _Part, _FunctionResponse = _history_types()
+context_budget = ContextBudget(
+    make_content=_Content,
+    text_part=lambda text: _Part(text=text),
+    tool_part=lambda name, result: _Part(function_response=_FunctionResponse(name, {"result": result})),
+    max_tokens=int(os.getenv("CONTEXT_MAX_TOKENS", 4000)),
+    max_tool_chars=int(os.getenv("CONTEXT_MAX_TOOL_CHARS", 400)),
+)
+
+# One chat + privacy scope per session; LRU + idle-TTL bounded
+sessions = SessionManager(
+    build_chat,
+    context=context_budget if os.getenv("CONTEXT_BUDGET", "1") != "0" else None,
+)
+
+def reset_session(session_id=DEFAULT_SESSION_ID, customer_id=CURRENT_USER_ID):
+    print(f"🧹 System: Purging chat history for session {session_id}...")
+    sessions.reset(session_id, customer_id)
 
 # --- 7. INTERFACE ---
-def process_user_input(user_text):
+# Opt-in (SEMANTIC_CACHE=1) cache of whole turns for near-duplicate questions. Only turns
+# answered purely from public tools are stored, so a hit never carries anyone's order data.
+RESPONSE_CACHEABLE_TOOLS = {"get_policy_info", "search_products"}
+response_cache = SemanticCache(
+    lambda text: startup.get("embeddings").embed_query(text),
+    threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.92)),
+    max_entries=int(os.getenv("SEMANTIC_CACHE_SIZE", 1000)),
+    ttl_s=float(os.getenv("SEMANTIC_CACHE_TTL_S", 3600)),
+) if os.getenv("SEMANTIC_CACHE") == "1" else None
+
+def _cached_turn(chat, user_text, version):
+    """Cached structured_data for this utterance, or None. A hit is added to the chat like a normal exchange."""
+    if response_cache is None:
+        return None
     try:
-        response = chat.send_message(user_text)
+        with tracer.span("response_cache"):
+            cached = response_cache.lookup(user_text, version=version)
+    except Exception as e:
+        print(f"⚠️ Response cache lookup failed: {e}")
+        return None
+    if cached is not None:
+        chat.history = [
+            *chat.history,
+            genai.protos.Content(role="user", parts=[genai.protos.Part(text=user_text)]),
+            genai.protos.Content(role="model", parts=[genai.protos.Part(text=cached["bot_text"])]),
+        ]
+    return cached
+
+# Order / customer ids ("O0035", "C0010") in an answer mean it was written for one customer
+PRIVATE_ID = re.compile(r"\b[OC]\s?-?\d{3,}\b", re.IGNORECASE)
+
+def _remember_turn(session, start, user_text, structured_data, version):
+    """
+    Stores the turn if every tool it called (and it called at least one) is public, no earlier
+    turn of the session saw customer-scoped tool output, and the answer names no order/customer id.
+    """
+    calls = {part.function_call.name for content in session.chat.history[start:] for part in content.parts if part.function_call}
+    if calls - RESPONSE_CACHEABLE_TOOLS:
+        session.private_context = True
+    if response_cache is None or structured_data["bot_text"].startswith("Error:"):
+        return
+    if not calls or session.private_context or PRIVATE_ID.search(structured_data["bot_text"]):
+        return
+    response_cache.store(user_text, structured_data, version=version)
+
+# Local fast path for one-shot commands ("cancel order O0042", "status of O0017", "show my
+# orders"): the tool is called directly, no model round trip. INTENT_ROUTER=0 disables it;
+# INTENT_ROUTER_EMBEDDINGS=1 adds the embedding classifier on top of the grammar.
+intent_router = IntentRouter(
+    embed_fn=(lambda text: startup.get("embeddings").embed_query(text)) if os.getenv("INTENT_ROUTER_EMBEDDINGS") == "1" else None,
+    threshold=float(os.getenv("INTENT_ROUTER_THRESHOLD", 0.85)),
+) if os.getenv("INTENT_ROUTER", "1") == "1" else None
+
+def _routed_turn(session, user_text, snapshot):
+    """structured_data from calling the tool directly, or None when the router isn't sure."""
+    chat = session.chat
+    if intent_router is None:
+        return None
+    try:
+        with tracer.span("intent_router"):
+            route = intent_router.route(user_text)
+    except Exception as e:
+        print(f"⚠️ Intent router failed: {e}")
+        return None
+    if route is None:
+        return None
+
+    # Every routed intent reads or changes the customer's own orders
+    session.private_context = True
+    result = _call_tool(route.tool, route.args, session.customer_id, snapshot)
+    data_type, items = _classify_tool_result(result)
+    structured_data = {"bot_text": route.reply(result), "type": data_type, "items": items}
+    # Same history an automatic function call leaves behind, so follow-ups keep their context
+    chat.history = [
+        *chat.history,
+        genai.protos.Content(role="user", parts=[genai.protos.Part(text=user_text)]),
+        genai.protos.Content(role="model", parts=[genai.protos.Part(
+            function_call=genai.protos.FunctionCall(name=route.tool, args=route.args))]),
+        genai.protos.Content(role="user", parts=[genai.protos.Part(
+            function_response=genai.protos.FunctionResponse(name=route.tool, response={"result": result}))]),
+        genai.protos.Content(role="model", parts=[genai.protos.Part(text=structured_data["bot_text"])]),
+    ]
+    return structured_data
+
+def process_user_input(user_text, session_id=DEFAULT_SESSION_ID, customer_id=CURRENT_USER_ID):
+    session = sessions.get(session_id, customer_id)
+    with session.lock:
+        token = _current_user.set(session.customer_id)
+        pin = _pinned_catalog.set(live_catalog())
+        try:
+            routed = _routed_turn(session, user_text, resources())
+            if routed is not None:
+                return routed
+            version = resources().version
+            cached = _cached_turn(session.chat, user_text, version)
+            if cached is not None:
+                return cached
+            start = len(session.chat.history)
+            structured_data = _run_turn(session.chat, user_text)
+            _remember_turn(session, start, user_text, structured_data, version)
+            return structured_data
+        finally:
+            _pinned_catalog.reset(pin)
+            _current_user.reset(token)
+            with tracer.span("context_trim"):
+                sessions.trim(session)
+
+# Gemini calls block on network I/O; async callers run them on this pool
+LLM_WORKERS = int(os.getenv("LLM_WORKERS", 32))
+llm_executor = ThreadPoolExecutor(max_workers=LLM_WORKERS, thread_name_prefix="llm")
+
+async def process_user_input_async(user_text, session_id=DEFAULT_SESSION_ID, customer_id=CURRENT_USER_ID):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        llm_executor,
+        functools.partial(tracer.bind(process_user_input), user_text, session_id=session_id, customer_id=customer_id)
+    )
+
+def _run_turn(chat, user_text):
+    history = list(chat.history)
+    try:
+        with tracer.span("llm"):
+            response = chat.send_message(user_text)
         
         structured_data = {
             "bot_text": response.text,
@@ -314,33 +597,160 @@ def process_user_input(user_text):
         for part in chat.history[-2].parts: 
             if part.function_response:
                 raw_content = part.function_response.response['result']
-                
-                # Convert string result to actual list/object
-                try:
-                    parsed_items = json.loads(raw_content)
-                except:
-                    continue # Not JSON data, skip
-
-                # Identify Data Type
-                if isinstance(parsed_items, list) and len(parsed_items) > 0:
-                    first_item = parsed_items[0]
-                    
-                    if "order_id" in first_item:
-                        structured_data["type"] = "orders"
-                        structured_data["items"] = parsed_items
-                    elif "product_name" in first_item:
-                        structured_data["type"] = "products"
-                        structured_data["items"] = parsed_items
+                data_type, items = _classify_tool_result(raw_content)
+                if data_type:
+                    structured_data["type"] = data_type
+                    structured_data["items"] = items
 
         return structured_data
     except Exception as e:
+        # Drop the half-finished exchange so the session stays usable
+        chat.history = history
         return {"bot_text": f"Error: {str(e)}", "type": None, "items": []}
 
+def _classify_tool_result(raw_content):
+    """Returns ("orders"|"products", items) for UI-renderable tool output, else (None, [])."""
+    # Convert string result to actual list/object
+    try:
+        parsed_items = json.loads(raw_content)
+    except:
+        return None, [] # Not JSON data, skip
+
+    # Identify Data Type
+    if isinstance(parsed_items, list) and len(parsed_items) > 0:
+        first_item = parsed_items[0]
+        
+        if "order_id" in first_item:
+            return "orders", parsed_items
+        elif "product_name" in first_item:
+            return "products", parsed_items
+    return None, []
+
+# --- 8. STREAMING INTERFACE ---
+MAX_TOOL_ROUNDS = 5
+
+def process_user_input_stream(user_text, session_id=DEFAULT_SESSION_ID, customer_id=CURRENT_USER_ID):
+    """
+    Same turn as process_user_input, as a generator of events:
+      {"event": "tool", "name", "type", "items"}   after each tool call
+      {"event": "delta", "text"}                   bot text as the model generates it
+      {"event": "done", **structured_data}         final payload (same shape as process_user_input)
+    """
+    session = sessions.get(session_id, customer_id)
+    with session.lock:
+        snapshot = live_catalog()
+        try:
+            routed = _routed_turn(session, user_text, snapshot)
+            cached = routed if routed is not None else _cached_turn(session.chat, user_text, snapshot.version)
+            if cached is not None:
+                if cached["type"]:
+                    source = "intent_router" if routed is not None else "response_cache"
+                    yield {"event": "tool", "name": source, "type": cached["type"], "items": cached["items"]}
+                yield {"event": "delta", "text": cached["bot_text"]}
+                yield {"event": "done", **cached}
+                return
+
+            start = len(session.chat.history)
+            turn = _stream_turn(session.chat, user_text, session.customer_id, snapshot)
+            try:
+                for event in turn:
+                    if event["event"] == "done":
+                        _remember_turn(session, start, user_text, {k: v for k, v in event.items() if k != "event"}, snapshot.version)
+                    yield event
+            finally:
+                # Client gone mid-stream: the turn restores the history before trim() reads it
+                turn.close()
+        finally:
+            with tracer.span("context_trim"):
+                sessions.trim(session)
+
+def _stream_turn(chat, user_text, customer_id, snapshot=None):
+    structured_data = {"bot_text": "", "type": None, "items": []}
+    # An unfinished turn is rolled back: after a failed stream the SDK's chat.history raises
+    # on every read, and a function_call left unanswered makes Gemini reject the next request
+    history = list(chat.history)
+    answered = False
+    # The SDK can't stream with automatic function calling, so we run the tool loop here
+    chat.enable_automatic_function_calling = False
+    try:
+        message = user_text
+        for _ in range(MAX_TOOL_ROUNDS):
+            calls = []
+            with tracer.span("llm", mode="stream"):
+                for chunk in chat.send_message(message, stream=True):
+                    for part in chunk.parts:
+                        if part.function_call:
+                            calls.append(part.function_call)
+                        elif part.text:
+                            structured_data["bot_text"] += part.text
+                            yield {"event": "delta", "text": part.text}
+            if not calls:
+                answered = True
+                break
+
+            responses = []
+            for call in calls:
+                result = _call_tool(call.name, dict(call.args), customer_id, snapshot)
+                data_type, items = _classify_tool_result(result)
+                if data_type:
+                    structured_data["type"] = data_type
+                    structured_data["items"] = items
+                yield {"event": "tool", "name": call.name, "type": data_type, "items": items}
+                responses.append(genai.protos.Part(
+                    function_response=genai.protos.FunctionResponse(name=call.name, response={"result": result})
+                ))
+            message = responses
+        else:
+            structured_data["bot_text"] = f"Error: no answer after {MAX_TOOL_ROUNDS} rounds of tool calls."
+    except Exception as e:
+        structured_data["bot_text"] = f"Error: {str(e)}"
+    finally:
+        chat.enable_automatic_function_calling = True
+        if not answered:
+            chat.history = history
+
+    yield {"event": "done", **structured_data}
+
+def _call_tool(name, args, customer_id, snapshot=None):
+    tool = TOOLS_BY_NAME.get(name)
+    if tool is None:
+        return f"Unknown tool '{name}'."
+    # Scope set per call: generator steps may run on different executor threads
+    token = _current_user.set(customer_id)
+    pin = _pinned_catalog.set(snapshot)
+    try:
+        return str(tool(**args))
+    except Exception as e:
+        return f"Tool error: {e}"
+    finally:
+        _pinned_catalog.reset(pin)
+        _current_user.reset(token)
+
+async def stream_user_input_async(user_text, session_id=DEFAULT_SESSION_ID, customer_id=CURRENT_USER_ID):
+    """Async iterator over process_user_input_stream; each model/tool step runs on llm_executor."""
+    loop = asyncio.get_running_loop()
+    events = process_user_input_stream(user_text, session_id=session_id, customer_id=customer_id)
+    finished = object()
+    step = tracer.bind(next)
+    try:
+        while True:
+            event = await loop.run_in_executor(llm_executor, step, events, finished)
+            if event is finished:
+                break
+            yield event
+    finally:
+        # Releases the session lock if the client went away mid-stream
+        await loop.run_in_executor(llm_executor, tracer.bind(events.close))
+
 if __name__ == "__main__":
+    startup.start()
     print(f"\n💬 AI Agent active for user {CURRENT_USER_ID} (Type 'quit' to exit)")
-    while True:
-        user_input = input("\nYou: ")
-        if user_input.lower() in ["quit", "exit"]: break
-        
-        response = process_user_input(user_input)
-        print(f"AI: {response}")
\ No newline at end of file
+    try:
+        while True:
+            user_input = input("\nYou: ")
+            if user_input.lower() in ["quit", "exit"]: break
+
+            response = process_user_input(user_input)
+            print(f"AI: {response}")
+    finally:
+        shutdown()
\ No newline at end of file
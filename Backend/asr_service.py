@@ -0,0 +1,235 @@
+import time
+import queue
+import threading
+from concurrent.futures import Future
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+
+class ASRProfile:
+    """Speed/accuracy trade-off: Whisper model size + decoding (beam_size=1 is greedy)."""
+
+    def __init__(self, model_size, beam_size, compute_type="int8"):
+        self.model_size = model_size
+        self.beam_size = beam_size
+        self.compute_type = compute_type
+
+
+PROFILES = {
+    "fast": ASRProfile("tiny.en", beam_size=1),
+    "balanced": ASRProfile("base.en", beam_size=1),
+    "accurate": ASRProfile("base.en", beam_size=5),
+    "best": ASRProfile("small.en", beam_size=5),
+}
+
+
+class _Job:
+    __slots__ = ("audio", "call", "future", "enqueued_at")
+
+    def __init__(self, audio=None, call=None):
+        self.audio = audio        # float32 mono @16 kHz, for transcription jobs
+        self.call = call          # model -> result, for raw jobs (streaming partials)
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+    @property
+    def seconds(self):
+        return len(self.audio) / SAMPLE_RATE if self.audio is not None else 0.0
+
+
+class ASRService:
+    """
+    Shared Whisper worker pool.
+    - one model loaded with `replicas` CTranslate2 workers (model replicas that decode in
+      parallel), cores split between them, and one worker thread per replica
+    - callers submit() clips to a shared queue and get a Future, so any number of requests
+      can wait without holding a thread each
+    - a worker that picks up a short clip also takes the short clips queued behind it (up to
+      max_batch_clips / max_batch_s) and decodes them as ONE audio, separated by gap_s of
+      silence; words are split back per clip by timestamp. Whisper encodes a full 30 s window
+      per call, so a batch of 2-3 s utterances costs about as much as one of them. Opt-in
+      (max_batch_clips > 1): timestamp routing is approximate near the gaps. If a batched
+      decode fails, its clips are retried one by one, so one bad clip fails only its caller.
+    - raw jobs (call(fn)) run fn(model) on a worker, e.g. StreamingTranscriber's decodes
+    """
+
+    def __init__(self, model_factory, profile, replicas=1, cpu_threads=1, max_batch_clips=1,
+                 max_batch_s=24.0, short_clip_s=8.0, gap_s=1.0, batch_wait_ms=0):
+        self.profile = profile
+        self.replicas = replicas
+        self.max_batch_clips = max_batch_clips
+        self.max_batch_s = max_batch_s
+        self.short_clip_s = short_clip_s
+        self.gap_s = gap_s
+        self.batch_wait_s = batch_wait_ms / 1000
+        self.model = model_factory(profile, replicas, cpu_threads)
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._stats = {"clips": 0, "batches": 0, "batched_clips": 0, "calls": 0,
+                       "audio_s": 0.0, "busy_s": 0.0, "queue_wait_s": 0.0, "errors": 0}
+        self._started = time.perf_counter()
+        self._workers = [
+            threading.Thread(target=self._work, name=f"asr-{i}", daemon=True) for i in range(replicas)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    # --- CLIENT API ---
+    def submit(self, audio):
+        """Future[str] for one clip (int16 or float32 samples, mono 16 kHz)."""
+        audio = np.asarray(audio)
+        if audio.dtype != np.float32:
+            audio = audio.astype(np.float32) / 32768.0
+        job = _Job(audio=audio)
+        if len(audio) == 0:
+            job.future.set_result("")
+        else:
+            self._queue.put(job)
+        return job.future
+
+    def transcribe(self, audio):
+        return self.submit(audio).result()
+
+    def call(self, fn):
+        """Future for fn(model) run on a worker (shares the pool's replicas and queue)."""
+        job = _Job(call=fn)
+        self._queue.put(job)
+        return job.future
+
+    def model_proxy(self):
+        """Stand-in with WhisperModel.transcribe() whose decodes go through the pool."""
+        return _ModelProxy(self)
+
+    def close(self):
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join()
+
+    # --- WORKERS ---
+    def _work(self):
+        carry = None
+        while True:
+            job = carry if carry is not None else self._queue.get()
+            carry = None
+            if job is None:
+                return
+            batch = [job]
+            if self._batchable(job):
+                batch, carry = self._gather(job)
+            self._run(batch)
+
+    def _batchable(self, job):
+        return job.audio is not None and job.seconds <= self.short_clip_s and self.max_batch_clips > 1
+
+    def _gather(self, first):
+        """first + the short clips already queued (or arriving within batch_wait_ms)."""
+        batch, total = [first], first.seconds
+        deadline = time.perf_counter() + self.batch_wait_s
+        while len(batch) < self.max_batch_clips:
+            try:
+                wait = deadline - time.perf_counter()
+                job = self._queue.get(timeout=wait) if wait > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is None:
+                self._queue.put(None)   # keep the shutdown signal for this worker's next get()
+                break
+            if not self._batchable(job) or total + self.gap_s + job.seconds > self.max_batch_s:
+                return batch, job
+            batch.append(job)
+            total += self.gap_s + job.seconds
+        return batch, None
+
+    def _run(self, batch):
+        start = time.perf_counter()
+        try:
+            if batch[0].call is not None:
+                results = [batch[0].call(self.model)]
+            elif len(batch) == 1:
+                results = [self._transcribe_one(batch[0].audio)]
+            else:
+                results = self._transcribe_batch([job.audio for job in batch])
+        except Exception as e:
+            with self._lock:
+                self._stats["errors"] += 1
+            if len(batch) == 1:
+                batch[0].future.set_exception(e)
+                return
+            # Find the clip that broke the joined decode: each caller gets its own outcome
+            for job in batch:
+                self._run([job])
+            return
+        busy = time.perf_counter() - start
+
+        with self._lock:
+            stats = self._stats
+            stats["busy_s"] += busy
+            stats["queue_wait_s"] += sum(start - job.enqueued_at for job in batch)
+            if batch[0].call is not None:
+                stats["calls"] += 1
+            else:
+                stats["clips"] += len(batch)
+                stats["batches"] += 1
+                stats["batched_clips"] += len(batch) if len(batch) > 1 else 0
+                stats["audio_s"] += sum(job.seconds for job in batch)
+        for job, result in zip(batch, results):
+            job.future.set_result(result)
+
+    def _transcribe_one(self, audio):
+        segments, _ = self.model.transcribe(audio, beam_size=self.profile.beam_size)
+        return "".join(segment.text for segment in segments).strip()
+
+    def _transcribe_batch(self, clips):
+        gap = np.zeros(int(self.gap_s * SAMPLE_RATE), dtype=np.float32)
+        parts, bounds, offset = [], [], 0
+        for clip in clips:
+            parts.extend((clip, gap))
+            bounds.append((offset + len(clip) + len(gap) / 2) / SAMPLE_RATE)   # clip ends mid-gap
+            offset += len(clip) + len(gap)
+        segments, _ = self.model.transcribe(
+            np.concatenate(parts[:-1]),
+            beam_size=self.profile.beam_size,
+            word_timestamps=True,
+            # Separate speakers/utterances: don't let one clip's text steer the next
+            condition_on_previous_text=False,
+        )
+        texts = [[] for _ in clips]
+        for segment in segments:
+            for word in segment.words or []:
+                middle = (word.start + word.end) / 2
+                index = next((i for i, bound in enumerate(bounds) if middle < bound), len(clips) - 1)
+                texts[index].append(word.word)
+        return ["".join(words).strip() for words in texts]
+
+    # --- METRICS ---
+    def metrics(self):
+        with self._lock:
+            stats = dict(self._stats)
+        jobs = stats["clips"] + stats["calls"]
+        uptime = time.perf_counter() - self._started
+        return {
+            "profile": {"model_size": self.profile.model_size, "beam_size": self.profile.beam_size},
+            "replicas": self.replicas,
+            "queued": self._queue.qsize(),
+            **{k: round(v, 3) if isinstance(v, float) else v for k, v in stats.items()},
+            "avg_batch_size": stats["clips"] / stats["batches"] if stats["batches"] else 0.0,
+            "avg_queue_wait_ms": stats["queue_wait_s"] * 1000 / jobs if jobs else 0.0,
+            # audio-seconds transcribed per second a replica was busy, and per wall second overall
+            "speed_x": stats["audio_s"] / stats["busy_s"] if stats["busy_s"] else 0.0,
+            "throughput_x": stats["audio_s"] / uptime if uptime else 0.0,
+        }
+
+
+class _ModelProxy:
+    def __init__(self, service):
+        self._service = service
+
+    def transcribe(self, audio, **options):
+        def decode(model):
+            segments, info = model.transcribe(audio, **options)
+            return list(segments), info   # the generator must be consumed on the worker
+        return self._service.call(decode).result()
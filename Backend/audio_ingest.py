@@ -0,0 +1,209 @@
+import struct
+import shutil
+import threading
+import subprocess
+import numpy as np
+
+SAMPLE_RATE = 16000          # What Whisper (main.transcribe) expects
+MAX_UTTERANCE_SECONDS = 30   # Ring buffer capacity per request
+
+
+# --- 1. RING BUFFER ---
+class PCMRingBuffer:
+    """
+    Preallocated int16 buffer. Keeps the newest `capacity` samples if a caller talks too long
+    (the WebSocket's rolling window); `overflowed` tells callers that need the whole clip.
+    """
+
+    def __init__(self, capacity=SAMPLE_RATE * MAX_UTTERANCE_SECONDS):
+        self._buf = np.zeros(capacity, dtype=np.int16)
+        self._capacity = capacity
+        self._end = 0       # total samples ever written
+        self._lock = threading.Lock()
+
+    def write(self, samples):
+        if len(samples) == 0:
+            return
+        with self._lock:
+            written = len(samples)
+            if written >= self._capacity:
+                # Only the newest samples survive; they land where the count says they end
+                self._end += written - self._capacity
+                samples = samples[-self._capacity:]
+            start = self._end % self._capacity
+            first = min(len(samples), self._capacity - start)
+            self._buf[start:start + first] = samples[:first]
+            self._buf[:len(samples) - first] = samples[first:]
+            self._end += len(samples)
+
+    def __len__(self):
+        return min(self._end, self._capacity)
+
+    @property
+    def total_written(self):
+        return self._end
+
+    @property
+    def overflowed(self):
+        return self._end > self._capacity
+
+    def read(self):
+        """Contiguous copy of the buffered audio, oldest sample first."""
+        with self._lock:
+            if self._end <= self._capacity:
+                return self._buf[:self._end].copy()
+            start = self._end % self._capacity
+            return np.concatenate((self._buf[start:], self._buf[:start]))
+
+    def clear(self):
+        with self._lock:
+            self._end = 0
+
+
+# --- 2. INCREMENTAL DECODERS ---
+class PCMDecoder:
+    """Raw little-endian int16 PCM. Downmixes to channel 0 and resamples to 16 kHz."""
+
+    def __init__(self, sample_rate=SAMPLE_RATE, channels=1):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self._carry = b""
+
+    def feed(self, data):
+        data = self._carry + data
+        frame_bytes = 2 * self.channels
+        usable = len(data) - (len(data) % frame_bytes)
+        self._carry = data[usable:]
+        if usable == 0:
+            return np.zeros(0, dtype=np.int16)
+
+        samples = np.frombuffer(data[:usable], dtype="<i2")
+        if self.channels > 1:
+            # Same choice as record_manual: Whisper gets channel 0 only
+            samples = samples[::self.channels]
+        return _resample(samples, self.sample_rate)
+
+    def close(self):
+        return np.zeros(0, dtype=np.int16)
+
+    def abort(self):
+        """Drops the turn without decoding the rest (nothing to release here)."""
+
+
+class WavDecoder(PCMDecoder):
+    """Streams a RIFF/WAVE body: waits for the header, then decodes the data chunk as PCM."""
+
+    def __init__(self):
+        super().__init__()
+        self._header = b""
+        self._in_data = False
+
+    def feed(self, data):
+        if self._in_data:
+            return super().feed(data)
+
+        self._header += data
+        offset = 12  # 'RIFF' <size> 'WAVE'
+        if len(self._header) < offset:
+            return np.zeros(0, dtype=np.int16)
+        if self._header[:4] != b"RIFF" or self._header[8:12] != b"WAVE":
+            raise ValueError("Not a WAV stream.")
+
+        while len(self._header) >= offset + 8:
+            chunk_id, chunk_size = struct.unpack("<4sI", self._header[offset:offset + 8])
+            body = offset + 8
+            if chunk_id == b"fmt ":
+                if len(self._header) < body + 16:
+                    break
+                fmt, channels, rate, _, _, bits = struct.unpack("<HHIIHH", self._header[body:body + 16])
+                if fmt != 1 or bits != 16:
+                    raise ValueError("Only 16-bit PCM WAV is supported.")
+                self.channels, self.sample_rate = channels, rate
+            elif chunk_id == b"data":
+                self._in_data = True
+                rest, self._header = self._header[body:], b""
+                return super().feed(rest)
+            offset = body + chunk_size + (chunk_size % 2)
+        return np.zeros(0, dtype=np.int16)
+
+
+class FFmpegDecoder:
+    """
+    Compressed input (Opus/WebM/Ogg): piped through ffmpeg to 16 kHz mono int16.
+    feed()/close() block on the pipe, so async callers run them on a thread (`blocking`).
+    Every decoder must end in close() or abort(), or the ffmpeg process is left behind.
+    """
+    blocking = True
+
+    def __init__(self):
+        if shutil.which("ffmpeg") is None:
+            raise ValueError("Compressed audio needs ffmpeg on the server; send PCM or WAV instead.")
+        self._proc = subprocess.Popen(
+            ["ffmpeg", "-loglevel", "error", "-i", "pipe:0",
+             "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "pipe:1"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+        )
+        self._out = []
+        self._out_lock = threading.Lock()
+        # Drain stdout on a thread so a full pipe never blocks our writes
+        self._reader = threading.Thread(target=self._drain, daemon=True)
+        self._reader.start()
+        self._pcm = PCMDecoder()
+
+    def _drain(self):
+        while True:
+            chunk = self._proc.stdout.read1(65536)
+            if not chunk:
+                break
+            with self._out_lock:
+                self._out.append(chunk)
+
+    def _take(self):
+        with self._out_lock:
+            data, self._out = b"".join(self._out), []
+        return self._pcm.feed(data)
+
+    def feed(self, data):
+        self._proc.stdin.write(data)
+        self._proc.stdin.flush()
+        return self._take()
+
+    def close(self):
+        self._proc.stdin.close()
+        self._reader.join()
+        self._proc.wait()
+        self._proc.stdout.close()
+        return self._take()
+
+    def abort(self):
+        """Kills ffmpeg and reaps it, its pipes and the drain thread (safe after close())."""
+        if self._proc.poll() is None:
+            self._proc.kill()
+        self._proc.wait()
+        try:
+            self._proc.stdin.close()
+        except OSError:
+            pass   # buffered bytes can't reach a dead process
+        self._reader.join()
+        self._proc.stdout.close()
+
+
+def make_decoder(content_type, sample_rate=SAMPLE_RATE, channels=1):
+    """Picks a decoder from the request Content-Type (or the WebSocket 'format' field)."""
+    kind = (content_type or "").split(";")[0].strip().lower()
+    if kind in ("audio/wav", "audio/wave", "audio/x-wav", "wav"):
+        return WavDecoder()
+    if kind in ("audio/pcm", "audio/l16", "application/octet-stream", "pcm", ""):
+        return PCMDecoder(sample_rate=sample_rate, channels=channels)
+    if kind in ("audio/opus", "audio/ogg", "audio/webm", "opus", "ogg", "webm"):
+        return FFmpegDecoder()
+    raise ValueError(f"Unsupported audio type: {content_type}")
+
+
+def _resample(samples, rate):
+    if rate == SAMPLE_RATE or len(samples) == 0:
+        return samples.astype(np.int16, copy=False)
+    # Linear interpolation per chunk: good enough for speech recognition
+    n_out = int(round(len(samples) * SAMPLE_RATE / rate))
+    x_out = np.linspace(0, len(samples) - 1, n_out)
+    return np.interp(x_out, np.arange(len(samples)), samples).astype(np.int16)
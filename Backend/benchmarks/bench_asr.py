@@ -0,0 +1,150 @@
+"""
+ASR worker pool throughput: audio-seconds transcribed per wall-second at several
+concurrency levels, with and without batching of short utterances.
+
+--model stub (default) needs no weights: a stand-in with Whisper's cost shape on CPU
+(every call encodes a full 30 s window, then decodes per word, more with a wider beam),
+sleeping like CTranslate2 does with the GIL released. Each clip is a constant tone whose
+level encodes its index, and the stub "hears" that level, so the run also checks that
+batched words are split back to the right clip.
+
+--model whisper --corpus wavs/ runs the real faster-whisper model on your recordings
+(--profile fast|balanced|accurate|best).
+
+Run from Backend/:  python benchmarks/bench_asr.py [--levels 1 4 16 --replicas 2]
+"""
+import os
+import sys
+import glob
+import math
+import time
+import types
+import argparse
+import threading
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from asr_service import ASRService, PROFILES, SAMPLE_RATE
+
+WORD_S = 0.2   # clip lengths and the 1 s batch gap are multiples of this, so no word straddles two clips
+
+
+class StubWhisper:
+    def __init__(self, encode_s, word_s):
+        self.encode_s = encode_s
+        self.word_s = word_s
+
+    def transcribe(self, audio, beam_size=5, **options):
+        block = int(WORD_S * SAMPLE_RATE)
+        words = []
+        for i in range(0, len(audio) - block + 1, block):
+            level = float(np.sqrt(np.mean(audio[i:i + block] ** 2)))
+            if level > 0.01:
+                words.append(types.SimpleNamespace(
+                    start=i / SAMPLE_RATE, end=(i + block) / SAMPLE_RATE, word=f" a{round(level / 0.03)}"))
+        windows = math.ceil(len(audio) / (30 * SAMPLE_RATE))
+        time.sleep(windows * self.encode_s + len(words) * self.word_s * (1 + 0.25 * (beam_size - 1)))
+        text = "".join(w.word for w in words)
+        return [types.SimpleNamespace(text=text, words=words)], None
+
+
+def stub_clips(n, seed=0):
+    rng = np.random.default_rng(seed)
+    clips = []
+    for i in range(n):
+        seconds = WORD_S * rng.integers(6, 17)   # 1.2 - 3.2 s commands
+        clips.append((np.full(int(seconds * SAMPLE_RATE), 0.03 * (i % 8 + 1), dtype=np.float32), f"a{i % 8 + 1}"))
+    return clips
+
+
+def corpus_clips(directory):
+    import scipy.io.wavfile as wav
+    from audio_ingest import PCMDecoder
+    clips = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.wav"))):
+        rate, data = wav.read(path)
+        if data.ndim > 1:
+            data = data[:, 0]
+        clips.append((PCMDecoder(sample_rate=rate).feed(data.astype("<i2").tobytes()).astype(np.float32) / 32768.0, None))
+    if not clips:
+        sys.exit(f"No .wav files in {directory}")
+    return clips
+
+
+def run_level(service, clips, concurrency, total):
+    """`concurrency` callers, each submitting its next clip when the previous one returns."""
+    latencies, wrong = [], 0
+    lock = threading.Lock()
+    counter = iter(range(total))
+
+    def caller():
+        nonlocal wrong
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            audio, expected = clips[i % len(clips)]
+            start = time.perf_counter()
+            text = service.transcribe(audio)
+            with lock:
+                latencies.append(time.perf_counter() - start)
+                if expected is not None and set(text.split()) != {expected}:
+                    wrong += 1
+
+    audio_s = sum(len(clips[i % len(clips)][0]) for i in range(total)) / SAMPLE_RATE
+    start = time.perf_counter()
+    threads = [threading.Thread(target=caller) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+    latencies.sort()
+    return audio_s / wall, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.95)], wrong
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", choices=["stub", "whisper"], default="stub")
+    parser.add_argument("--corpus", help="directory of .wav utterances (--model whisper)")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="accurate")
+    parser.add_argument("--replicas", type=int, default=max(1, (os.cpu_count() or 1) // 2))
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 4, 16, 32])
+    parser.add_argument("--clips-per-level", type=int, default=64)
+    parser.add_argument("--max-batch-clips", type=int, default=8)
+    parser.add_argument("--encode-ms", type=float, default=250.0, help="stub: encoder cost per 30 s window")
+    parser.add_argument("--word-ms", type=float, default=4.0, help="stub: decoder cost per word (greedy)")
+    args = parser.parse_args()
+
+    profile = PROFILES[args.profile]
+    cores = os.cpu_count() or 1
+    if args.model == "stub":
+        factory = lambda p, replicas, threads: StubWhisper(args.encode_ms / 1000, args.word_ms / 1000)
+        clips = stub_clips(args.clips_per_level)
+    else:
+        if not args.corpus:
+            sys.exit("--model whisper needs --corpus")
+        from faster_whisper import WhisperModel
+        factory = lambda p, replicas, threads: WhisperModel(
+            p.model_size, device="cpu", compute_type=p.compute_type, num_workers=replicas, cpu_threads=threads)
+        clips = corpus_clips(args.corpus)
+
+    print(f"model {args.model}  profile {args.profile} "
+          f"({profile.model_size}, beam {profile.beam_size})  replicas {args.replicas}  "
+          f"mean clip {np.mean([len(a) for a, _ in clips]) / SAMPLE_RATE:.1f}s\n")
+    print(f"{'batching':<10}{'callers':>8}{'audio s/s':>11}{'p50 ms':>9}{'p95 ms':>9}{'avg batch':>11}{'misrouted':>11}")
+    for max_batch in (1, args.max_batch_clips):
+        for level in args.levels:
+            service = ASRService(factory, profile, replicas=args.replicas,
+                                 cpu_threads=max(1, cores // args.replicas), max_batch_clips=max_batch)
+            speed, p50, p95, wrong = run_level(service, clips, level, args.clips_per_level)
+            batch = service.metrics()["avg_batch_size"]
+            service.close()
+            label = "off" if max_batch == 1 else f"<= {max_batch}"
+            print(f"{label:<10}{level:>8}{speed:>10.1f}x{p50 * 1000:>9.0f}{p95 * 1000:>9.0f}{batch:>11.1f}{wrong:>11}")
+
+
+if __name__ == "__main__":
+    main()
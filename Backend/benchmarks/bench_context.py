@@ -0,0 +1,137 @@
+"""
+Per-turn latency over long conversations: unbounded history vs. message-count trim vs.
+the token-budget compactor (ContextBudget).
+
+The chat is fake_llm's scripted model driving stub tools with realistic payload sizes
+(order history ~20 rows of JSON, policy excerpts). Model latency is simulated from the
+prompt size the real API would receive: --base-ms per turn + --ms-per-1k-tokens of
+prefill, since that is what grows with history. Compaction time is measured for real
+and added to each turn.
+
+Run from Backend/:  python benchmarks/bench_context.py [--turns 300 --max-tokens 4000]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fake_llm import FakeGenerativeModel, Content, Part, FunctionResponse
+from sessions import SessionManager
+from context_budget import ContextBudget, history_tokens, COMPACTED_MARKER
+
+UTTERANCES = [
+    "show my order history",
+    "what is the status of O0042?",
+    "what is your refund policy?",
+    "show me running shoes under 100",
+    "cancel order O0017",
+    "how long does shipping take?",
+    "where are my headphones?",
+    "thanks!",
+]
+
+
+# --- STUB TOOLS (payload sizes like the real ones) ---
+def _order(i, status="Shipped"):
+    return {"order_id": f"O{i:04d}", "product_name": f"Product {i}", "quantity": 1,
+            "price": 49.99 + i, "order_status": status, "order_date": "2025-11-02"}
+
+
+def get_order_history():
+    return json.dumps([_order(i, ["Shipped", "Delivered", "Processing"][i % 3]) for i in range(1, 21)])
+
+
+def check_order_status(order_id):
+    return json.dumps([_order(int(order_id[1:]))])
+
+
+def cancel_order(order_id):
+    return json.dumps([_order(int(order_id[1:]), "Cancelled")])
+
+
+def initiate_return(order_id):
+    return f"Return started for {order_id}."
+
+
+def find_orders_by_description(description):
+    return json.dumps([_order(i) for i in (3, 8, 11)])
+
+
+def get_policy_info(question):
+    return ("Refunds are issued to the original payment method within 5-7 business days. " * 12).strip()
+
+
+def search_products(query):
+    return json.dumps([{"product_name": f"{query} {i}", "price": 20.0 + i, "rating": 4.2} for i in range(8)])
+
+
+TOOLS = [get_order_history, check_order_status, cancel_order, initiate_return,
+         find_orders_by_description, get_policy_info, search_products]
+
+
+def build_budget(max_tokens):
+    return ContextBudget(
+        make_content=Content,
+        text_part=lambda text: Part(text=text),
+        tool_part=lambda name, result: Part(function_response=FunctionResponse(name, {"result": result})),
+        max_tokens=max_tokens,
+    )
+
+
+def run(mode, args):
+    model = FakeGenerativeModel(tools=TOOLS)
+    if mode == "none":
+        manager = SessionManager(lambda c: model.start_chat(enable_automatic_function_calling=True), max_history=10**9)
+    elif mode == "count":
+        manager = SessionManager(lambda c: model.start_chat(enable_automatic_function_calling=True), max_history=40)
+    else:
+        manager = SessionManager(lambda c: model.start_chat(enable_automatic_function_calling=True),
+                                 max_history=40, context=build_budget(args.max_tokens))
+
+    session = manager.get("bench", "C0001")
+    rows = []
+    for turn in range(args.turns):
+        text = UTTERANCES[turn % len(UTTERANCES)]
+        prompt_tokens = history_tokens(session.chat.history) + len(text) // 4 + 1
+        session.chat.send_message(text)
+
+        # The newest exchange must stay intact for process_user_input's history[-2] read
+        last = session.chat.history[-2].parts[0]
+        full_payload = last.function_response and not str(last.function_response.response["result"]).startswith(COMPACTED_MARKER)
+
+        start = time.perf_counter()
+        manager.trim(session)
+        compact_ms = (time.perf_counter() - start) * 1000
+        if full_payload:
+            after = session.chat.history[-2].parts[0].function_response.response["result"]
+            assert not str(after).startswith(COMPACTED_MARKER), "latest tool payload was compacted"
+
+        model_ms = args.base_ms + args.ms_per_1k_tokens * prompt_tokens / 1000
+        rows.append((prompt_tokens, model_ms + compact_ms, compact_ms))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=300)
+    parser.add_argument("--max-tokens", type=int, default=4000)
+    parser.add_argument("--base-ms", type=float, default=400.0, help="fixed model latency per turn")
+    parser.add_argument("--ms-per-1k-tokens", type=float, default=60.0, help="prefill cost per 1k prompt tokens")
+    args = parser.parse_args()
+
+    checkpoints = [t for t in (10, 50, 100, 200, 500, 1000) if t < args.turns] + [args.turns]
+    print(f"{args.turns} turns, model {args.base_ms:.0f} ms + {args.ms_per_1k_tokens:.0f} ms/1k prompt tokens\n")
+    print(f"{'mode':8}" + "".join(f"{'turn ' + str(t):>16}" for t in checkpoints) + f"{'p50':>10}{'p95':>10}{'compact p95':>14}")
+    for mode in ("none", "count", "budget"):
+        rows = run(mode, args)
+        cells = "".join(f"{rows[t - 1][0]:>8} tok {rows[t - 1][1]:>3.0f}ms" for t in checkpoints)
+        latencies = sorted(r[1] for r in rows)
+        compact = sorted(r[2] for r in rows)
+        p = lambda xs, q: xs[min(int(len(xs) * q), len(xs) - 1)]
+        print(f"{mode:8}{cells}{p(latencies, 0.5):>8.0f}ms{p(latencies, 0.95):>8.0f}ms{p(compact, 0.95):>11.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""
+Offline end-to-end benchmark: WAV corpus -> transcribe -> process_user_input -> TTS.
+
+No microphone, Gemini key or network:
+- each .wav in --corpus replaces record_manual_api (16-bit, any rate, resampled to 16 kHz)
+- the brain runs with FAKE_LLM=1: fake_llm's scripted model issues deterministic
+  function calls against the REAL tools, orders, indexes and caches
+- speech goes through the real SpeechPipeline into the stub backend and a silent NullPlayer
+- orders are served from a temp copy of the order database, so cancels/returns in the
+  corpus don't touch the working data and every run starts from the same state
+
+Per-stage latencies come from the tracing spans (asr, intent_router, llm, tool:<name>,
+context_trim, tts, ...) plus the whole turn and time-to-first-audio.
+
+ASR: --asr whisper (default) runs main.transcribe; --asr reference skips Whisper and uses
+the sidecar transcript <clip>.txt next to each WAV (machines without faster-whisper).
+--synthesize generates the corpus with synth_corpus.py (speech-like audio + transcripts)
+and defaults to --asr reference, so it runs from a clean checkout.
+
+Tracking changes:
+  python benchmarks/bench_e2e.py --corpus wavs/ --out baseline.json
+  python benchmarks/bench_e2e.py --corpus wavs/ --baseline baseline.json --threshold 0.15
+The second form exits with status 1 if any stage's p50/p95 got slower by more than the
+threshold (and by more than --min-delta-ms), or throughput dropped by more than it.
+
+Run from Backend/:  python benchmarks/bench_e2e.py --corpus path/to/wavs [--workers 4 --repeat 3]
+               or:  python benchmarks/bench_e2e.py --synthesize
+"""
+import os
+import sys
+import glob
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import scipy.io.wavfile as wav
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def load_clip(path):
+    from audio_ingest import PCMDecoder
+    rate, data = wav.read(path)
+    if data.ndim > 1:
+        data = data[:, 0]
+    return PCMDecoder(sample_rate=rate).feed(data.astype("<i2").tobytes())
+
+
+def load_corpus(directory, need_reference):
+    corpus = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.wav"))):
+        reference_path = os.path.splitext(path)[0] + ".txt"
+        reference = None
+        if os.path.exists(reference_path):
+            with open(reference_path, encoding="utf-8") as f:
+                reference = f.read().strip()
+        elif need_reference:
+            sys.exit(f"--asr reference needs {reference_path}")
+        corpus.append((os.path.basename(path), load_clip(path), reference))
+    if not corpus:
+        sys.exit(f"No .wav files in {directory}")
+    return corpus
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(int(len(values) * q), len(values) - 1)]
+
+
+def word_error_rate(reference, hypothesis):
+    ref, hyp = reference.lower().split(), hypothesis.lower().split()
+    row = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        previous, row[0] = row[0], i
+        for j, h in enumerate(hyp, 1):
+            previous, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, previous + (r != h))
+    return row[-1] / max(len(ref), 1)
+
+
+class Harness:
+    def __init__(self, args):
+        # The brain reads these at import time
+        os.environ["FAKE_LLM"] = "1"
+        os.environ["FAKE_LLM_FIRST_TOKEN_S"] = str(args.llm_first_token_ms / 1000)
+        os.environ["FAKE_LLM_CHUNK_S"] = str(args.llm_chunk_ms / 1000)
+        os.environ["TRACING"] = "1"
+        os.environ.setdefault("RESOURCE_WATCH_S", "0")
+        import ai
+        from tracing import tracer
+        from tts import SpeechPipeline, StubTTSBackend, NullPlayer
+
+        self.workdir = tempfile.mkdtemp(prefix="bench_e2e_")
+        ai.copy_ord_path = os.path.join(self.workdir, os.path.basename(ai.copy_ord_path))
+        self.ai = ai
+        self.tracer = tracer
+        self.transcribe = self._reference_asr
+        if args.asr == "whisper":
+            import main
+            self.transcribe = lambda clip, reference: main.transcribe(clip)
+        self.make_speech = lambda: SpeechPipeline(
+            StubTTSBackend(first_chunk_s=args.tts_first_chunk_ms / 1000, per_char_s=0.0), NullPlayer()
+        )
+        self._speech = threading.local()
+
+    def _reference_asr(self, clip, reference):
+        with self.tracer.span("asr"):
+            return reference
+
+    def start(self):
+        start = time.perf_counter()
+        self.ai.startup.start()
+        for name in self.ai.startup.report()["resources"]:
+            self.ai.startup.get(name, default=None)
+        return time.perf_counter() - start
+
+    def turn(self, name, clip, reference, session_id):
+        speech = getattr(self._speech, "pipeline", None)
+        if speech is None:
+            speech = self._speech.pipeline = self.make_speech()
+        with self.tracer.trace("e2e") as trace:
+            user_text = self.transcribe(clip, reference)
+            with self.tracer.span("brain"):
+                response = self.ai.process_user_input(user_text, session_id=session_id)
+            spoken_at = len(speech.player.started_at)
+            tts_start = time.perf_counter()
+            if response.get("bot_text"):
+                with self.tracer.span("tts"):
+                    asyncio.run(speech.speak(response["bot_text"]))
+            first_audio = speech.player.started_at[spoken_at] - tts_start if len(speech.player.started_at) > spoken_at else None
+        spans = self.tracer.get(trace.trace_id)["spans"]
+        return {
+            "clip": name,
+            "user_text": user_text,
+            "bot_text": response.get("bot_text", ""),
+            "wer": word_error_rate(reference, user_text) if reference is not None else None,
+            "turn_ms": trace.duration_ms,
+            "first_audio_ms": first_audio * 1000 if first_audio is not None else None,
+            "spans": spans,
+        }
+
+    def close(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+def stage_latencies(turns):
+    """stage -> [ms per turn]; repeated spans in a turn (several tool calls) are summed."""
+    stages = {"turn": [t["turn_ms"] for t in turns]}
+    first_audio = [t["first_audio_ms"] for t in turns if t["first_audio_ms"] is not None]
+    if first_audio:
+        stages["tts_first_audio"] = first_audio
+    for t in turns:
+        per_turn = {}
+        for span in t["spans"]:
+            stage = f"tool:{span['tool']}" if span["span"] == "tool" else span["span"]
+            if span.get("mode"):
+                stage += f"/{span['mode']}"
+            per_turn[stage] = per_turn.get(stage, 0.0) + span["duration_ms"]
+        for stage, ms in per_turn.items():
+            stages.setdefault(stage, []).append(ms)
+    return stages
+
+
+def summarize(turns, wall_s, load_s):
+    stages = {
+        stage: {
+            "n": len(ms),
+            "mean": sum(ms) / len(ms),
+            "p50": percentile(ms, 0.5),
+            "p95": percentile(ms, 0.95),
+            "p99": percentile(ms, 0.99),
+        }
+        for stage, ms in stage_latencies(turns).items()
+    }
+    wers = [t["wer"] for t in turns if t["wer"] is not None]
+    return {
+        "turns": len(turns),
+        "wall_s": wall_s,
+        "startup_s": load_s,
+        "throughput_tps": len(turns) / wall_s if wall_s else 0.0,
+        "wer": sum(wers) / len(wers) if wers else None,
+        "stages": stages,
+        "replies": {t["clip"]: t["bot_text"] for t in turns},
+    }
+
+
+def report(summary):
+    print(f"\nturns {summary['turns']}  wall {summary['wall_s']:.2f}s  "
+          f"throughput {summary['throughput_tps']:.2f} turns/s  startup {summary['startup_s']:.2f}s"
+          + (f"  WER {summary['wer']:.1%}" if summary["wer"] is not None else ""))
+    print(f"\n{'stage':<34}{'n':>6}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage, s in sorted(summary["stages"].items(), key=lambda kv: -kv[1]["p50"]):
+        print(f"{stage:<34}{s['n']:>6}{s['mean']:>10.1f}{s['p50']:>10.1f}{s['p95']:>10.1f}{s['p99']:>10.1f}")
+
+
+def compare(summary, baseline, threshold, min_delta_ms):
+    """Regression messages (empty list = within threshold)."""
+    regressions = []
+    for stage, old in baseline["stages"].items():
+        new = summary["stages"].get(stage)
+        if new is None:
+            continue
+        for q in ("p50", "p95"):
+            if new[q] > old[q] * (1 + threshold) and new[q] - old[q] > min_delta_ms:
+                regressions.append(f"{stage} {q}: {old[q]:.1f} -> {new[q]:.1f} ms (+{new[q] / max(old[q], 1e-9) - 1:.0%})")
+    if summary["throughput_tps"] < baseline["throughput_tps"] * (1 - threshold):
+        regressions.append(f"throughput: {baseline['throughput_tps']:.2f} -> {summary['throughput_tps']:.2f} turns/s")
+    drift = [clip for clip, text in baseline.get("replies", {}).items()
+             if clip in summary["replies"] and summary["replies"][clip] != text]
+    if drift:
+        print(f"\nnote: {len(drift)} replies differ from the baseline (e.g. {drift[0]}); latencies may not be comparable")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", help="directory of .wav utterances (optional <clip>.txt transcripts)")
+    parser.add_argument("--synthesize", action="store_true", help="generate a synthetic corpus instead")
+    parser.add_argument("--asr", choices=["whisper", "reference"], help="default: whisper, reference with --synthesize")
+    parser.add_argument("--repeat", type=int, default=1, help="passes over the corpus")
+    parser.add_argument("--warmup", type=int, default=1, help="unmeasured passes first (lazy loads, caches)")
+    parser.add_argument("--workers", type=int, default=1, help="concurrent conversations")
+    parser.add_argument("--llm-first-token-ms", type=float, default=0.0, help="simulated model latency")
+    parser.add_argument("--llm-chunk-ms", type=float, default=0.0)
+    parser.add_argument("--tts-first-chunk-ms", type=float, default=0.0, help="simulated synthesis latency")
+    parser.add_argument("--out", help="write the results JSON here (use as a later --baseline)")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed relative slowdown")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="ignore smaller absolute slowdowns")
+    args = parser.parse_args()
+    if args.asr is None:
+        args.asr = "reference" if args.synthesize else "whisper"
+    if args.synthesize:
+        from synth_corpus import write_corpus
+        args.corpus = tempfile.mkdtemp(prefix="bench_e2e_corpus_")
+        write_corpus(args.corpus)
+    elif not args.corpus:
+        parser.error("pass --corpus DIR or --synthesize")
+
+    corpus = load_corpus(args.corpus, need_reference=args.asr == "reference")
+    if args.synthesize:
+        shutil.rmtree(args.corpus, ignore_errors=True)   # clips are in memory now
+    harness = Harness(args)
+    try:
+        load_s = harness.start()
+        for _ in range(args.warmup):
+            for name, clip, reference in corpus:
+                harness.turn(name, clip, reference, session_id="warmup")
+
+        # One conversation per worker thread
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            turns = list(pool.map(
+                lambda item: harness.turn(*item, session_id=f"bench-{threading.get_ident()}"), corpus * args.repeat
+            ))
+        summary = summarize(turns, time.perf_counter() - start, load_s)
+    finally:
+        harness.close()
+
+    report(summary)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        print(f"\nresults -> {args.out}")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(summary, json.load(f), args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"\nREGRESSION (threshold {args.threshold:.0%}):")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nno regression vs {args.baseline} (threshold {args.threshold:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Hot reload under load: query threads hammer the catalog tools while the catalog
+and both FAISS/BM25 indexes are reloaded and swapped repeatedly.
+
+Reports build/swap time per reload, tool latency with and without reloads running,
+and the number of failed queries (must be 0).
+
+Run from Backend/ (needs the sentence-transformers model; no Gemini key):
+    python benchmarks/bench_hot_reload.py [--reloads 5] [--threads 8]
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+import statistics
+
+os.environ.setdefault("FAKE_LLM", "1")
+os.environ.setdefault("RESOURCE_WATCH_S", "0")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import ai
+
+QUERIES = [
+    (ai.search_products, {"query": "wireless headphones"}),
+    (ai.search_products, {"query": "luma monitor", "max_price": 500}),
+    (ai.get_policy_info, {"question": "how long do refunds take"}),
+    (ai.get_policy_info, {"question": "is shipping free"}),
+]
+FAILURES = ("unavailable", "Tool error")
+
+
+def hammer(stop, latencies, errors):
+    i = 0
+    while not stop.is_set():
+        tool, args = QUERIES[i % len(QUERIES)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            result = tool(**args)
+            if any(f in result for f in FAILURES):
+                errors.append(result)
+        except Exception as e:
+            errors.append(repr(e))
+        latencies.append((time.perf_counter() - start) * 1000)
+
+
+def run(threads, seconds, reloads):
+    stop = threading.Event()
+    latencies, errors = [], []
+    workers = [threading.Thread(target=hammer, args=(stop, latencies, errors)) for _ in range(threads)]
+    for w in workers:
+        w.start()
+
+    versions = []
+    if reloads:
+        for _ in range(reloads):
+            snapshot = ai.reload_catalog()
+            versions.append((snapshot.version, snapshot.build_ms, ai.catalog.metrics()["last_swap_ms"]))
+    else:
+        time.sleep(seconds)
+    stop.set()
+    for w in workers:
+        w.join()
+    return latencies, errors, versions
+
+
+def pct(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reloads", type=int, default=5)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--baseline-s", type=float, default=5.0)
+    args = parser.parse_args()
+
+    base, base_errors, _ = run(args.threads, args.baseline_s, 0)
+    during, errors, versions = run(args.threads, 0, args.reloads)
+
+    print(f"{'version':>8} {'build ms':>10} {'swap ms':>10}")
+    for version, build_ms, swap_ms in versions:
+        print(f"{version:>8} {build_ms:>10.1f} {swap_ms:>10.4f}")
+    print(f"\n{'':<16} {'queries':>8} {'p50 ms':>8} {'p99 ms':>8} {'failed':>7}")
+    print(f"{'no reload':<16} {len(base):>8} {statistics.median(base):>8.2f} {pct(base, 0.99):>8.2f} {len(base_errors):>7}")
+    print(f"{'during reloads':<16} {len(during):>8} {statistics.median(during):>8.2f} {pct(during, 0.99):>8.2f} {len(errors):>7}")
+    for e in errors[:5]:
+        print("   ", e[:120])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Index startup: pickle (FAISS.load_local) vs. mmap + lazy docstore (index_store.load_index),
+each with the BM25 index that ai.load_catalog loads next to it:
+- pickle: bm25.json with every document's text + metadata inlined (the earlier format),
+  materialized as Documents at load
+- mmap: row-keyed postings only (retrieval.load_bm25); hits are read via the LazyDocstore
+
+Builds synthetic corpora (384-d vectors, ~500-char chunks like build-rag.py makes),
+writes each in both formats, then loads each in a fresh process and reports load time
+(FAISS + BM25, BM25 alone in its own column), first-query time (dense + BM25) and
+resident memory. RssAnon is private to the process; RssFile is
+page cache that every worker mapping the same files shares.
+
+Run from Backend/ (Linux, reads /proc):  python benchmarks/bench_index_load.py [--docs 10000 100000]
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+
+import numpy as np
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+DIM = 384
+
+LOADER = r"""
+import os, sys, time, json
+sys.path.insert(0, {backend!r})
+import numpy as np
+from langchain_core.embeddings import FakeEmbeddings
+
+def rss():
+    fields = {{}}
+    with open("/proc/self/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("VmRSS", "RssAnon", "RssFile"):
+                fields[key] = int(value.split()[0]) / 1024
+    return fields
+
+from langchain_core.documents import Document
+from langchain_community.vectorstores import FAISS
+import index_store
+from retrieval import BM25Index, load_bm25
+embeddings = FakeEmbeddings(size={dim})
+before = rss()
+start = time.perf_counter()
+if {fmt!r} == "pickle":
+    store = FAISS.load_local({path!r}, embeddings, allow_dangerous_deserialization=True)
+    bm25_start = time.perf_counter()
+    with open(os.path.join({path!r}, "bm25.json"), encoding="utf-8") as f:
+        payload = json.load(f)
+    docs = [Document(page_content=d["page_content"], metadata=d["metadata"]) for d in payload["docs"]]
+    bm25 = BM25Index(docs.__getitem__, payload["postings"], payload["doc_len"], k1=payload["k1"], b=payload["b"])
+else:
+    store = index_store.load_index({path!r}, embeddings)
+    bm25_start = time.perf_counter()
+    bm25 = load_bm25({path!r}, store)
+bm25_ms = (time.perf_counter() - bm25_start) * 1000
+load_ms = (time.perf_counter() - start) * 1000
+start = time.perf_counter()
+store.similarity_search_by_vector(np.random.rand({dim}).tolist(), k=4)
+bm25.search("refund warranty battery", 4)
+query_ms = (time.perf_counter() - start) * 1000
+after = rss()
+print(json.dumps({{"load_ms": load_ms, "bm25_ms": bm25_ms, "query_ms": query_ms,
+                  **{{k: after[k] - before.get(k, 0) for k in after}}}}))
+"""
+
+
+def build(n, root):
+    import faiss
+    from langchain_core.documents import Document
+    from langchain_core.embeddings import FakeEmbeddings
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from langchain_community.vectorstores import FAISS
+    from index_store import save_index
+    from retrieval import BM25Index
+
+    rng = np.random.default_rng(0)
+    index = faiss.IndexFlatL2(DIM)
+    index.add(rng.random((n, DIM), dtype=np.float32))
+    words = ["return", "refund", "shipping", "warranty", "battery", "screen", "order", "policy"]
+    docs, ids = {}, {}
+    for i in range(n):
+        text = " ".join(rng.choice(words, 70))
+        docs[f"doc-{i}"] = Document(page_content=text, metadata={"source": "faq", "product": f"Product {i % 500}"})
+        ids[i] = f"doc-{i}"
+    store = FAISS(FakeEmbeddings(size=DIM), index, InMemoryDocstore(docs), ids)
+
+    pickle_dir, mmap_dir = os.path.join(root, f"pickle_{n}"), os.path.join(root, f"mmap_{n}")
+    store.save_local(pickle_dir)
+    save_index(store, mmap_dir)
+
+    bm25 = BM25Index.from_documents(docs[ids[i]] for i in range(n))
+    bm25.save(mmap_dir)
+    with open(os.path.join(mmap_dir, "bm25.json"), encoding="utf-8") as f:
+        legacy = json.load(f)
+    legacy["docs"] = [{"page_content": docs[ids[i]].page_content, "metadata": docs[ids[i]].metadata} for i in range(n)]
+    with open(os.path.join(pickle_dir, "bm25.json"), "w", encoding="utf-8") as f:
+        json.dump(legacy, f)
+    return pickle_dir, mmap_dir
+
+
+def measure(fmt, path, repeats=3):
+    runs = []
+    for _ in range(repeats):
+        code = LOADER.format(backend=BACKEND, dim=DIM, fmt=fmt, path=path)
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return {k: float(np.median([r[k] for r in runs])) for k in runs[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, nargs="+", default=[10_000, 100_000])
+    args = parser.parse_args()
+
+    print(f"{'docs':>8} {'format':>7} {'load ms':>9} {'bm25 ms':>8} {'1st query ms':>13} {'RSS MB':>8} {'anon MB':>8} {'file MB':>8}")
+    with tempfile.TemporaryDirectory() as root:
+        for n in args.docs:
+            pickle_dir, mmap_dir = build(n, root)
+            for fmt, path in (("pickle", pickle_dir), ("mmap", mmap_dir)):
+                r = measure(fmt, path)
+                print(f"{n:>8} {fmt:>7} {r['load_ms']:>9.1f} {r['bm25_ms']:>8.1f} {r['query_ms']:>13.1f} "
+                      f"{r['VmRSS']:>8.1f} {r['RssAnon']:>8.1f} {r['RssFile']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
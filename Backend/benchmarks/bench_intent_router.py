@@ -0,0 +1,135 @@
+"""
+Intent router accuracy + latency on a labeled utterance set.
+
+Each utterance is labeled with the tool + order id the router should call directly,
+or None when it must fall back to the LLM (questions, negations, multi-intent, chit-chat).
+cancel_order is irreversible, so every question about cancelling ("cancel O0042?",
+"can you cancel O0042") is labeled None as well.
+A wrong direct call is the expensive mistake, so "wrong routes" is reported separately.
+
+Latency saved = routed utterances x (one LLM turn - router time). An automatic
+function-calling turn is two model round trips; pass your measured number via --llm-ms.
+
+Run from Backend/:  python benchmarks/bench_intent_router.py [--llm-ms 1200]
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from intent_router import IntentRouter
+
+C, S, H = "cancel_order", "check_order_status", "get_order_history"
+
+LABELED = [
+    # --- should route ---
+    ("cancel order O0042", C, "O0042"),
+    ("Cancel order O0042.", C, "O0042"),
+    ("please cancel my order O0042", C, "O0042"),
+    ("I want to cancel O 0042", C, "O0042"),
+    ("I'd like to cancel order number O0042", C, "O0042"),
+    ("hey, please cancel O0042 for me, thanks", C, "O0042"),
+    ("Cancel order O0042!", C, "O0042"),
+    ("cancel O-0042", C, "O0042"),
+    ("status of O0017", S, "O0017"),
+    ("What's the status of order O0017?", S, "O0017"),
+    ("what is the status of my order O0017", S, "O0017"),
+    ("check the status of O0017", S, "O0017"),
+    ("where is my order O0017?", S, "O0017"),
+    ("where's O0017", S, "O0017"),
+    ("track order O0017", S, "O0017"),
+    ("track my order o 17", S, "O17"),
+    ("order O0017 status", S, "O0017"),
+    ("tell me the status for O0017 please", S, "O0017"),
+    ("show my orders", H, None),
+    ("Show me my orders.", H, None),
+    ("show me all my past orders", H, None),
+    ("list my previous orders", H, None),
+    ("my order history", H, None),
+    ("show me my order history please", H, None),
+    ("order history", H, None),
+    ("can you show me my recent orders", H, None),
+    ("what's my order history?", H, None),
+    ("get my orders", H, None),
+    # --- must fall back to the LLM ---
+    ("don't cancel order O0042", None, None),
+    # questions about a cancel must never cancel
+    ("cancel order O0042?", None, None),
+    ("Cancel O0042 for me?", None, None),
+    ("can you cancel order o0042 please", None, None),
+    ("could you cancel O0042?", None, None),
+    ("hey, could you cancel O0042 for me, thanks", None, None),
+    ("should I cancel O0042", None, None),
+    ("is it too late to cancel O0042?", None, None),
+    ("do I need to cancel O0042 first?", None, None),
+    ("cancel O0042 or keep it?", None, None),
+    ("cancel order O0042 maybe", None, None),
+    ("what happens if I cancel O0042", None, None),
+    ("cancelled O0042", None, None),
+    ("not sure, cancel O0042?", None, None),
+    ("why was O0042 cancelled?", None, None),
+    ("can I cancel O0042 if it already shipped?", None, None),
+    ("cancel O0042 and O0043", None, None),
+    ("cancel my last order", None, None),
+    ("cancel order O0042 and return O0017", None, None),
+    ("how do I cancel an order", None, None),
+    ("what is your cancellation policy", None, None),
+    ("where is my order", None, None),
+    ("where are my headphones?", None, None),
+    ("status of my refund", None, None),
+    ("show me red shoes", None, None),
+    ("show me my orders from last month", None, None),
+    ("show my orders that were delivered", None, None),
+    ("I want to return O0042", None, None),
+    ("when will O0017 arrive", None, None),
+    ("is O0017 delayed?", None, None),
+    ("hello", None, None),
+    ("thanks, that's all", None, None),
+    ("force update O0042 to delivered", None, None),
+    ("never mind, don't show my orders", None, None),
+    ("what is the status of the laptop I ordered", None, None),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--llm-ms", type=float, default=1200.0, help="cost of one LLM turn with a tool call")
+    args = parser.parse_args()
+
+    router = IntentRouter()
+    correct = wrong_route = missed = 0
+    routed = 0
+    latencies = []
+    for text, tool, order_id in LABELED:
+        start = time.perf_counter()
+        route = router.route(text)
+        latencies.append((time.perf_counter() - start) * 1e6)
+
+        got = (route.tool, route.args.get("order_id")) if route else (None, None)
+        if got == (tool, order_id):
+            correct += 1
+        elif route is not None:
+            wrong_route += 1
+            print(f"   WRONG  {text!r} -> {got}, expected {(tool, order_id)}")
+        else:
+            missed += 1
+            print(f"   MISSED {text!r}, expected {(tool, order_id)}")
+        routed += route is not None
+
+    routable = sum(1 for _, tool, _ in LABELED if tool)
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[int(len(latencies) * 0.99)]
+    print(f"\nutterances          {len(LABELED)} ({routable} routable)")
+    print(f"accuracy            {correct / len(LABELED):.1%}")
+    print(f"coverage            {(routed - wrong_route) / routable:.1%} of routable handled locally")
+    print(f"wrong routes        {wrong_route}")
+    print(f"missed (-> LLM)     {missed}")
+    print(f"router latency      p50 {p50:.0f} us, p99 {p99:.0f} us")
+    saved = (routed - wrong_route) * (args.llm_ms - p50 / 1000)
+    print(f"latency saved       {saved / 1000:.1f} s over the set ({saved / len(LABELED):.0f} ms per utterance at {args.llm_ms:.0f} ms/turn)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+Order representation at scale: load time, memory and product lookups for
+- legacy: orders_df with `products` dict lists, the previous OrderStore indexes (order_id,
+  customer_id) + searchable_orders = explode('products') + .apply(product_name), probed
+  with a boolean mask over every line item
+- columnar: OrderStore (categorical columns, CSR LineItems, product_name -> orders index)
+
+A synthetic order_database.json (1-3 items per order) is written once; each variant loads
+it with pd.read_json in its own process, so peak/resident memory are measured separately.
+"live MB" counts what the structures hold; RSS stays higher for columnar because the
+allocator keeps most of the freed parse objects (reused by later allocations).
+
+Run from Backend/:  python benchmarks/bench_order_columns.py [--items 10000000 --probes 200]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import subprocess
+
+import numpy as np
+import pandas as pd
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+STATUSES = ["Placed", "Processing", "Shipped", "Delivered", "Cancelled", "Return Requested"]
+
+
+def write_orders(path, items, products, seed=0):
+    """Orders until `items` line items; returns (orders, customers)."""
+    rng = np.random.default_rng(seed)
+    customers = max(1, items // 40)
+    dates = pd.date_range("2023-01-01", periods=730).strftime("%Y-%m-%d").tolist()
+    written, n = 0, 0
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[")
+        while written < items:
+            chunk = []
+            for _ in range(10_000):
+                if written >= items:
+                    break
+                count = min(int(rng.integers(1, 4)), items - written)
+                picks = rng.integers(0, products, count)
+                chunk.append(json.dumps({
+                    "order_id": f"O{n:08d}",
+                    "customer_id": f"C{int(rng.integers(0, customers)):06d}",
+                    "products": [{"product_id": f"P{p:05d}", "product_name": f"Product {p} Deluxe Edition"} for p in picks],
+                    "order_status": STATUSES[int(rng.integers(0, len(STATUSES)))],
+                    "order_date": dates[int(rng.integers(0, len(dates)))],
+                }))
+                written += count
+                n += 1
+            f.write(("," if n > len(chunk) else "") + ",".join(chunk))
+        f.write("]")
+    return n, customers
+
+
+def legacy_indexes(df):
+    """The previous OrderStore._build_indexes: order_id -> position, customer -> positions."""
+    by_id, by_customer = {}, {}
+    for pos, oid in enumerate(df['order_id'].astype(str).tolist()):
+        by_id.setdefault(oid, pos)
+    dates = pd.to_datetime(df['order_date'])
+    customers = df['customer_id'].tolist()
+    for pos in dates.sort_values(ascending=False, kind="stable").index.tolist():
+        by_customer.setdefault(customers[pos], []).append(pos)
+    return by_id, by_customer
+
+
+def legacy_live_bytes(orders_df, searchable_orders, by_id, by_customer):
+    """Frames + item dicts (counted once: explode shares them) + indexes."""
+    items = sum(sys.getsizeof(item) + sum(sys.getsizeof(v) for v in item.values())
+                for products in orders_df['products'] for item in products)
+    shared = ['products', 'product_name']   # references to the item dicts / their name strings
+    return (int(orders_df.memory_usage(deep=True).sum()) + items
+            + int(searchable_orders.drop(columns=shared).memory_usage(deep=True).sum())
+            + 8 * len(shared) * len(searchable_orders)
+            + sys.getsizeof(by_id) + sum(sys.getsizeof(k) for k in by_id)
+            + sys.getsizeof(by_customer) + sum(sys.getsizeof(v) + 28 * len(v) for v in by_customer.values()))
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return float("nan")
+
+
+def peak_mb():
+    # ru_maxrss: kilobytes on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def child(variant, path, probes, customers, products):
+    import gc
+    base = rss_mb()
+    start = time.perf_counter()
+    orders_df = pd.read_json(path)
+    read_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if variant == "legacy":
+        by_id, by_customer = legacy_indexes(orders_df)
+        searchable_orders = orders_df.explode('products')
+        searchable_orders['product_name'] = searchable_orders['products'].apply(
+            lambda x: x.get('product_name') if isinstance(x, dict) else None)
+
+        def probe(name, customer):
+            matches = searchable_orders[
+                (searchable_orders['product_name'] == name) & (searchable_orders['customer_id'] == customer)]
+            return matches[['order_id', 'order_status', 'product_name', 'order_date']].to_dict(orient="records")
+    else:
+        from order_store import OrderStore
+        store = OrderStore(orders_df)
+        del orders_df
+
+        def probe(name, customer):
+            positions = store.product_positions(name, customer_id=customer)
+            return store.values(positions, ['order_id', 'order_status', 'order_date'])
+    build_s = time.perf_counter() - start
+    gc.collect()
+    resident = rss_mb() - base
+
+    rng = np.random.default_rng(1)
+    queries = [(f"Product {int(rng.integers(0, products))} Deluxe Edition", f"C{int(rng.integers(0, customers)):06d}")
+               for _ in range(probes)]
+    start = time.perf_counter()
+    probe(*queries[0])   # first probe builds the columnar reverse index
+    first_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    hits = sum(len(probe(*q)) for q in queries)
+    probe_us = (time.perf_counter() - start) * 1e6 / probes
+
+    if variant == "legacy":
+        live = legacy_live_bytes(orders_df, searchable_orders, by_id, by_customer)
+    else:
+        live = store.memory_usage()
+    print(json.dumps({
+        "read_s": read_s, "build_s": build_s, "live_mb": live / 2**20, "resident_mb": resident,
+        "peak_mb": peak_mb() - base, "first_probe_ms": first_ms, "probe_us": probe_us, "hits": hits,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=10_000_000, help="line items (orders hold 1-3 each)")
+    parser.add_argument("--products", type=int, default=2_000, help="distinct product names")
+    parser.add_argument("--probes", type=int, default=200)
+    parser.add_argument("--variants", nargs="+", choices=["legacy", "columnar"], default=["legacy", "columnar"])
+    parser.add_argument("--child", choices=["legacy", "columnar"], help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    parser.add_argument("--customers", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return child(args.child, args.path, args.probes, args.customers, args.products)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "order_database.json")
+        start = time.perf_counter()
+        orders, customers = write_orders(path, args.items, args.products)
+        print(f"{args.items:,} line items in {orders:,} orders, {customers:,} customers, {args.products:,} products "
+              f"({os.path.getsize(path) / 2**20:.0f} MB JSON, written in {time.perf_counter() - start:.0f}s)\n")
+
+        print(f"{'variant':<10}{'read_json s':>12}{'build s':>9}{'live MB':>9}{'RSS MB':>8}{'peak MB':>9}"
+              f"{'1st probe ms':>14}{'probe us':>10}{'hits':>7}")
+        for variant in args.variants:
+            out = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child", variant, "--path", path,
+                 "--probes", str(args.probes), "--customers", str(customers), "--products", str(args.products)],
+                capture_output=True, text=True, cwd=BACKEND,
+            )
+            if out.returncode != 0:
+                print(f"{variant:<10} failed (exit {out.returncode}{', out of memory?' if out.returncode < 0 else ''})"
+                      f"\n{out.stderr.strip()[-500:]}")
+                continue
+            r = json.loads(out.stdout.strip().splitlines()[-1])
+            print(f"{variant:<10}{r['read_s']:>12.1f}{r['build_s']:>9.2f}{r['live_mb']:>9.0f}{r['resident_mb']:>8.0f}"
+                  f"{r['peak_mb']:>9.0f}{r['first_probe_ms']:>14.1f}{r['probe_us']:>10.0f}{r['hits']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Concurrent order mutations: hundreds of threads hitting the same orders.
+
+- racing cancels: every order starts "Processing" and --racers threads try to cancel it at
+  once; exactly one of them may succeed per order
+- read-modify-write: threads bump a per-order counter kept in order_status ("Step N"),
+  retrying on a version conflict; the final N must equal the number of committed bumps
+
+"unsafe" is the previous tool code (status() check, then set_status()); "transition" is
+OrderStore.transition (rule / expected version checked atomically with the write).
+Afterwards the store is reopened from the snapshot + journal and must match memory.
+Exits with status 1 if the transition path loses an update or lets a second cancel through.
+
+Run from Backend/:  python benchmarks/bench_order_concurrency.py [--orders 50 --racers 8 --bumps 400]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from order_store import OrderStore, can_cancel
+from order_journal import OrderJournal
+
+
+def make_orders(n):
+    return pd.DataFrame({
+        "order_id": [f"O{i:05d}" for i in range(n)],
+        "customer_id": [f"C{i % 7:04d}" for i in range(n)],
+        "products": [[{"product_id": "P1001", "product_name": "Luma Monitor Pro"}]] * n,
+        "order_status": ["Processing"] * n,
+        "order_date": ["2025-03-25"] * n,
+    })
+
+
+def open_store(snapshot):
+    return OrderStore(pd.read_json(snapshot), journal=OrderJournal(snapshot, compact_every=250))
+
+
+def cancel(store, pos, mode):
+    if mode == "unsafe":
+        if not can_cancel(store.status(pos)):
+            return False
+        time.sleep(0)   # a GIL switch between check and write, as any I/O would cause
+        store.set_status(pos, "Cancelled")
+        return True
+    return store.transition(pos, "Cancelled", allowed=can_cancel).ok
+
+
+def bump(store, pos, mode):
+    """status "Step N" -> "Step N+1"; returns the number of conflicts retried."""
+    retries = 0
+    while True:
+        version, status = store.version(pos), store.status(pos)
+        step = int(status.split()[1]) if status.startswith("Step") else 0
+        time.sleep(0)
+        if mode == "unsafe":
+            store.set_status(pos, f"Step {step + 1}")
+            return retries
+        if store.transition(pos, f"Step {step + 1}", expected_version=version).ok:
+            return retries
+        retries += 1
+
+
+def run(mode, args, snapshot):
+    store = open_store(snapshot)
+    positions = range(len(store))
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        # Every racer of an order is queued back to back, so they overlap
+        cancels = list(pool.map(lambda job: (job[0], cancel(store, job[0], mode)),
+                                [(pos, r) for pos in positions for r in range(args.racers)]))
+    winners = {}
+    for pos, ok in cancels:
+        winners[pos] = winners.get(pos, 0) + ok
+    double_cancels = sum(1 for n in winners.values() if n > 1)
+
+    jobs = [pos % len(store) for pos in range(args.bumps)]
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        retries = sum(pool.map(lambda pos: bump(store, pos, mode), jobs))
+    wall = time.perf_counter() - start
+
+    expected = {pos: jobs.count(pos) for pos in set(jobs)}
+    lost = sum(expected[pos] - int(store.status(pos).split()[1]) for pos in expected)
+    mutations = sum(ok for _, ok in cancels) + args.bumps
+
+    # Durability: everything committed in memory must come back from disk
+    statuses = [store.status(pos) for pos in positions]
+    store.journal.close()
+    reopened = open_store(snapshot)
+    mismatched = sum(reopened.status(pos) != statuses[pos] for pos in positions)
+    reopened.journal.close()
+    return {"double_cancels": double_cancels, "lost": lost, "retries": retries,
+            "mismatched": mismatched, "per_s": mutations / wall}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=50)
+    parser.add_argument("--racers", type=int, default=8, help="threads cancelling the same order")
+    parser.add_argument("--bumps", type=int, default=400, help="read-modify-write updates, spread over the orders")
+    parser.add_argument("--threads", type=int, default=64)
+    args = parser.parse_args()
+
+    print(f"{args.orders} orders, {args.orders * args.racers} racing cancels + {args.bumps} "
+          f"read-modify-writes, {args.threads} threads\n")
+    print(f"{'mode':<12}{'double cancels':>15}{'lost updates':>14}{'cas retries':>13}{'disk mismatch':>15}{'mut/s':>9}")
+    failed = False
+    for mode in ("unsafe", "transition"):
+        with tempfile.TemporaryDirectory() as tmp:
+            snapshot = os.path.join(tmp, "orders.json")
+            make_orders(args.orders).to_json(snapshot, orient="records", indent=2)
+            r = run(mode, args, snapshot)
+        print(f"{mode:<12}{r['double_cancels']:>15}{r['lost']:>14}{r['retries']:>13}{r['mismatched']:>15}{r['per_s']:>9.0f}")
+        if mode == "transition" and (r["double_cancels"] or r["lost"] or r["mismatched"]):
+            failed = True
+    if failed:
+        print("\nFAIL: transition() lost an update or let a second cancel through")
+        sys.exit(1)
+    print("\ntransition(): one cancel per order, no lost updates, disk matches memory")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Per-mutation persistence latency: journal append vs. full save_to_disk rewrite.
+
+Run from Backend/:  python benchmarks/bench_order_journal.py [--sizes 1000 10000 100000 1000000]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from order_store import OrderStore
+from order_journal import OrderJournal
+
+
+def make_orders(n):
+    return pd.DataFrame({
+        "order_id": [f"O{i:07d}" for i in range(n)],
+        "customer_id": [f"C{i % 5000:04d}" for i in range(n)],
+        "products": [[{"product_id": "P1001", "product_name": "Luma Monitor Pro"}]] * n,
+        "order_status": ["Processing"] * n,
+        "order_date": ["2025-03-25"] * n,
+    })
+
+
+def time_mutations(store, n, mutations):
+    samples = []
+    for i in range(mutations):
+        pos = (i * 7919) % n
+        start = time.perf_counter()
+        store.set_status(pos, "Cancelled" if i % 2 else "Processing")
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def bench_size(n, mutations, full_rewrite_limit):
+    df = make_orders(n)
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot = os.path.join(tmp, "orders.json")
+        df.to_json(snapshot, orient="records", indent=2)
+
+        # New path: fsync'd journal append (compaction pushed out of the timed window)
+        journal = OrderJournal(snapshot, compact_every=mutations + 1)
+        store = OrderStore(df.copy(), journal=journal)
+        journal_ms = time_mutations(store, n, mutations)
+        journal.close()
+
+        # Old path: rewrite the whole file per mutation
+        rewrite_ms = []
+        if n <= full_rewrite_limit:
+            legacy = OrderStore(df.copy())
+            for i in range(min(mutations, 20)):
+                pos = (i * 7919) % n
+                start = time.perf_counter()
+                legacy.set_status(pos, "Cancelled")
+                legacy.df.to_json(snapshot, orient="records", indent=2)
+                rewrite_ms.append((time.perf_counter() - start) * 1000)
+
+    return journal_ms, rewrite_ms
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--mutations", type=int, default=200)
+    parser.add_argument("--full-rewrite-limit", type=int, default=100_000,
+                        help="skip the legacy full-rewrite timing above this many orders")
+    args = parser.parse_args()
+
+    print(f"{'orders':>10} | {'journal p50 ms':>14} | {'journal p99 ms':>14} | {'rewrite p50 ms':>14}")
+    for n in args.sizes:
+        journal_ms, rewrite_ms = bench_size(n, args.mutations, args.full_rewrite_limit)
+        p99 = statistics.quantiles(journal_ms, n=100)[98]
+        rewrite = f"{statistics.median(rewrite_ms):14.2f}" if rewrite_ms else f"{'skipped':>14}"
+        print(f"{n:>10} | {statistics.median(journal_ms):14.3f} | {p99:14.3f} | {rewrite}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+search_products: trigram shortlist vs. the old full thefuzz scan.
+
+1. Parity: on the shipped product_catalog.json every query must return exactly what
+   process.extract(query, names, limit=3, scorer=fuzz.partial_ratio) returns.
+2. Latency on a synthetic catalog (default 1M SKUs): index lookup p50/p99.
+
+Run from Backend/:  python benchmarks/bench_product_search.py [--skus 1000000]
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import statistics
+from thefuzz import process, fuzz
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from product_search import TrigramIndex
+
+CATALOG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Database", "product_catalog.json")
+
+
+def parity(names):
+    index = TrigramIndex(names)
+    queries = names + [n.split()[0] for n in names] + [n.lower()[2:12] for n in names] + [
+        "iphone", "monitor", "perfume", "running shoes", "xyz", "pro", "lite mini",
+    ]
+    mismatches = 0
+    for q in queries:
+        expected = process.extract(q, names, limit=3, scorer=fuzz.partial_ratio)
+        if index.search(q, limit=3) != expected:
+            mismatches += 1
+    return len(queries), mismatches
+
+
+def synthetic_names(n, seed=7):
+    rng = random.Random(seed)
+    brands = ["Luma", "Zephyr", "Vivid", "Whisper", "Nova", "Aero", "Terra", "Pulse", "Echo", "Orbit",
+              "Quartz", "Summit", "Blaze", "Cobalt", "Drift", "Ember", "Flux", "Glide", "Halo", "Iris"]
+    items = ["Monitor", "Skirt", "Perfume", "Dress", "Laptop", "Sneakers", "Headphones", "Backpack",
+             "Watch", "Blender", "Jacket", "Camera", "Speaker", "Kettle", "Lamp", "Tablet", "Mouse", "Desk"]
+    tiers = ["Pro", "Lite", "Mini", "Max", "Plus", "Air", "X", "Ultra", "Go", "One"]
+    return [f"{rng.choice(brands)} {rng.choice(items)} {rng.choice(tiers)} {i:06d}" for i in range(n)]
+
+
+def latency(n, queries):
+    names = synthetic_names(n)
+    start = time.perf_counter()
+    index = TrigramIndex(names)
+    build_s = time.perf_counter() - start
+
+    samples = []
+    for q in queries:
+        start = time.perf_counter()
+        index.search(q, limit=3)
+        samples.append((time.perf_counter() - start) * 1000)
+    return build_s, samples
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--skus", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    with open(CATALOG, "r", encoding="utf-8") as f:
+        names = [p["product_name"] for p in json.load(f)]
+    total, mismatches = parity(names)
+    print(f"parity on shipped catalog: {total - mismatches}/{total} queries identical")
+
+    rng = random.Random(1)
+    words = ["luma monitor", "zephyr skirt lite", "perfume mini", "nova laptop pro", "headphones",
+             "aero sneakers", "watch ultra", "cobalt kettle", "iris lamp go", "blender"]
+    queries = [rng.choice(words) for _ in range(args.queries)]
+    build_s, samples = latency(args.skus, queries)
+    print(f"synthetic catalog: {args.skus:,} SKUs, index built in {build_s:.1f}s")
+    print(f"lookup p50 {statistics.median(samples):.2f} ms | p99 {statistics.quantiles(samples, n=100)[98]:.2f} ms")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
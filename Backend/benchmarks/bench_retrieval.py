@@ -0,0 +1,88 @@
+"""
+Offline relevance + latency: dense-only vs. BM25-only vs. hybrid (RRF) retrieval.
+
+Labeled queries come from the shipped data:
+- products: name variants from product_catalog.json -> that product
+- FAQs: every question in product_faqs.json -> the chunk holding that Q&A
+
+Run from Backend/ (needs the sentence-transformers model):
+    python benchmarks/bench_retrieval.py
+"""
+import os
+import sys
+import json
+import time
+import statistics
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+from index_store import load_index
+from langchain_community.embeddings import HuggingFaceEmbeddings
+from retrieval import HybridRetriever, load_bm25
+
+
+def product_queries():
+    with open(os.path.join(BACKEND, "Database", "product_catalog.json"), "r", encoding="utf-8") as f:
+        names = [p["product_name"] for p in json.load(f)]
+    queries = []
+    for name in names:
+        words = name.split()
+        queries.append((name.lower(), name))
+        if len(words) > 2:
+            queries.append((" ".join(words[:2]).lower(), name))
+    return queries
+
+
+def faq_queries():
+    with open(os.path.join(BACKEND, "Database", "product_faqs.json"), "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return [(item["question"], (p["product_name"], item["question"])) for p in data for item in p.get("faqs", [])]
+
+
+def evaluate(search, queries, is_relevant):
+    hit1 = hit3 = 0
+    rr, latency = [], []
+    for query, label in queries:
+        start = time.perf_counter()
+        docs = search(query)
+        latency.append((time.perf_counter() - start) * 1000)
+        rank = next((i for i, d in enumerate(docs) if is_relevant(d, label)), None)
+        hit1 += rank == 0
+        hit3 += rank is not None and rank < 3
+        rr.append(1 / (rank + 1) if rank is not None else 0.0)
+    n = len(queries)
+    return hit1 / n, hit3 / n, statistics.mean(rr), statistics.median(latency)
+
+
+def report(title, queries, store, bm25, key, is_relevant, k=10):
+    hybrid = HybridRetriever(store, bm25, key=key)
+    methods = {
+        "dense": lambda q: store.similarity_search(q, k=k),
+        "bm25": lambda q: bm25.search(q, k),
+        "hybrid": lambda q: hybrid.search(q, k=k),
+    }
+    print(f"\n{title} ({len(queries)} labeled queries)")
+    print(f"{'method':>7} | {'hit@1':>6} | {'hit@3':>6} | {'MRR':>6} | {'p50 ms':>7}")
+    for name, search in methods.items():
+        h1, h3, mrr, p50 = evaluate(search, queries, is_relevant)
+        print(f"{name:>7} | {h1:6.3f} | {h3:6.3f} | {mrr:6.3f} | {p50:7.2f}")
+
+
+def main():
+    embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+
+    prod_dir = os.path.join(BACKEND, "faiss_product_index")
+    products = load_index(prod_dir, embeddings)
+    report("Products", product_queries(), products, load_bm25(prod_dir, products),
+           key=lambda d: d.metadata.get("product_name"),
+           is_relevant=lambda d, name: d.metadata.get("product_name") == name)
+
+    general_dir = os.path.join(BACKEND, "faiss_index")
+    general = load_index(general_dir, embeddings)
+    report("FAQs / policies", faq_queries(), general, load_bm25(general_dir, general),
+           key=lambda d: d.page_content,
+           is_relevant=lambda d, label: label[0] in d.page_content and label[1] in d.page_content)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+/run-agent latency under concurrency (p50/p99 at 1, 8 and 32 parallel callers).
+
+The real stages need a microphone, Whisper weights and a Gemini key, so this
+swaps in stage stand-ins that block for a fixed time (like sd.wait(), CTranslate2
+and the HTTP call do) and measures how the server schedules them. A /reset-chat
+probe runs alongside to show the event loop stays responsive.
+
+Run from Backend/:  python benchmarks/bench_server_latency.py [--levels 1 8 32]
+"""
+import os
+import sys
+import time
+import types
+import asyncio
+import argparse
+import threading
+import statistics
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import uvicorn
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from asr_service import ASRService, PROFILES
+
+
+class SleepingModel:
+    """WhisperModel.transcribe() stand-in that blocks like CTranslate2 (GIL released)."""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def transcribe(self, audio, **options):
+        time.sleep(self.seconds)
+        return [types.SimpleNamespace(text="where is my order", words=None)], None
+
+
+def install_stage_standins(record_s, asr_s, llm_s):
+    main = types.ModuleType("main")
+    main.ASR_WORKERS = max(1, (os.cpu_count() or 1) // 2)
+    main.record_manual_api = lambda duration=5: (time.sleep(record_s), np.ones(16000, dtype=np.int16))[1]
+    main.transcribe = lambda audio: (time.sleep(asr_s), "where is my order")[1]
+    # The real path: clips queue on the ASR worker pool and are awaited as futures
+    asr = ASRService(lambda profile, replicas, threads: SleepingModel(asr_s), PROFILES["accurate"],
+                     replicas=main.ASR_WORKERS, max_batch_clips=1)
+    main.transcribe_async = lambda audio: asyncio.wrap_future(asr.submit(audio))
+    main.speak_blocking = lambda text: None
+
+    ai = types.ModuleType("ai")
+    ai.DEFAULT_SESSION_ID = "default"
+    ai.CURRENT_USER_ID = "C0010"
+    ai.reset_session = lambda session_id="default", customer_id=None: None
+
+    async def process_user_input_async(user_text, session_id="default", customer_id="C0010"):
+        await asyncio.sleep(llm_s)
+        return {"bot_text": "Here are your orders.", "type": None, "items": []}
+
+    ai.process_user_input_async = process_user_input_async
+    sys.modules["main"] = main
+    sys.modules["ai"] = ai
+
+
+def start_server(port):
+    import server
+    config = uvicorn.Config(server.app, host="127.0.0.1", port=port, log_level="warning")
+    srv = uvicorn.Server(config)
+    threading.Thread(target=srv.run, daemon=True).start()
+    while not srv.started:
+        time.sleep(0.05)
+    return srv
+
+
+def timed_get(url):
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=120) as r:
+            r.read()
+            ok = True
+    except urllib.error.HTTPError:
+        ok = False
+    return (time.perf_counter() - start) * 1000, ok
+
+
+def run_level(base, concurrency, requests_per_caller):
+    total = concurrency * requests_per_caller
+    probe_ms = []
+    done = threading.Event()
+
+    def probe():
+        while not done.is_set():
+            probe_ms.append(timed_get(f"{base}/reset-chat?session_id=probe&customer_id=C0010")[0])
+            time.sleep(0.05)
+
+    prober = threading.Thread(target=probe, daemon=True)
+    prober.start()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(
+            lambda i: timed_get(f"{base}/run-agent?session_id=s{i % concurrency}"), range(total)
+        ))
+    done.set()
+    prober.join()
+
+    latencies = [ms for ms, ok in results if ok]
+    rejected = sum(1 for _, ok in results if not ok)
+    return latencies, rejected, probe_ms
+
+
+def pct(values, p):
+    return statistics.quantiles(values, n=100)[p - 1] if len(values) > 1 else values[0]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests-per-caller", type=int, default=4)
+    parser.add_argument("--record-s", type=float, default=0.0, help="0 = upload-style (no mic window)")
+    parser.add_argument("--asr-s", type=float, default=0.3)
+    parser.add_argument("--llm-s", type=float, default=0.8)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    install_stage_standins(args.record_s, args.asr_s, args.llm_s)
+    start_server(args.port)
+    base = f"http://127.0.0.1:{args.port}"
+
+    print(f"{'callers':>7} | {'p50 ms':>8} | {'p99 ms':>8} | {'503s':>4} | {'/reset-chat p99 ms':>18}")
+    for level in args.levels:
+        latencies, rejected, probe_ms = run_level(base, level, args.requests_per_caller)
+        print(f"{level:>7} | {pct(latencies, 50):8.0f} | {pct(latencies, 99):8.0f} | {rejected:>4} | {pct(probe_ms, 99):18.1f}")
+
+
+if __name__ == "__main__":
+    main()
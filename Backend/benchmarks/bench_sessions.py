@@ -0,0 +1,105 @@
+"""
+Session manager load test with a local stub model (no network).
+
+Simulates many customers hitting one worker concurrently and asserts that live
+sessions and traced peak memory stay under the configured ceiling. By default there are
+10% more customers than session slots: histories fill up (~45 turns per customer) and
+LRU eviction still runs.
+
+Run from Backend/:  python benchmarks/bench_sessions.py [--customers 2200 --max-sessions 2000]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import threading
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sessions import SessionManager
+
+
+class StubPart:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubContent:
+    def __init__(self, role, text):
+        self.role = role
+        self.parts = [StubPart(text)]
+
+
+class StubChat:
+    """Mimics ChatSession.send_message/history with ~1KB replies."""
+
+    def __init__(self, customer_id):
+        self.customer_id = customer_id
+        self.history = []
+
+    def send_message(self, text):
+        self.history.append(StubContent("user", text))
+        reply = f"[{self.customer_id}] " + "x" * 1024
+        self.history.append(StubContent("model", reply))
+        return reply
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--customers", type=int, default=2_200)
+    parser.add_argument("--turns", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--max-sessions", type=int, default=2_000)
+    parser.add_argument("--max-history", type=int, default=20)
+    args = parser.parse_args()
+
+    manager = SessionManager(StubChat, max_sessions=args.max_sessions, max_history=args.max_history)
+    leaks = 0
+
+    def turn(i):
+        nonlocal leaks
+        customer = f"C{random.randrange(args.customers):05d}"
+        session = manager.get(customer, customer)
+        with session.lock:
+            reply = session.chat.send_message(f"turn {i}")
+            manager.trim(session)
+        if not reply.startswith(f"[{customer}]"):
+            leaks += 1
+
+    counter = iter(range(args.turns))
+    counter_lock = threading.Lock()
+
+    def worker():
+        # One turn in flight per worker (pool.map would queue every turn's Future up front)
+        while True:
+            with counter_lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            turn(i)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        for future in [pool.submit(worker) for _ in range(args.workers)]:
+            future.result()
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Each message is ~1KB, so the ceiling is roughly sessions * history * 1KB
+    # (plus object overhead); a turn adds its 2 messages before trim() runs
+    ceiling_mb = args.max_sessions * args.max_history * 1.2 / 1024
+    print(f"turns/s         : {args.turns / elapsed:,.0f}")
+    print(f"live sessions   : {len(manager)} (cap {args.max_sessions})")
+    print(f"traced memory   : {current / 1e6:.1f} MB now, {peak / 1e6:.1f} MB peak (ceiling ~{ceiling_mb:.0f} MB)")
+    print(f"context leaks   : {leaks}")
+    assert len(manager) <= args.max_sessions
+    assert peak / 1e6 <= ceiling_mb, f"peak {peak / 1e6:.1f} MB over the ~{ceiling_mb:.0f} MB ceiling"
+    assert leaks == 0
+
+
+if __name__ == "__main__":
+    main()
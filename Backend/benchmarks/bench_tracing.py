@@ -0,0 +1,67 @@
+"""
+Tracing overhead: cost of one span / traced tool call with tracing on vs. TRACING=0,
+and what that adds to a turn (~10 spans: record, asr, intent_router, llm, tools,
+context_trim, tts, plus the request itself).
+
+Run from Backend/:  python benchmarks/bench_tracing.py [--calls 200000]
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tracing import Tracer
+
+SPANS_PER_TURN = 10
+
+
+def tool(order_id):
+    return order_id
+
+
+def per_call_ns(fn, calls):
+    start = time.perf_counter_ns()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter_ns() - start) / calls
+
+
+def measure(tracer, calls):
+    traced_tool = tracer.traced(tool)
+
+    def span():
+        with tracer.span("llm"):
+            pass
+
+    def turn():
+        with tracer.trace("/bench"):
+            for _ in range(SPANS_PER_TURN - 1):
+                with tracer.span("tool", tool="search_products"):
+                    pass
+
+    baseline = per_call_ns(lambda: tool("O0042"), calls)
+    return {
+        "span": per_call_ns(span, calls),
+        "traced tool": per_call_ns(lambda: traced_tool("O0042"), calls) - baseline,
+        "turn": per_call_ns(turn, calls // SPANS_PER_TURN),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200_000)
+    parser.add_argument("--turn-ms", type=float, default=1500.0, help="typical end-to-end turn, for the relative cost")
+    args = parser.parse_args()
+
+    on = measure(Tracer(enabled=True), args.calls)
+    off = measure(Tracer(enabled=False), args.calls)
+    print(f"{'':14}{'enabled':>12}{'disabled':>12}")
+    for name in on:
+        print(f"{name:14}{on[name]:>10.0f}ns{off[name]:>10.0f}ns")
+    print(f"\nper turn ({SPANS_PER_TURN} spans): {on['turn'] / 1000:.1f} us enabled, {off['turn'] / 1000:.1f} us disabled"
+          f" = {on['turn'] / (args.turn_ms * 1e6):.4%} / {off['turn'] / (args.turn_ms * 1e6):.4%} of a {args.turn_ms:.0f} ms turn")
+
+
+if __name__ == "__main__":
+    main()
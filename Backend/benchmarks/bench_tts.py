@@ -0,0 +1,60 @@
+"""
+Time-to-first-audio: whole-reply synthesis (old save-then-play) vs. sentence pipelining.
+
+Uses the offline StubTTSBackend and a silent NullPlayer, so no network or speakers
+are needed. Pass --backend edge to measure the real voice (network, still silent).
+
+Run from Backend/:  python benchmarks/bench_tts.py [--runs 5]
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tts import SpeechPipeline, NullPlayer, make_backend
+
+REPLIES = [
+    "Your order O0042 has been cancelled. The refund will reach your card in five to seven days. Anything else?",
+    "Here are your orders.",
+    "Returns are accepted within 30 days of delivery. Items must be unused and in original packaging. "
+    "We cover shipping for damaged items. For change-of-mind returns a restocking fee may apply.",
+]
+
+
+async def whole_reply_ttfa(backend, text):
+    player = NullPlayer()
+    start = time.perf_counter()
+    audio = b"".join([chunk async for chunk in backend.stream(text)])
+    player.play(audio, backend.audio_format)
+    return player.started_at[0] - start
+
+
+async def pipelined_ttfa(backend, text):
+    player = NullPlayer()
+    start = time.perf_counter()
+    await SpeechPipeline(backend, player).speak(text)
+    return player.started_at[0] - start
+
+
+async def run(backend_name, runs):
+    backend = make_backend(backend_name)
+    print(f"{'reply chars':>11} | {'whole ms':>8} | {'pipelined ms':>12}")
+    for text in REPLIES:
+        whole = [await whole_reply_ttfa(backend, text) for _ in range(runs)]
+        piped = [await pipelined_ttfa(backend, text) for _ in range(runs)]
+        print(f"{len(text):>11} | {statistics.median(whole) * 1000:8.0f} | {statistics.median(piped) * 1000:12.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backend", default="stub", choices=["stub", "edge"])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args.backend, args.runs))
+
+
+if __name__ == "__main__":
+    main()
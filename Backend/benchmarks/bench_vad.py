@@ -0,0 +1,98 @@
+"""
+Turn latency saved by VAD endpointing + silence trimming on a recorded corpus.
+
+For every WAV (16-bit, any rate) the clip is streamed through EnergyVAD in 30 ms
+blocks, exactly as record_manual_api feeds it. Reported per clip:
+- capture: when recording stops vs. the fixed window (--window, default 5 s)
+- ASR: Whisper time on the fixed window vs. the trimmed clip (--with-asr)
+
+Run from Backend/:  python benchmarks/bench_vad.py --corpus path/to/wavs [--with-asr]
+No recordings at hand: --synthesize uses the generated clips of synth_corpus.py.
+"""
+import os
+import sys
+import glob
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import numpy as np
+import scipy.io.wavfile as wav
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from vad import EnergyVAD, SAMPLE_RATE
+from audio_ingest import PCMDecoder
+
+BLOCK = int(SAMPLE_RATE * 0.03)
+
+
+def load_clip(path):
+    rate, data = wav.read(path)
+    if data.ndim > 1:
+        data = data[:, 0]
+    return PCMDecoder(sample_rate=rate).feed(data.astype("<i2").tobytes())
+
+
+def stop_time(clip, window_s, trailing_ms):
+    vad = EnergyVAD(trailing_silence_ms=trailing_ms)
+    window = clip[:int(window_s * SAMPLE_RATE)]
+    for i in range(0, len(window), BLOCK):
+        if vad.process(window[i:i + BLOCK]):
+            return (i + BLOCK) / SAMPLE_RATE
+    return window_s
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", help="directory of .wav utterances")
+    parser.add_argument("--synthesize", action="store_true", help="generate a synthetic corpus instead")
+    parser.add_argument("--window", type=float, default=5.0)
+    parser.add_argument("--trailing-ms", type=int, default=700)
+    parser.add_argument("--with-asr", action="store_true", help="also time Whisper (needs faster-whisper)")
+    args = parser.parse_args()
+    if args.synthesize:
+        from synth_corpus import write_corpus
+        args.corpus = tempfile.mkdtemp(prefix="bench_vad_")
+        write_corpus(args.corpus)
+    elif not args.corpus:
+        parser.error("pass --corpus DIR or --synthesize")
+
+    paths = sorted(glob.glob(os.path.join(args.corpus, "*.wav")))
+    if not paths:
+        sys.exit(f"No .wav files in {args.corpus}")
+
+    model = None
+    if args.with_asr:
+        from faster_whisper import WhisperModel
+        model = WhisperModel("base.en", device="cpu", compute_type="int8")
+
+    def asr_seconds(audio):
+        start = time.perf_counter()
+        list(model.transcribe(audio.astype(np.float32) / 32768.0, beam_size=5)[0])
+        return time.perf_counter() - start
+
+    saved = []
+    print(f"{'clip':<28} | {'stop s':>6} | {'trimmed s':>9} | {'asr full s':>10} | {'asr trim s':>10} | {'saved s':>7}")
+    for path in paths:
+        clip = load_clip(path)
+        window = np.pad(clip, (0, max(0, int(args.window * SAMPLE_RATE) - len(clip))))[:int(args.window * SAMPLE_RATE)]
+        stop = stop_time(window, args.window, args.trailing_ms)
+        captured = window[:int(stop * SAMPLE_RATE)]
+        trimmed = EnergyVAD().trim(captured)
+
+        asr_full = asr_trim = 0.0
+        if model is not None:
+            asr_full, asr_trim = asr_seconds(window), asr_seconds(trimmed)
+        turn_saved = (args.window - stop) + (asr_full - asr_trim)
+        saved.append(turn_saved)
+        print(f"{os.path.basename(path)[:28]:<28} | {stop:6.2f} | {len(trimmed) / SAMPLE_RATE:9.2f} | "
+              f"{asr_full:10.2f} | {asr_trim:10.2f} | {turn_saved:7.2f}")
+
+    if args.synthesize:
+        shutil.rmtree(args.corpus, ignore_errors=True)
+    print(f"\nmean turn latency saved: {statistics.mean(saved):.2f}s  (median {statistics.median(saved):.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
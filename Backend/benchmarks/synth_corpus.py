@@ -0,0 +1,56 @@
+"""
+Synthetic utterance corpus for bench_vad.py / bench_e2e.py (--synthesize), so both run
+from a clean checkout without recordings.
+
+Each utterance becomes <name>.wav (16 kHz, 16-bit) rendered by the voiced StubTTSBackend,
+with room noise before and after, plus <name>.txt holding the transcript. The audio is a
+speech-like buzz, not words: it exercises endpointing and trimming, and bench_e2e reads
+the transcripts (--asr reference) instead of running Whisper on it.
+
+Run from Backend/:  python benchmarks/synth_corpus.py out_dir/
+"""
+import os
+import sys
+
+import numpy as np
+import scipy.io.wavfile as wav
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tts import StubTTSBackend
+
+# Order ids match Database/order_database.json, so the tools hit real orders
+UTTERANCES = [
+    "what is the return policy?",
+    "status of O0083",
+    "show me red shoes",
+    "show my order history",
+    "cancel order O0083",
+    "where are my headphones?",
+    "how long does shipping take?",
+    "do you have wireless earbuds",
+    "track order O0017",
+    "I want to return order O0042",
+]
+
+
+def write_corpus(directory, utterances=UTTERANCES, lead_s=0.4, tail_s=0.3, noise_db=-60.0, seed=0):
+    """Writes the corpus into `directory`; returns the number of clips."""
+    os.makedirs(directory, exist_ok=True)
+    backend = StubTTSBackend(voiced=True)
+    rng = np.random.default_rng(seed)
+    for i, text in enumerate(utterances):
+        speech = backend.pcm(text)
+        lead, tail = int(lead_s * backend.sample_rate), int(tail_s * backend.sample_rate)
+        clip = np.concatenate((np.zeros(lead), speech, np.zeros(tail)))
+        clip += rng.normal(0, 32768 * 10 ** (noise_db / 20), len(clip))
+        name = os.path.join(directory, f"synth_{i:02d}")
+        wav.write(name + ".wav", backend.sample_rate, np.clip(clip, -32768, 32767).astype(np.int16))
+        with open(name + ".txt", "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    return len(utterances)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit("usage: python benchmarks/synth_corpus.py OUT_DIR")
+    print(f"Wrote {write_corpus(sys.argv[1])} clips to {sys.argv[1]}")
@@ -1,6 +1,9 @@
 import os
 import sys
 import json
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 
 try:
     from langchain_core.documents import Document
@@ -13,78 +16,257 @@ except ImportError as e:
     print("Run: pip install langchain-core langchain-text-splitters langchain-community faiss-cpu sentence-transformers")
     sys.exit(1)
 
+from retrieval import BM25Index
+from index_store import LazyDocstore, has_index, load_index_for_update, save_index
+
 # --- PATHS ---
 current_dir = os.path.dirname(os.path.abspath(__file__))
 datasets_dir = os.path.join(current_dir, "Database")
 
-POLICY_TXT_PATH = os.path.join(datasets_dir, "company_policies text.txt") # Check your filename matches exactly!
+POLICY_TXT_PATH = os.path.join(datasets_dir, "company_policies_text.txt")
 FAQ_JSON_PATH = os.path.join(datasets_dir, "product_faqs.json")
 PRODUCT_CATALOG_PATH = os.path.join(datasets_dir, "product_catalog.json")
 
-def build_knowledge_base():
-    print("STARTING KNOWLEDGE BUILDER...")
-    
-    # Initialize Embeddings Model (Used for both indexes)
-    embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+# Dense (FAISS) and sparse (bm25.json) indexes live side by side, next to ai.py
+GENERAL_INDEX_DIR = os.path.join(current_dir, "faiss_index")
+PRODUCT_INDEX_DIR = os.path.join(current_dir, "faiss_product_index")
+
+# --- BUILD SETTINGS ---
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 50
+EMBED_BATCH_SIZE = 64
+EMBED_WORKERS = 4
+
+# Per-index record of what is already embedded: source doc -> content hash + chunk ids.
+# The shipped indexes predate it (random chunk ids), so the first run here is a full
+# rebuild that writes manifest.json; only later runs are incremental.
+MANIFEST_FILE = "manifest.json"
+
+
+# --- INCREMENTAL HELPERS ---
+def content_hash(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(json.dumps(part, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def chunk_ids(doc_id, chunks):
+    """Stable ids from the chunk text, so an unchanged paragraph keeps its vector."""
+    ids, seen = [], {}
+    for chunk in chunks:
+        base = f"{doc_id}#{content_hash(chunk.page_content, chunk.metadata)[:16]}"
+        n = seen.get(base, 0)
+        seen[base] = n + 1
+        ids.append(base if n == 0 else f"{base}~{n}")
+    return ids
+
+
+def add_source(sources, doc_id, doc_hash, chunks):
+    """
+    Register one source doc. Ids must be unique or the manifest would silently keep only
+    the last one: an exact repeat is dropped, a different doc under the same id gets "~n".
+    """
+    if doc_id not in sources:
+        sources[doc_id] = (doc_hash, chunks)
+        return
+    if any(existing[0] == doc_hash
+           for key, existing in sources.items() if key == doc_id or key.startswith(doc_id + "~")):
+        print(f"   ⚠️ Duplicate source '{doc_id}' (same content), skipped.")
+        return
+    n = 2
+    while f"{doc_id}~{n}" in sources:
+        n += 1
+    print(f"   ⚠️ Duplicate source id '{doc_id}' with different content, indexed as '{doc_id}~{n}'.")
+    sources[f"{doc_id}~{n}"] = (doc_hash, chunks)
+
+
+def build_settings():
+    """Anything that changes every vector; a mismatch forces a full rebuild."""
+    return {"model": EMBEDDING_MODEL, "chunk_size": CHUNK_SIZE, "chunk_overlap": CHUNK_OVERLAP}
+
+
+def load_manifest(index_dir):
+    path = os.path.join(index_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(index_dir, docs):
+    path = os.path.join(index_dir, MANIFEST_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"settings": build_settings(), "docs": docs}, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def write_bm25(index_dir):
+    """BM25 is plain token counting over the saved docstore: no embeddings involved."""
+    docstore = LazyDocstore(index_dir)
+    BM25Index.from_documents(docstore.search(row) for row in range(len(docstore))).save(index_dir)
+
+
+def embed_in_batches(embeddings, texts):
+    """Embed in fixed-size batches on a small pool (the model releases the GIL in its forward pass)."""
+    batches = [texts[i:i + EMBED_BATCH_SIZE] for i in range(0, len(texts), EMBED_BATCH_SIZE)]
+    with ThreadPoolExecutor(max_workers=EMBED_WORKERS) as pool:
+        return [vector for batch in pool.map(embeddings.embed_documents, batches) for vector in batch]
+
+
+def sync_index(index_dir, sources, embeddings, full=False):
+    """
+    Bring a FAISS + BM25 index in line with `sources` ({doc_id: (doc_hash, [chunks])}).
+    Only chunks that are new or changed get embedded; chunks of deleted/edited docs are removed by id.
+    Without a usable manifest (first run, settings changed, --full) the index is rebuilt.
+    """
+    manifest = None if full else load_manifest(index_dir)
+    db = None
+    if manifest and manifest.get("settings") == build_settings() and has_index(index_dir):
+        db = load_index_for_update(index_dir, embeddings)
+    old_docs = manifest["docs"] if db is not None else {}
+
+    new_docs, to_add = {}, []
+    old_ids = {cid for entry in old_docs.values() for cid in entry["chunks"]}
+    for doc_id, (doc_hash, chunks) in sources.items():
+        old = old_docs.get(doc_id)
+        if old and old["hash"] == doc_hash:
+            new_docs[doc_id] = old
+            continue
+        ids = chunk_ids(doc_id, chunks)
+        new_docs[doc_id] = {"hash": doc_hash, "chunks": ids}
+        to_add.extend((cid, chunk) for cid, chunk in zip(ids, chunks) if cid not in old_ids)
+
+    wanted = {cid for entry in new_docs.values() for cid in entry["chunks"]}
+    to_delete = sorted(old_ids - wanted)
+    kept = len(wanted) - len(to_add)
+    print(f"   {'Incremental' if db is not None else 'Full'} build: "
+          f"{len(to_add)} to embed, {len(to_delete)} to delete, {kept} unchanged.")
+
+    if not wanted:
+        print("   ⚠️ Nothing to index.")
+        return False
+    if db is not None and not to_add and not to_delete:
+        print("   ✅ Already up to date.")
+        return True
+
+    if to_delete:
+        db.delete(to_delete)
+    if to_add:
+        ids = [cid for cid, _ in to_add]
+        texts = [chunk.page_content for _, chunk in to_add]
+        metadatas = [chunk.metadata for _, chunk in to_add]
+        vectors = embed_in_batches(embeddings, texts)
+        if db is None:
+            db = FAISS.from_embeddings(list(zip(texts, vectors)), embeddings, metadatas=metadatas, ids=ids)
+        else:
+            db.add_embeddings(list(zip(texts, vectors)), metadatas=metadatas, ids=ids)
+
+    save_index(db, index_dir)
+    write_bm25(index_dir)
+    save_manifest(index_dir, new_docs)
+    return True
 
-    # ==========================================
-    # PART 1: BUILD GENERAL INDEX (Policies & FAQs)
-    # ==========================================
-    print("\n--- Phase 1: General Knowledge (Policies & FAQs) ---")
-    general_docs = []
+
+# --- SOURCES ---
+def load_general_sources(text_splitter):
+    """Policies + FAQs as {doc_id: (hash, chunks)}."""
+    sources = {}
 
     # 1. Load Policies
     if os.path.exists(POLICY_TXT_PATH):
         try:
             loader = TextLoader(POLICY_TXT_PATH, encoding="utf-8")
-            loaded_docs = loader.load()
-            general_docs.extend(loaded_docs)
+            for doc in loader.load():
+                # Keep the metadata independent of where the repo is checked out
+                doc.metadata["source"] = os.path.basename(POLICY_TXT_PATH)
+                doc_id = f"policy:{doc.metadata['source']}"
+                add_source(sources, doc_id, content_hash(doc.page_content), text_splitter.split_documents([doc]))
             print(f"   Loaded Policies.")
         except Exception as e:
             print(f"   ❌ Error loading policies: {e}")
     else:
         print(f"   ⚠️ File not found: {POLICY_TXT_PATH}")
 
-# 2. Load FAQs (Updated for Nested Structure)
+    # 2. Load FAQs (Updated for Nested Structure)
     if os.path.exists(FAQ_JSON_PATH):
         try:
             with open(FAQ_JSON_PATH, "r", encoding="utf-8") as f:
                 data = json.load(f)
-                count = 0
-                
-                # Loop through each PRODUCT
-                for product in data:
-                    p_name = product.get("product_name", "General")
-                    faq_list = product.get("faqs", [])
-                    
-                    # Loop through each QUESTION inside that product
-                    for item in faq_list:
-                        q = item.get('question')
-                        a = item.get('answer')
-                        
-                        if q and a:
-                            # We add the Product Name to the text so the AI knows 
-                            # which product this answer belongs to.
-                            text = f"Product: {p_name}\nQ: {q}\nA: {a}"
-                            
-                            # Add to the list
-                            general_docs.append(Document(page_content=text, metadata={"source": "faq", "product": p_name}))
-                            count += 1
-                            
-                print(f"   Loaded {count} FAQs.")
+            count = 0
+
+            # Loop through each PRODUCT
+            for product in data:
+                p_name = product.get("product_name", "General")
+                p_key = product.get("product_id") or p_name
+                faq_list = product.get("faqs", [])
+
+                # Loop through each QUESTION inside that product
+                for item in faq_list:
+                    q = item.get('question')
+                    a = item.get('answer')
+
+                    if q and a:
+                        # We add the Product Name to the text so the AI knows
+                        # which product this answer belongs to.
+                        text = f"Product: {p_name}\nQ: {q}\nA: {a}"
+                        doc = Document(page_content=text, metadata={"source": "faq", "product": p_name})
+                        add_source(sources, f"faq:{p_key}:{q}", content_hash(text, doc.metadata), text_splitter.split_documents([doc]))
+                        count += 1
+
+            print(f"   Loaded {count} FAQs.")
         except Exception as e:
             print(f"   ❌ Error loading FAQs: {e}")
     else:
         print(f"   ⚠️ File not found: {FAQ_JSON_PATH}")
-    # 3. Save General Index
-    if general_docs:
-        print("   Splitting text and saving 'faiss_index'...")
-        text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
-        chunks = text_splitter.split_documents(general_docs)
-        
-        db = FAISS.from_documents(chunks, embeddings)
-        db.save_local("faiss_index")
-        print("   ✅ General Memory Built.")
+    return sources
+
+
+def load_product_sources():
+    """One document per catalog entry, keyed by product_id."""
+    sources = {}
+    if not os.path.exists(PRODUCT_CATALOG_PATH):
+        print(f"   ⚠️ File not found: {PRODUCT_CATALOG_PATH}")
+        return sources
+
+    with open(PRODUCT_CATALOG_PATH, "r", encoding="utf-8") as f:
+        products = json.load(f)
+
+    for p in products:
+        # Content: This is what the AI searches against (Description + Category)
+        # We combine them so "Noise cancelling" or "Footwear" both work.
+        content = f"Product: {p['product_name']}\nCategory: {p['category']}\nDescription: {p['description']}"
+
+        # Metadata: This is the KEY we need for the Hybrid Tool
+        # We store the EXACT product name so Python can find it in the Order DB later.
+        meta = {"product_name": p['product_name']}
+
+        doc = Document(page_content=content, metadata=meta)
+        # No text splitting needed for products (descriptions are usually short enough)
+        add_source(sources, f"product:{p.get('product_id') or p['product_name']}", content_hash(content, meta), [doc])
+
+    print(f"   Loaded {len(sources)} products from catalog.")
+    return sources
+
+
+def build_knowledge_base(full=False):
+    print("STARTING KNOWLEDGE BUILDER...")
+
+    # Initialize Embeddings Model (Used for both indexes)
+    embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+
+    # ==========================================
+    # PART 1: BUILD GENERAL INDEX (Policies & FAQs)
+    # ==========================================
+    print("\n--- Phase 1: General Knowledge (Policies & FAQs) ---")
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    general_sources = load_general_sources(text_splitter)
+    if general_sources:
+        print("   Syncing 'faiss_index'...")
+        if sync_index(GENERAL_INDEX_DIR, general_sources, embeddings, full=full):
+            print("   ✅ General Memory Built (FAISS + BM25).")
     else:
         print("   ⚠️ No general data found. Skipping 'faiss_index' build.")
 
@@ -92,39 +274,33 @@ def build_knowledge_base():
     # PART 2: BUILD PRODUCT INDEX (Hybrid Search)
     # ==========================================
     print("\n--- Phase 2: Product Knowledge (Hybrid Search) ---")
-    product_docs = []
-
-    if os.path.exists(PRODUCT_CATALOG_PATH):
-        try:
-            with open(PRODUCT_CATALOG_PATH, "r", encoding="utf-8") as f:
-                products = json.load(f)
-                
-                for p in products:
-                    # Content: This is what the AI searches against (Description + Category)
-                    # We combine them so "Noise cancelling" or "Footwear" both work.
-                    content = f"Product: {p['product_name']}\nCategory: {p['category']}\nDescription: {p['description']}"
-                    
-                    # Metadata: This is the KEY we need for the Hybrid Tool
-                    # We store the EXACT product name so Python can find it in the Order DB later.
-                    meta = {"product_name": p['product_name']}
-                    
-                    doc = Document(page_content=content, metadata=meta)
-                    product_docs.append(doc)
-                
-                print(f"   Loaded {len(product_docs)} products from catalog.")
-
-            if product_docs:
-                print("   Saving 'faiss_product_index'...")
-                # No text splitting needed for products (descriptions are usually short enough)
-                product_db = FAISS.from_documents(product_docs, embeddings)
-                product_db.save_local("faiss_product_index")
-                print("   ✅ Product Memory Built.")
-        except Exception as e:
-            print(f"   ❌ Error processing product catalog: {e}")
-    else:
-        print(f"   ⚠️ File not found: {PRODUCT_CATALOG_PATH}")
+    try:
+        product_sources = load_product_sources()
+        if product_sources:
+            print("   Syncing 'faiss_product_index'...")
+            if sync_index(PRODUCT_INDEX_DIR, product_sources, embeddings, full=full):
+                print("   ✅ Product Memory Built (FAISS + BM25).")
+    except Exception as e:
+        print(f"   ❌ Error processing product catalog: {e}")
 
     print("\n🎉 BUILD COMPLETE.")
 
+def rebuild_bm25():
+    """Refresh bm25.json of the existing indexes only (no embedding model needed)."""
+    for index_dir in (GENERAL_INDEX_DIR, PRODUCT_INDEX_DIR):
+        if has_index(index_dir):
+            write_bm25(index_dir)
+            print(f"   ✅ Wrote {os.path.basename(index_dir)}/bm25.json")
+        else:
+            print(f"   ⚠️ No index in {index_dir}, skipping.")
+
+
 if __name__ == "__main__":
-    build_knowledge_base()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Build/refresh the FAISS + BM25 indexes used by ai.py")
+    parser.add_argument("--full", action="store_true", help="ignore the manifests and re-embed everything")
+    parser.add_argument("--bm25-only", action="store_true", help="only rewrite bm25.json from the existing indexes")
+    args = parser.parse_args()
+    if args.bm25_only:
+        rebuild_bm25()
+    else:
+        build_knowledge_base(full=args.full)
@@ -0,0 +1,179 @@
+import json
+
+from sessions import _is_user_text
+
+SUMMARY_MARKER = "[Conversation so far]"
+COMPACTED_MARKER = "[compacted]"
+
+
+def estimate_tokens(text):
+    """~4 characters per token; close enough to budget a prompt without a tokenizer."""
+    return len(text) // 4 + 1
+
+
+def history_tokens(history):
+    """Estimated prompt tokens of a chat history (text, function calls and responses)."""
+    return sum(_content_tokens(content) for content in history)
+
+
+class ContextBudget:
+    """
+    Keeps a chat history inside a token budget without losing the thread.
+    1. Tool payloads of earlier turns (e.g. full get_order_history JSON) become a compact
+       reference: tool name, row count and the ids/statuses the model may refer back to.
+    2. While the history is still over max_tokens (or max_messages), the oldest turns are
+       folded into a running summary exchange at the front of the history.
+    The newest keep_turns turns are never touched, so chat.history[-2] still holds the
+    full function response of the turn that just ran.
+
+    History items are SDK Content objects; new ones are built with the factories
+    (make_content(role, parts), text_part(text), tool_part(name, result)).
+    """
+
+    def __init__(self, make_content, text_part, tool_part, max_tokens=4000, max_messages=40,
+                 max_tool_chars=400, keep_turns=2, max_summary_tokens=600):
+        self.make_content = make_content
+        self.text_part = text_part
+        self.tool_part = tool_part
+        self.max_tokens = max_tokens
+        self.max_messages = max_messages
+        self.max_tool_chars = max_tool_chars
+        self.keep_turns = keep_turns
+        self.max_summary_tokens = max_summary_tokens
+
+    def compact(self, history):
+        """Returns the compacted history (the same list if nothing had to change)."""
+        turns = _split_turns(history)
+        summary = []
+        if turns and _is_summary(turns[0]):
+            summary = _summary_lines(turns.pop(0))
+
+        recent = max(len(turns) - self.keep_turns, 0)
+        trimmed = [self._trim_tools(turn) for turn in turns[:recent]] + turns[recent:]
+        changed = any(a is not b for a, b in zip(trimmed, turns))
+
+        def over_budget():
+            messages = sum(len(t) for t in trimmed) + (2 if summary else 0)
+            tokens = sum(history_tokens(t) for t in trimmed) + estimate_tokens("\n".join(summary))
+            return tokens > self.max_tokens or messages > self.max_messages
+
+        while len(trimmed) > self.keep_turns and over_budget():
+            summary.append(_summarize_turn(trimmed.pop(0)))
+            changed = True
+        if not changed:
+            return history
+
+        while len(summary) > 1 and estimate_tokens("\n".join(summary)) > self.max_summary_tokens:
+            summary.pop(0)
+        head = []
+        if summary:
+            head = [
+                self.make_content("user", [self.text_part(SUMMARY_MARKER + "\n" + "\n".join(summary))]),
+                self.make_content("model", [self.text_part("Noted.")]),
+            ]
+        return head + [content for turn in trimmed for content in turn]
+
+    def _trim_tools(self, turn):
+        out, changed = [], False
+        for content in turn:
+            parts = []
+            for part in content.parts:
+                response = _function_response(part)
+                if response is not None:
+                    name, result = response
+                    if len(result) > self.max_tool_chars and not result.startswith(COMPACTED_MARKER):
+                        part = self.tool_part(name, _reference(name, result))
+                        changed = True
+                parts.append(part)
+            out.append(self.make_content(content.role, parts) if changed else content)
+        return out if changed else turn
+
+
+# --- HISTORY HELPERS ---
+def _text(part):
+    return getattr(part, "text", "") or ""
+
+
+def _function_call(part):
+    call = getattr(part, "function_call", None)
+    return (call.name, dict(call.args or {})) if call and call.name else None
+
+
+def _function_response(part):
+    response = getattr(part, "function_response", None)
+    if not response or not response.name:
+        return None
+    return response.name, str(dict(response.response).get("result", ""))
+
+
+def _split_turns(history):
+    """[[user text, model call, tool response, ..., model text], ...]"""
+    turns = []
+    for content in history:
+        if _is_user_text(content) or not turns:
+            turns.append([])
+        turns[-1].append(content)
+    return turns
+
+
+def _is_summary(turn):
+    return _text(turn[0].parts[0]).startswith(SUMMARY_MARKER) if turn[0].parts else False
+
+
+def _summary_lines(turn):
+    return _text(turn[0].parts[0])[len(SUMMARY_MARKER):].strip().splitlines()
+
+
+def _content_tokens(content):
+    total = 0
+    for part in content.parts:
+        response = _function_response(part)
+        call = _function_call(part)
+        if response is not None:
+            total += estimate_tokens(response[1])
+        elif call is not None:
+            total += estimate_tokens(call[0] + json.dumps(call[1], default=str))
+        else:
+            total += estimate_tokens(_text(part))
+    return total
+
+
+def _short(text, limit):
+    text = " ".join(str(text).split())
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+def _summarize_turn(turn):
+    """One line per folded turn: what was asked, which tools ran, what we answered."""
+    user = next((_text(p) for p in turn[0].parts if _text(p)), "")
+    calls = [c for content in turn for c in map(_function_call, content.parts) if c]
+    answer = next((text for content in reversed(turn) if content.role == "model"
+                   for text in ["".join(_text(p) for p in content.parts)] if text), "")
+    line = f"- User: {_short(user, 120)}"
+    if calls:
+        line += " | tools: " + ", ".join(
+            f"{name}({', '.join(f'{k}={v}' for k, v in args.items())})" for name, args in calls
+        )
+    if answer:
+        line += f" | Agent: {_short(answer, 160)}"
+    return line
+
+
+def _reference(name, result, max_items=5):
+    """'[compacted] get_order_history: 12 rows (O0083 Shipped, O0041 Delivered, ... +7 more)'"""
+    try:
+        rows = json.loads(result)
+    except ValueError:
+        return f"{COMPACTED_MARKER} {name}: {_short(result, 200)}"
+    if not isinstance(rows, list):
+        rows = [rows]
+    labels = []
+    for row in rows[:max_items]:
+        if isinstance(row, dict):
+            key = row.get("order_id") or row.get("product_name") or next(iter(row.values()), "")
+            status = row.get("order_status") or row.get("price") or ""
+            labels.append(f"{key} {status}".strip())
+        else:
+            labels.append(_short(row, 40))
+    more = f", +{len(rows) - max_items} more" if len(rows) > max_items else ""
+    return f"{COMPACTED_MARKER} {name}: {len(rows)} rows ({', '.join(labels)}{more}); call the tool again for details"
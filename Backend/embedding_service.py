@@ -0,0 +1,118 @@
+import re
+import time
+import queue
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+
+from langchain_core.embeddings import Embeddings
+
+
+def normalize_query(text):
+    """'  Where are my SHOES? ' and 'where are my shoes' share one cache entry."""
+    text = re.sub(r"\s+", " ", str(text).lower()).strip()
+    return text.strip(" ?!.,")
+
+
+class EmbeddingService(Embeddings):
+    """
+    Drop-in Embeddings wrapper for the FAISS stores.
+    - embed_query(): bounded LRU cache on the normalized text
+    - cache misses from concurrent sessions are micro-batched into one forward pass
+      (up to max_batch texts, waiting at most max_wait_ms for company)
+    - embed_documents() passes straight through (index builds)
+    """
+
+    def __init__(self, base, cache_size=4096, max_batch=32, max_wait_ms=5):
+        self.base = base
+        self.cache_size = cache_size
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+
+        self._cache = OrderedDict()
+        self._inflight = {}           # normalized text -> Future shared by identical concurrent queries
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+
+        self._hits = 0
+        self._misses = 0
+        self._batches = 0
+        self._batched_texts = 0
+        self._latency_ms = deque(maxlen=1000)   # per-query embed latency (misses only)
+
+        threading.Thread(target=self._batch_loop, daemon=True, name="embed-batcher").start()
+
+    # --- Embeddings API ---
+    def embed_query(self, text):
+        key = normalize_query(text)
+        with self._lock:
+            vector = self._cache.get(key)
+            if vector is not None:
+                self._cache.move_to_end(key)
+                self._hits += 1
+                return list(vector)
+            self._misses += 1
+            future = self._inflight.get(key)
+            if future is None:
+                future = Future()
+                self._inflight[key] = future
+                self._queue.put((key, future, time.perf_counter()))
+        return list(future.result())
+
+    def embed_documents(self, texts):
+        return self.base.embed_documents(texts)
+
+    # --- BATCHER ---
+    def _batch_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        try:
+            vectors = self.base.embed_documents([key for key, _, _ in batch])
+        except Exception as e:
+            with self._lock:
+                for key, future, _ in batch:
+                    self._inflight.pop(key, None)
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+
+        done = time.perf_counter()
+        with self._lock:
+            self._batches += 1
+            self._batched_texts += len(batch)
+            for (key, _, queued_at), vector in zip(batch, vectors):
+                self._cache[key] = tuple(vector)
+                self._inflight.pop(key, None)
+                self._latency_ms.append((done - queued_at) * 1000)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        for (_, future, _), vector in zip(batch, vectors):
+            future.set_result(vector)
+
+    # --- METRICS ---
+    def metrics(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            latencies = sorted(self._latency_ms)
+            return {
+                "cache_size": len(self._cache),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "batches": self._batches,
+                "avg_batch_size": self._batched_texts / self._batches if self._batches else 0.0,
+                "embed_ms_p50": latencies[len(latencies) // 2] if latencies else 0.0,
+                "embed_ms_p99": latencies[int(len(latencies) * 0.99)] if latencies else 0.0,
+            }
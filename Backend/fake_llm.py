@@ -0,0 +1,204 @@
+"""
+Scripted local stand-in for genai.GenerativeModel (no network, deterministic).
+
+It speaks just enough of the SDK surface that ai.py uses -- start_chat(), send_message()
+with and without stream=True, automatic function calling, chat.history with
+function_call / function_response parts -- and it calls the REAL tool functions.
+Chunk timing is configurable so streaming and latency paths can be exercised offline.
+"""
+import re
+import time
+
+
+# --- 1. SDK-SHAPED VALUES ---
+class FunctionCall:
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __bool__(self):
+        return True
+
+
+class FunctionResponse:
+    def __init__(self, name, response):
+        self.name = name
+        self.response = response
+
+    def __bool__(self):
+        return True
+
+
+class Part:
+    def __init__(self, text="", function_call=None, function_response=None):
+        self.text = text
+        self.function_call = function_call
+        self.function_response = function_response
+
+
+class Content:
+    def __init__(self, role, parts):
+        self.role = role
+        self.parts = parts
+
+
+class Chunk:
+    def __init__(self, parts):
+        self.parts = parts
+
+    @property
+    def text(self):
+        return "".join(p.text for p in self.parts)
+
+
+# --- 2. SCRIPT ---
+class Rule:
+    """If `pattern` matches the user text: call `tool` with args(match), then answer with reply(result)."""
+
+    def __init__(self, pattern, tool=None, args=None, reply=None):
+        self.pattern = re.compile(pattern, re.IGNORECASE)
+        self.tool = tool
+        self.args = args or (lambda m: {})
+        self.reply = reply or (lambda result: "Done.")
+
+
+def _order_id(m):
+    return {"order_id": m.group("id").upper()}
+
+
+DEFAULT_SCRIPT = [
+    Rule(r"cancel.*?(?P<id>O\s?\d{3,})", "cancel_order", _order_id,
+         lambda r: "I've cancelled that order." if r.startswith("[") else r),
+    Rule(r"return.*?(?P<id>O\s?\d{3,})", "initiate_return", _order_id, lambda r: r),
+    Rule(r"(?:status|where|track).*?(?P<id>O\s?\d{3,})", "check_order_status", _order_id,
+         lambda r: "Here is the status of that order." if r.startswith("[") else r),
+    Rule(r"\b(my orders|order history|past orders)\b", "get_order_history", None,
+         lambda r: "Here are your orders."),
+    Rule(r"\bwhere (?:are|is) my (?P<what>.+?)\??$", "find_orders_by_description",
+         lambda m: {"description": m.group("what")}, lambda r: "Here is what I found in your orders."),
+    Rule(r"\b(policy|refund|shipping|warranty|how long|how do i)\b", "get_policy_info",
+         lambda m: {"question": m.string}, lambda r: "According to our policy: " + r.split("\n")[0][:160]),
+    Rule(r"\b(?:show me|looking for|do you have|recommend) (?P<what>.+)", "search_products",
+         lambda m: {"query": m.group("what")}, lambda r: "Here are some products you might like."),
+    Rule(r"\b(?:search|find|price of) (?P<what>.+)", "search_products",
+         lambda m: {"query": m.group("what")}, lambda r: "Here's what I found in the catalog."),
+]
+
+
+# --- 3. MODEL / CHAT ---
+class FakeGenerativeModel:
+    def __init__(self, tools=(), script=None, first_token_delay_s=0.0, chunk_delay_s=0.0,
+                 tool_call_delay_s=0.0, chunk_words=3, fallback_reply="Sorry, could you say that again?"):
+        self.tools = {t.__name__: t for t in tools}
+        self.script = script if script is not None else DEFAULT_SCRIPT
+        self.first_token_delay_s = first_token_delay_s
+        self.chunk_delay_s = chunk_delay_s
+        self.tool_call_delay_s = tool_call_delay_s
+        self.chunk_words = chunk_words
+        self.fallback_reply = fallback_reply
+
+    def start_chat(self, history=None, enable_automatic_function_calling=False):
+        return FakeChatSession(self, list(history or []), enable_automatic_function_calling)
+
+
+class FakeResponse:
+    """Iterable of chunks (stream=True) that also exposes .text/.parts like the SDK response."""
+
+    def __init__(self, chunks, on_done, delays):
+        self._chunks = chunks
+        self._on_done = on_done
+        self._delays = delays
+        self._done = False
+
+    def __iter__(self):
+        for chunk, delay in zip(self._chunks, self._delays):
+            if delay:
+                time.sleep(delay)
+            yield chunk
+        self.resolve()
+
+    def resolve(self):
+        if not self._done:
+            self._done = True
+            self._on_done()
+
+    @property
+    def parts(self):
+        return [p for c in self._chunks for p in c.parts]
+
+    @property
+    def text(self):
+        return "".join(c.text for c in self._chunks)
+
+
+class FakeChatSession:
+    def __init__(self, model, history, enable_automatic_function_calling):
+        self.model = model
+        self.history = history
+        self.enable_automatic_function_calling = enable_automatic_function_calling
+        self._pending = None   # (rule, match) waiting for the function response
+
+    def send_message(self, content, stream=False):
+        if self.enable_automatic_function_calling and stream:
+            raise NotImplementedError("stream=True with automatic function calling is not supported")
+
+        if isinstance(content, str):
+            return self._on_user_text(content, stream)
+        return self._on_function_responses(content, stream)
+
+    def _on_user_text(self, text, stream):
+        self.history.append(Content("user", [Part(text=text)]))
+        rule, match = self._match(text)
+        if rule is None or rule.tool is None:
+            reply = rule.reply(None) if rule else self.model.fallback_reply
+            return self._text_response(reply, stream)
+
+        call = FunctionCall(rule.tool, rule.args(match))
+        if not self.enable_automatic_function_calling:
+            # Hand the call back to the caller's tool loop
+            self._pending = (rule, match)
+            chunk = Chunk([Part(function_call=call)])
+            return self._respond([chunk], [self.model.first_token_delay_s], stream)
+
+        # Automatic function calling: run the real tool, like the SDK does
+        time.sleep(self.model.first_token_delay_s + self.model.tool_call_delay_s)
+        result = self.model.tools[call.name](**call.args)
+        self.history.append(Content("model", [Part(function_call=call)]))
+        self.history.append(Content("user", [Part(function_response=FunctionResponse(call.name, {"result": result}))]))
+        return self._text_response(rule.reply(str(result)), stream)
+
+    def _on_function_responses(self, parts, stream):
+        parts = [parts] if not isinstance(parts, (list, tuple)) else parts
+        responses = [p.function_response for p in parts]
+        self.history.append(Content("user", [
+            Part(function_response=FunctionResponse(r.name, {"result": r.response["result"]})) for r in responses
+        ]))
+        rule, _ = self._pending or (None, None)
+        self._pending = None
+        result = str(responses[-1].response["result"]) if responses else ""
+        return self._text_response(rule.reply(result) if rule else self.model.fallback_reply, stream)
+
+    def _text_response(self, reply, stream):
+        words = reply.split(" ")
+        n = self.model.chunk_words
+        texts = [" ".join(words[i:i + n]) + (" " if i + n < len(words) else "") for i in range(0, len(words), n)]
+        chunks = [Chunk([Part(text=t)]) for t in texts]
+        delays = [self.model.first_token_delay_s] + [self.model.chunk_delay_s] * (len(chunks) - 1)
+        return self._respond(chunks, delays, stream)
+
+    def _respond(self, chunks, delays, stream):
+        def record():
+            self.history.append(Content("model", [p for c in chunks for p in c.parts]))
+
+        response = FakeResponse(chunks, record, delays)
+        if not stream:
+            time.sleep(sum(delays))
+            response.resolve()
+        return response
+
+    def _match(self, text):
+        for rule in self.model.script:
+            match = rule.pattern.search(text)
+            if match:
+                return rule, match
+        return None, None
@@ -0,0 +1,147 @@
+import os
+import sys
+import json
+import mmap
+from collections.abc import Mapping
+
+import faiss
+import numpy as np
+from langchain_core.documents import Document
+from langchain_community.docstore.base import Docstore
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+
+# On-disk layout of one index directory (written by build-rag.py):
+#   index.faiss        native FAISS index, memory-mapped at load
+#   docs.jsonl         one {"id", "page_content", "metadata"} record per FAISS row
+#   docs.offsets.npy   int64 byte offsets into docs.jsonl (rows + 1), memory-mapped
+INDEX_FILE = "index.faiss"
+DOCS_FILE = "docs.jsonl"
+OFFSETS_FILE = "docs.offsets.npy"
+
+
+def has_index(index_dir):
+    return all(os.path.exists(os.path.join(index_dir, f)) for f in (INDEX_FILE, DOCS_FILE, OFFSETS_FILE))
+
+
+# --- 1. READ-ONLY (SERVING) ---
+class LazyDocstore(Docstore):
+    """
+    Docstore over docs.jsonl, keyed by FAISS row. Records are parsed only when a search
+    returns them, so startup cost and private memory don't grow with the corpus; the
+    mapped pages are shared through the page cache by every process serving the index.
+    """
+
+    def __init__(self, index_dir):
+        self._offsets = np.load(os.path.join(index_dir, OFFSETS_FILE), mmap_mode="r")
+        with open(os.path.join(index_dir, DOCS_FILE), "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def record(self, row):
+        start, end = int(self._offsets[row]), int(self._offsets[row + 1])
+        return json.loads(self._data[start:end])
+
+    def search(self, search):
+        row = int(search)
+        if not 0 <= row < len(self):
+            return f"ID {search} not found."
+        rec = self.record(row)
+        return Document(page_content=rec["page_content"], metadata=rec["metadata"])
+
+
+class RowIds(Mapping):
+    """index_to_docstore_id for LazyDocstore: FAISS row i -> docstore key i, without a dict."""
+
+    def __init__(self, n):
+        self._n = n
+
+    def __getitem__(self, row):
+        if not 0 <= row < self._n:
+            raise KeyError(row)
+        return int(row)
+
+    def __iter__(self):
+        return iter(range(self._n))
+
+    def __len__(self):
+        return self._n
+
+
+def _read_faiss(index_dir, mmap_codes=True):
+    path = os.path.join(index_dir, INDEX_FILE)
+    if mmap_codes:
+        try:
+            return faiss.read_index(path, faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError:
+            pass   # index type without mmap support: read it normally
+    return faiss.read_index(path)
+
+
+def load_index(index_dir, embeddings):
+    """Read-only FAISS store for serving: mmap'd vectors + lazy docstore. No pickle involved."""
+    if not has_index(index_dir):
+        raise FileNotFoundError(f"No {DOCS_FILE} index in {index_dir} (run build-rag.py)")
+    index = _read_faiss(index_dir)
+    docstore = LazyDocstore(index_dir)
+    if index.ntotal != len(docstore):
+        raise ValueError(f"{index_dir}: {index.ntotal} vectors but {len(docstore)} documents")
+    return FAISS(embeddings, index, docstore, RowIds(index.ntotal))
+
+
+# --- 2. READ-WRITE (BUILDS) ---
+def load_index_for_update(index_dir, embeddings):
+    """Fully materialized store (in-memory index + docstore keyed by chunk id) that supports add/delete."""
+    index = _read_faiss(index_dir, mmap_codes=False)
+    lazy = LazyDocstore(index_dir)
+    docs, row_ids = {}, {}
+    for row in range(len(lazy)):
+        rec = lazy.record(row)
+        docs[rec["id"]] = Document(page_content=rec["page_content"], metadata=rec["metadata"])
+        row_ids[row] = rec["id"]
+    return FAISS(embeddings, index, InMemoryDocstore(docs), row_ids)
+
+
+def save_index(vector_store, index_dir):
+    """Write vector_store in the layout above. Each file is replaced atomically; index.faiss goes last."""
+    os.makedirs(index_dir, exist_ok=True)
+    docs_path = os.path.join(index_dir, DOCS_FILE)
+    offsets_path = os.path.join(index_dir, OFFSETS_FILE)
+    index_path = os.path.join(index_dir, INDEX_FILE)
+
+    offsets = [0]
+    with open(docs_path + ".tmp", "wb") as f:
+        for row in range(vector_store.index.ntotal):
+            doc_id = vector_store.index_to_docstore_id[row]
+            doc = vector_store.docstore.search(doc_id)
+            line = json.dumps(
+                {"id": doc_id, "page_content": doc.page_content, "metadata": doc.metadata}, ensure_ascii=False
+            ).encode("utf-8") + b"\n"
+            f.write(line)
+            offsets.append(offsets[-1] + len(line))
+    with open(offsets_path + ".tmp", "wb") as f:
+        np.save(f, np.asarray(offsets, dtype=np.int64))
+    faiss.write_index(vector_store.index, index_path + ".tmp")
+
+    os.replace(docs_path + ".tmp", docs_path)
+    os.replace(offsets_path + ".tmp", offsets_path)
+    os.replace(index_path + ".tmp", index_path)
+
+
+# --- 3. MIGRATION ---
+def migrate_pickle_index(index_dir):
+    """One-off conversion of a FAISS.save_local() directory you built yourself (unpickles index.pkl)."""
+    from langchain_core.embeddings import FakeEmbeddings
+    legacy = FAISS.load_local(index_dir, FakeEmbeddings(size=1), allow_dangerous_deserialization=True)
+    save_index(legacy, index_dir)
+    os.remove(os.path.join(index_dir, "index.pkl"))
+    print(f"   ✅ Converted {index_dir} ({legacy.index.ntotal} documents).")
+
+
+if __name__ == "__main__":
+    # python index_store.py faiss_index faiss_product_index
+    for directory in sys.argv[1:]:
+        migrate_pickle_index(directory)
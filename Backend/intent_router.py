@@ -0,0 +1,203 @@
+import re
+import json
+import threading
+
+import numpy as np
+
+# --- 1. GRAMMAR ---
+ORDER_ID = r"(?P<id>o\s?-?\s?\d{1,6})"
+# Politeness/fillers allowed around a command ("hey, could you please ... for me, thanks")
+_OPENER = r"^\s*(?:(?:hey|hi|ok(?:ay)?|so|um+|uh+)[,\s]+)?(?:(?:please|kindly)\s+)?"
+_ASK = r"(?:can|could|would|will) you\s+(?:please\s+)?"
+_WANT = r"i(?:'d| would) like (?:you )?to\s+|i (?:want|need) (?:you )?to\s+"
+_LEAD = _OPENER + r"(?:" + _ASK + r"|" + _WANT + r")?(?:please\s+)?"
+_TAIL_WORDS = r"(?:[\s,]*(?:please|now|thanks|thank you|for me))*"
+_TAIL = _TAIL_WORDS + r"[\s.!?]*$"
+# Mutating intents only take plain commands: "can you cancel O0042?" may be asking whether
+# it is possible, so questions go to the LLM instead of straight to an irreversible tool
+_COMMAND_LEAD = _OPENER + r"(?:" + _WANT + r")?(?:please\s+)?"
+_COMMAND_TAIL = _TAIL_WORDS + r"[\s.!]*$"
+_ORDER_REF = r"(?:my\s+|the\s+|this\s+)?(?:order\s+)?(?:number\s+|#\s*|id\s+)?" + ORDER_ID
+
+# Anything that can flip or question the command sends the utterance to the LLM
+NEGATION = re.compile(r"\b(?:don'?t|do not|not|never|no|stop|why|how|if|whether|undo)\b", re.IGNORECASE)
+QUESTION = re.compile(r"\?|\b(?:can|could|would|will|should|shall|may|might|do i|is it)\b", re.IGNORECASE)
+
+
+def clean_id(raw):
+    return re.sub(r"[\s-]", "", raw).upper()
+
+
+class Intent:
+    """One tool the router may call directly: full-utterance grammars + reply wording."""
+
+    def __init__(self, tool, patterns, reply, needs_id=True, mutating=False, examples=()):
+        self.tool = tool
+        lead, tail = (_COMMAND_LEAD, _COMMAND_TAIL) if mutating else (_LEAD, _TAIL)
+        self.patterns = [re.compile(lead + p + tail, re.IGNORECASE) for p in patterns]
+        self.reply = reply
+        self.needs_id = needs_id
+        self.mutating = mutating
+        self.examples = list(examples)
+
+    def args(self, order_id):
+        return {"order_id": order_id} if self.needs_id else {}
+
+
+def _rows(result):
+    try:
+        rows = json.loads(result)
+    except (TypeError, ValueError):
+        return None
+    return rows if isinstance(rows, list) and rows else None
+
+
+def _cancel_reply(result, args):
+    return f"I've cancelled order {args['order_id']}." if _rows(result) else result
+
+
+def _status_reply(result, args):
+    rows = _rows(result)
+    if not rows:
+        return result
+    return f"Order {args['order_id']} is currently {rows[0].get('order_status', 'being processed')}."
+
+
+def _history_reply(result, args):
+    return "Here are your orders." if _rows(result) else result
+
+
+INTENTS = [
+    Intent(
+        "cancel_order",
+        [r"cancel\s+" + _ORDER_REF],
+        _cancel_reply,
+        mutating=True,
+        examples=["cancel order O0042", "please cancel my order O0042", "I want to cancel O0042"],
+    ),
+    Intent(
+        "check_order_status",
+        [
+            r"(?:(?:check|get|tell me|what(?:'s| is))\s+(?:the\s+)?status\s+(?:of|for|on)\s+|status\s+(?:of|for|on)\s+"
+            r"|where(?:'s| is)\s+|track\s+)" + _ORDER_REF,
+            _ORDER_REF + r"\s+status",
+        ],
+        _status_reply,
+        examples=["status of O0017", "where is my order O0017", "track order O0017", "what's the status of O0017"],
+    ),
+    Intent(
+        "get_order_history",
+        [
+            r"(?:show|list|get|give|display|see)\s+(?:me\s+)?(?:all\s+)?(?:of\s+)?my\s+(?:past\s+|previous\s+|recent\s+|old\s+)?orders",
+            r"(?:(?:show|see|get)\s+(?:me\s+)?)?(?:what(?:'s| is)\s+)?my\s+(?:order history|orders)",
+            r"order history",
+        ],
+        _history_reply,
+        needs_id=False,
+        examples=["show my orders", "show me my order history", "list my past orders", "what have I ordered"],
+    ),
+]
+
+
+# --- 2. ROUTER ---
+class Route:
+    def __init__(self, intent, args, confidence, method):
+        self.intent = intent
+        self.tool = intent.tool
+        self.args = args
+        self.confidence = confidence
+        self.method = method   # "grammar" | "embedding"
+
+    def reply(self, result):
+        return self.intent.reply(result, self.args)
+
+
+class IntentRouter:
+    """
+    Runs before the LLM. route() returns a Route only when it is sure:
+    - grammar: the WHOLE utterance matches a command template (confidence 1.0)
+    - embedding (optional): nearest labeled example with cosine >= threshold, no
+      negation/question words, and exactly one order id when the tool needs one
+    Mutating intents (cancel) never route a question, only a plain command.
+    Everything else returns None and goes to the model as usual.
+    """
+
+    def __init__(self, intents=INTENTS, embed_fn=None, threshold=0.85):
+        self.intents = intents
+        self.embed_fn = embed_fn
+        self.threshold = threshold
+        self._example_vectors = None
+        self._example_intents = []
+        # route() runs on the request threads of every session at once
+        self._lock = threading.Lock()
+        self._routed = {}
+        self._fallbacks = 0
+
+    def route(self, text):
+        route = self._route(str(text).strip())
+        with self._lock:
+            if route is None:
+                self._fallbacks += 1
+            else:
+                key = f"{route.tool}/{route.method}"
+                self._routed[key] = self._routed.get(key, 0) + 1
+        return route
+
+    def _route(self, text):
+        for intent in self.intents:
+            for pattern in intent.patterns:
+                match = pattern.match(text)
+                if match:
+                    order_id = clean_id(match.group("id")) if intent.needs_id else None
+                    return Route(intent, intent.args(order_id), 1.0, "grammar")
+        if self.embed_fn is not None:
+            return self._classify(text)
+        return None
+
+    def _classify(self, text):
+        if NEGATION.search(text):
+            return None
+        vectors = self._examples()
+        query = self._unit(self.embed_fn(text))
+        scores = vectors @ query
+        best = int(np.argmax(scores))
+        intent = self._example_intents[best]
+        if scores[best] < self.threshold:
+            return None
+        if intent.mutating and QUESTION.search(text):
+            return None
+        order_ids = [clean_id(m.group("id")) for m in re.finditer(r"\b" + ORDER_ID + r"\b", text, re.IGNORECASE)]
+        if intent.needs_id and len(set(order_ids)) != 1:
+            return None
+        if not intent.needs_id and order_ids:
+            return None
+        return Route(intent, intent.args(order_ids[0] if order_ids else None), float(scores[best]), "embedding")
+
+    def _examples(self):
+        if self._example_vectors is None:
+            texts, owners = [], []
+            for intent in self.intents:
+                for example in intent.examples:
+                    texts.append(example)
+                    owners.append(intent)
+            # Owners first: another thread may use the vectors as soon as they are set
+            self._example_intents = owners
+            self._example_vectors = np.stack([self._unit(self.embed_fn(t)) for t in texts])
+        return self._example_vectors
+
+    def metrics(self):
+        with self._lock:
+            by_intent, fallbacks = dict(self._routed), self._fallbacks
+        routed = sum(by_intent.values())
+        total = routed + fallbacks
+        return {
+            "routed": routed,
+            "fallbacks": fallbacks,
+            "routed_share": routed / total if total else 0.0,
+            "by_intent": by_intent,
+        }
+
+    @staticmethod
+    def _unit(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
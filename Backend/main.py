@@ -3,28 +3,65 @@ import os
 import numpy as np
 import sounddevice as sd
 import queue
-import edge_tts
-import pygame
 import scipy.io.wavfile as wav
 from faster_whisper import WhisperModel
 from dotenv import load_dotenv
+from vad import EnergyVAD
+from streaming_asr import StreamingTranscriber
+from asr_service import ASRService, PROFILES
+from tts import SpeechPipeline, MixerPlayer, make_backend
+from startup import startup
+from tracing import tracer
 
 # --- CONFIGURATION ---
 load_dotenv()
-MODEL_SIZE = "base.en"
 SAMPLE_RATE = 16000
 
+# Speed/accuracy: fast (tiny.en greedy), balanced (base.en greedy), accurate (base.en beam 5), best (small.en beam 5)
+ASR_PROFILE = PROFILES[os.getenv("ASR_PROFILE", "accurate")]
+MODEL_SIZE = ASR_PROFILE.model_size
+
+# Parallel Whisper calls: one model replica (CTranslate2 worker) per concurrent decode,
+# with the cores split between them
+CPU_COUNT = os.cpu_count() or 1
+ASR_WORKERS = int(os.getenv("ASR_WORKERS", max(1, CPU_COUNT // 2)))
+# Short utterances queued together can be decoded as one joined clip (ASR_BATCH_CLIPS=8).
+# Off by default: words are routed back to callers by approximate timestamps, so until it
+# is validated on real Whisper a word near a boundary could reach another caller.
+ASR_BATCH_CLIPS = int(os.getenv("ASR_BATCH_CLIPS", 1))
+
 MIC_DEVICE_ID = 9
 
+# "edge" (neural voices, network) or "stub" (offline, for benchmarks)
+TTS_BACKEND = os.getenv("TTS_BACKEND", "edge")
+
+# Endpointing: stop recording after this much silence following speech
+VAD_TRAILING_SILENCE_MS = int(os.getenv("VAD_TRAILING_SILENCE_MS", 700))
+
 try:
     from ai import process_user_input
 except ImportError:
     def process_user_input(text): return f"I heard: {text} (Brain not connected)"
 
 # --- STATE ---
-print("⏳ Loading Whisper Model...")
-model = WhisperModel(MODEL_SIZE, device="cpu", compute_type="int8") 
-print("✅ Model Loaded!")
+# Loaded by the startup orchestrator (in the background next to ai.py's resources)
+def whisper_factory(profile, replicas, cpu_threads):
+    return WhisperModel(
+        profile.model_size, device="cpu", compute_type=profile.compute_type,
+        num_workers=replicas, cpu_threads=cpu_threads
+    )
+
+def load_asr():
+    return ASRService(
+        whisper_factory, ASR_PROFILE,
+        replicas=ASR_WORKERS, cpu_threads=max(1, CPU_COUNT // ASR_WORKERS),
+        max_batch_clips=ASR_BATCH_CLIPS,
+    )
+
+startup.register("asr", load_asr)
+
+def asr_service():
+    return startup.get("asr")
 
 audio_queue = queue.Queue()
 
@@ -85,31 +122,53 @@ def record_manual():
     return combined
 
 # --- 2. TRANSCRIPTION ---
+def _prepare(audio_data):
+    # Drop leading/trailing silence so Whisper doesn't decode it
+    audio_data = EnergyVAD().trim(audio_data)
+    # Normalize
+    return audio_data.astype(np.float32) / 32768.0
+
 def transcribe(audio_data):
     if len(audio_data) == 0:
         return ""
-    
-    # Normalize
-    audio_float = audio_data.astype(np.float32) / 32768.0
-    segments, info = model.transcribe(audio_float, beam_size=5)
-    
-    full_text = ""
-    for segment in segments:
-        full_text += segment.text
-    return full_text.strip()
+
+    with tracer.span("asr"):
+        return asr_service().transcribe(_prepare(audio_data))
+
+async def transcribe_async(audio_data):
+    """transcribe() for the event loop: the clip waits in the ASR queue without holding a thread."""
+    if len(audio_data) == 0:
+        return ""
+
+    with tracer.span("asr"):
+        # Silence trimming (and, right after boot, waiting for the model) stays off the event loop
+        loop = asyncio.get_running_loop()
+        audio, service = await loop.run_in_executor(None, lambda: (_prepare(audio_data), asr_service()))
+        return await asyncio.wrap_future(service.submit(audio))
+
+def streaming_transcriber():
+    """Partial-results transcriber for one utterance; its decodes run on the shared ASR workers."""
+    return StreamingTranscriber(asr_service().model_proxy())
 
 # --- 3. TTS ---
+# In-memory, sentence-pipelined speech; the pygame mixer stays initialized between turns.
+# Lazy: only the routes that play audio pay for opening the mixer.
+def load_speech():
+    return SpeechPipeline(make_backend(TTS_BACKEND), MixerPlayer())
+
+startup.register("speech", load_speech, lazy=True)
+
+def speech_pipeline():
+    return startup.get("speech")
+
 async def speak(text):
     # Removed the print statement from here so it doesn't double-print
-    communicate = edge_tts.Communicate(text, "en-US-AriaNeural")
-    await communicate.save("response.mp3")
-    
-    pygame.mixer.init()
-    pygame.mixer.music.load("response.mp3")
-    pygame.mixer.music.play()
-    while pygame.mixer.music.get_busy():
-        pygame.time.Clock().tick(10)
-    pygame.mixer.quit()
+    with tracer.span("tts"):
+        await speech_pipeline().speak(text)
+
+def speak_blocking(text):
+    """Sync wrapper so servers can run playback on a worker thread, not the event loop."""
+    asyncio.run(speak(text))
 
 # --- MAIN LOOP ---
 # --- MAIN LOOP ---
@@ -141,27 +200,52 @@ async def main_loop():
         # E. TTS (Start audio playback after text is handled)
         await speak(response_text)
 if __name__ == "__main__":
+    startup.start()
     try:
         asyncio.run(main_loop())
     except KeyboardInterrupt:
         print("\nGoodbye!")
 # Add this to main.py (doesn't matter where, usually near the bottom)
 def record_manual_api(duration=5):
-    print(f"🔴 API RECORDING ({duration}s)...")
+    """Records until the speaker stops (VAD endpoint) or `duration` seconds, whichever is first."""
+    with tracer.span("record"):
+        return _record_until_endpoint(duration)
+
+def _record_until_endpoint(duration):
+    print(f"🔴 API RECORDING (up to {duration}s)...")
     with audio_queue.mutex:
         audio_queue.queue.clear()
+
+    vad = EnergyVAD(trailing_silence_ms=VAD_TRAILING_SILENCE_MS)
+    max_samples = int(duration * SAMPLE_RATE)
+    blocks = []
+    captured = 0
     try:
-        recording = sd.rec(
-            int(duration * SAMPLE_RATE), 
+        stream = sd.InputStream(
+            device=MIC_DEVICE_ID, 
             samplerate=SAMPLE_RATE, 
             channels=2, 
             dtype='int16',
-            device=MIC_DEVICE_ID
+            blocksize=int(SAMPLE_RATE * 0.03), # 30ms blocks -> endpoint within one block
+            callback=audio_callback
         )
-        sd.wait()
-        if recording.ndim > 1 and recording.shape[1] == 2:
-            recording = recording[:, 0]
-        return recording.flatten()
+        with stream:
+            while captured < max_samples:
+                try:
+                    block = audio_queue.get(timeout=1.0)
+                except queue.Empty:
+                    break
+                if block.ndim > 1:
+                    block = block[:, 0]
+                blocks.append(block)
+                captured += len(block)
+                if vad.process(block):
+                    print(f"✅ End of speech after {captured / SAMPLE_RATE:.2f}s")
+                    break
     except Exception as e:
         print(f"❌ Error: {e}")
-        return np.array([])
\ No newline at end of file
+        return np.array([])
+
+    if not blocks:
+        return np.array([])
+    return np.concatenate(blocks)[:max_samples]
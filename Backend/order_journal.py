@@ -0,0 +1,130 @@
+import os
+import json
+import threading
+
+
+class OrderJournal:
+    """
+    Append-only mutation log (JSONL) in front of the orders JSON snapshot.
+    - append(): one fsync'd line per mutation -> O(1) I/O per cancel/return/update
+    - compaction: rewrites the snapshot in a background thread, then drops the old log
+    - replay(): snapshot + rotated log + live log are applied at startup
+
+    Entries are absolute field values ({"order_id": ..., "fields": {...}}), so
+    replaying an entry that is already in the snapshot is harmless.
+    """
+
+    def __init__(self, snapshot_path, compact_every=1000):
+        self.snapshot_path = snapshot_path
+        self.journal_path = snapshot_path + ".journal.jsonl"
+        self.rotated_path = snapshot_path + ".journal.old.jsonl"
+        self.compact_every = compact_every
+
+        self._lock = threading.Lock()
+        self._file = open(self.journal_path, "a", encoding="utf-8")
+        self._pending = 0
+        self._compacting = False
+        self._compactor = None
+        self._idle = threading.Event()   # set while no compaction runs
+        self._idle.set()
+
+    # --- STARTUP ---
+    def replay(self, apply_fn):
+        """Feeds every logged entry (oldest first) to apply_fn(entry). Returns the count."""
+        count = 0
+        for path in (self.rotated_path, self.journal_path):
+            if not os.path.exists(path):
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Torn last line from a crash mid-append: everything before it is durable
+                        print(f"⚠️ Skipping corrupt journal line in {os.path.basename(path)}")
+                        continue
+                    apply_fn(entry)
+                    count += 1
+        self._pending = count
+        return count
+
+    # --- WRITE PATH ---
+    def append(self, order_id, **fields):
+        line = json.dumps({"order_id": order_id, "fields": fields})
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._pending += 1
+
+    def rotate(self):
+        """Moves the live log aside so a snapshot taken right now covers it."""
+        with self._lock:
+            self._file.close()
+            if os.path.exists(self.rotated_path):
+                # A previous compaction died before finishing: keep both segments
+                with open(self.rotated_path, "a", encoding="utf-8") as dst, \
+                        open(self.journal_path, "r", encoding="utf-8") as src:
+                    dst.write(src.read())
+                    dst.flush()
+                    os.fsync(dst.fileno())
+                os.remove(self.journal_path)
+            else:
+                os.replace(self.journal_path, self.rotated_path)
+            self._file = open(self.journal_path, "a", encoding="utf-8")
+            self._pending = 0
+
+    # --- COMPACTION ---
+    def maybe_compact(self, snapshot_fn):
+        """Starts a background compaction once enough entries have piled up."""
+        with self._lock:
+            if self._compacting or self._pending < self.compact_every:
+                return
+            self._compacting = True
+            self._idle.clear()
+        self._compactor = threading.Thread(target=self._compact, args=(snapshot_fn,), daemon=True)
+        self._compactor.start()
+
+    def compact(self, snapshot_fn):
+        """
+        Synchronous compaction (shutdown, ai.save_to_disk, benchmarks). Waits out a running
+        one first, so everything logged up to the call is folded in. True once it is on disk.
+        """
+        while True:
+            self._idle.wait()
+            with self._lock:
+                if not self._compacting:
+                    self._compacting = True
+                    self._idle.clear()
+                    break
+        return self._compact(snapshot_fn)
+
+    def _compact(self, snapshot_fn):
+        try:
+            # snapshot_fn must rotate() and copy the data under the owner's write lock
+            df = snapshot_fn()
+            tmp_path = self.snapshot_path + ".tmp"
+            df.to_json(tmp_path, orient="records", indent=2)
+            with open(tmp_path, "rb") as f:
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.snapshot_path)
+            if os.path.exists(self.rotated_path):
+                os.remove(self.rotated_path)
+            return True
+        except Exception as e:
+            print(f"❌ Error compacting order journal: {e}")
+            return False
+        finally:
+            with self._lock:
+                self._compacting = False
+                self._idle.set()
+
+    def close(self):
+        """Closes the log (server shutdown, after compact()). A running compaction finishes first."""
+        if self._compactor is not None:
+            self._compactor.join()
+        with self._lock:
+            self._file.close()
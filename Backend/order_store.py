@@ -0,0 +1,306 @@
+import sys
+import threading
+from itertools import chain, repeat
+import numpy as np
+import pandas as pd
+
+# Few distinct values, repeated on every order: stored as integer codes into one copy of each
+CATEGORICAL_COLUMNS = ("customer_id", "order_status", "order_date")
+
+
+def clean_order_id(order_id):
+    """Normalizes spoken/typed IDs like 'O 0042' into 'O0042'."""
+    return str(order_id).replace(" ", "").strip()
+
+
+# --- STATE RULES (checked by OrderStore.transition under its write lock) ---
+def can_cancel(status):
+    return status.lower() not in ["delivered", "shipped", "out for delivery", "cancelled"]
+
+def can_return(status):
+    return status.lower() == "delivered"
+
+
+class Transition:
+    """Outcome of OrderStore.transition(): the order's status and version after the call."""
+    __slots__ = ("ok", "status", "version")
+
+    def __init__(self, ok, status, version):
+        self.ok = ok            # False: the rule or the expected version refused it (nothing written)
+        self.status = status
+        self.version = version
+
+
+class LineItems:
+    """
+    The `products` lists of every order, columnar (CSR).
+    - product_name / product_id interned: each distinct value stored once, an int32 code per item
+    - offsets: the order at row position p owns items offsets[p]:offsets[p + 1]
+    - product_name -> row positions of the orders holding it, built on the first probe
+    Items are {"product_id", "product_name"} as in order_database.json; products() rebuilds them.
+    """
+
+    def __init__(self, products):
+        lists = [p if isinstance(p, list) else () for p in products]
+        self.offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+        np.cumsum(np.fromiter(map(len, lists), dtype=np.int64, count=len(lists)), out=self.offsets[1:])
+        flat = list(chain.from_iterable(lists))
+
+        def codes(key):
+            codes, uniques = pd.factorize(np.asarray(list(map(dict.get, flat, repeat(key))), dtype=object))
+            # Trailing None so code -1 (missing) decodes without a branch
+            return codes.astype(np.int32), np.append(np.asarray(uniques, dtype=object), None)
+
+        self.name_codes, self._names = codes("product_name")
+        self.id_codes, self._ids = codes("product_id")
+        self._name_code = {name: code for code, name in enumerate(self._names[:-1])}
+
+        self._index_lock = threading.Lock()
+        self._postings = None           # row positions grouped by product_name code
+        self._posting_offsets = None
+
+    def __len__(self):
+        return len(self.name_codes)
+
+    def _build_postings(self):
+        with self._index_lock:
+            if self._postings is not None:
+                return
+            order_of_item = np.repeat(np.arange(len(self.offsets) - 1, dtype=np.int32), np.diff(self.offsets))
+            # Stable: within one product, positions stay ascending (row order, as the old explode)
+            by_name = np.argsort(self.name_codes, kind="stable")
+            self._posting_offsets = np.searchsorted(self.name_codes[by_name], np.arange(len(self._names)))
+            self._postings = order_of_item[by_name]
+
+    def orders_with(self, product_name):
+        """Row positions of the orders containing product_name (once per matching item)."""
+        code = self._name_code.get(product_name)
+        if code is None:
+            return np.empty(0, dtype=np.int32)
+        if self._postings is None:
+            self._build_postings()
+        return self._postings[self._posting_offsets[code]:self._posting_offsets[code + 1]]
+
+    def products(self, positions):
+        """[{"product_id", "product_name"}, ...] per row position."""
+        positions = np.asarray(positions, dtype=np.int64)
+        starts = self.offsets[positions]
+        lengths = self.offsets[positions + 1] - starts
+        # Gather the items of every requested order in one pass
+        items = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths) + np.arange(lengths.sum())
+        ids = self._ids[self.id_codes[items]].tolist()
+        names = self._names[self.name_codes[items]].tolist()
+
+        lists, i = [], 0
+        for n in lengths.tolist():
+            lists.append([{"product_id": ids[j], "product_name": names[j]} for j in range(i, i + n)])
+            i += n
+        return lists
+
+    def memory_usage(self):
+        arrays = (self.offsets, self.name_codes, self.id_codes, self._postings, self._posting_offsets)
+        return sum(a.nbytes for a in arrays if a is not None) + sum(
+            sys.getsizeof(v) for v in (*self._names[:-1], *self._ids[:-1]))
+
+class OrderStore:
+    """
+    Indexed view over the orders DataFrame.
+    - order_id    -> row position (O(1) point lookups)
+    - customer_id -> row positions, presorted newest first (history without re-sorting)
+    - product_name -> row positions, through the columnar LineItems
+    Columns are compact: customer_id, order_status and order_date are categoricals, and the
+    `products` lists live in LineItems (rebuilt only for the rows being serialized).
+    Mutations are persisted through an optional OrderJournal (write-ahead log) and
+    announced to subscribe()d listeners as (order_id, customer_id), e.g. for cache invalidation.
+
+    Every mutation goes through transition(): the state rule / version check, the journal
+    append and the in-memory write happen under one write lock (a single serialized writer),
+    so two requests can't both pass "can we cancel" and no update is lost. Each order has a
+    version, bumped per committed mutation (in memory, counted from startup), for
+    optimistic read-then-write callers.
+    """
+
+    def __init__(self, orders_df, journal=None):
+        self.df = orders_df.reset_index(drop=True)
+        self._columns = list(self.df.columns)
+        self.items = None
+        if 'products' in self.df.columns:
+            self.items = LineItems(self.df['products'].tolist())
+            # copy(): a bare drop() can keep the parsed dict lists alive with the source frame
+            self.df = self.df.drop(columns='products').copy()
+        for column in CATEGORICAL_COLUMNS:
+            if column in self.df.columns:
+                self.df[column] = self.df[column].astype("category")
+        self.journal = journal
+        self._write_lock = threading.Lock()
+        self._listeners = []
+        self._by_id = {}
+        self._customer_codes = np.empty(0, dtype=np.int8)
+        self._customer_offsets = np.zeros(1, dtype=np.int64)
+        self._customer_positions = np.empty(0, dtype=np.int64)
+        self._dates = np.empty(0, dtype="datetime64[ns]")
+        self._versions = np.zeros(len(self.df), dtype=np.int64)
+        self._build_indexes()
+
+        if journal is not None:
+            replayed = journal.replay(self._apply_entry)
+            if replayed:
+                print(f"   ✅ Replayed {replayed} journaled order updates.")
+
+    def _build_indexes(self):
+        self._by_id = {}
+        self._by_customer = {}
+        if self.df.empty:
+            return
+
+        # First occurrence wins, same as the old `matches[0]` lookups
+        for pos, oid in enumerate(self.df['order_id'].astype(str).tolist()):
+            self._by_id.setdefault(oid, pos)
+
+        # Parse each distinct date ONCE, then spread over the rows by category code
+        dates = self.df['order_date'].cat
+        parsed = np.append(pd.to_datetime(dates.categories).values.astype("datetime64[ns]"), np.datetime64("NaT"))
+        self._dates = parsed[dates.codes.to_numpy()]
+
+        # Positions grouped by customer, newest first (unparseable dates last), CSR like LineItems
+        customers = self.df['customer_id'].cat
+        ticks = self._dates.view(np.int64)
+        newest_first = np.where(np.isnat(self._dates), np.iinfo(np.int64).max, -ticks)
+        codes = self._customer_codes = customers.codes.to_numpy()
+        order = np.lexsort((newest_first, codes))
+        self._customer_positions = order
+        self._customer_offsets = np.searchsorted(codes[order], np.arange(len(customers.categories) + 1))
+        self._by_customer = {customer: code for code, customer in enumerate(customers.categories)}
+
+    @property
+    def empty(self):
+        return self.df.empty
+
+    def __len__(self):
+        return len(self.df)
+
+    # --- LOOKUPS ---
+    def find(self, order_id, customer_id=None):
+        """Row position of an order, or None. Pass customer_id to apply the privacy lock."""
+        pos = self._by_id.get(clean_order_id(order_id))
+        if pos is None:
+            return None
+        if customer_id is not None and self.df.at[pos, 'customer_id'] != customer_id:
+            return None
+        return pos
+
+    def status(self, pos):
+        return self.df.at[pos, 'order_status']
+
+    def version(self, pos):
+        return int(self._versions[pos])
+
+    def customer_positions(self, customer_id):
+        """Row positions for a customer, sorted by order_date (newest first)."""
+        code = self._by_customer.get(customer_id)
+        if code is None:
+            return []
+        return self._customer_positions[self._customer_offsets[code]:self._customer_offsets[code + 1]].tolist()
+
+    def product_positions(self, product_name, customer_id=None):
+        """Row positions of orders containing product_name, one per matching line item."""
+        if self.items is None:
+            return []
+        positions = self.items.orders_with(product_name)
+        if customer_id is not None:
+            code = self._by_customer.get(customer_id)
+            if code is None:
+                return []
+            positions = positions[self._customer_codes[positions] == code]
+        return positions.tolist()
+
+    def values(self, positions, columns):
+        """Current values of `columns` for the given rows, as records."""
+        return [{column: self.df.at[pos, column] for column in columns} for pos in positions]
+
+    # --- SERIALIZATION ---
+    def _with_products(self, rows, positions):
+        """rows with the `products` column put back, in the loaded column order."""
+        if self.items is None:
+            return rows
+        return rows.assign(products=self.items.products(positions))[self._columns]
+
+    def rows_json(self, positions, **kwargs):
+        return self._with_products(self.df.iloc[positions], positions).to_json(orient="records", **kwargs)
+
+    def history_json(self, customer_id):
+        positions = self.customer_positions(customer_id)
+        rows = self.df.iloc[positions].copy()
+        rows['order_date'] = self._dates[positions]
+        return self._with_products(rows, positions).to_json(orient="records", date_format='iso')
+
+    def memory_usage(self):
+        """Bytes held by the order columns, line items and indexes."""
+        by_id = sys.getsizeof(self._by_id) + sum(sys.getsizeof(oid) for oid in self._by_id)
+        return int(self.df.memory_usage(deep=True).sum()) + self._dates.nbytes + by_id + (
+            self._customer_positions.nbytes + self._customer_offsets.nbytes) + (
+            self.items.memory_usage() if self.items is not None else 0)
+
+    # --- MUTATIONS ---
+    def subscribe(self, listener):
+        """listener(order_id, customer_id) runs after every committed mutation."""
+        self._listeners.append(listener)
+
+    def transition(self, pos, new_status, allowed=None, expected_version=None):
+        """
+        Compare-and-set on order_status. Commits only if allowed(current_status) holds and
+        (when given) the order is still at expected_version; both are checked atomically
+        with the write. Returns a Transition.
+        """
+        order_id = str(self.df.at[pos, 'order_id'])
+        with self._write_lock:
+            current, version = self.status(pos), int(self._versions[pos])
+            if (expected_version is not None and version != expected_version) or (
+                    allowed is not None and not allowed(current)):
+                return Transition(False, current, version)
+            # Write-ahead: the log line is durable before memory changes
+            if self.journal is not None:
+                self.journal.append(order_id, order_status=new_status)
+            # Status is not indexed, so no index maintenance needed
+            self._set(pos, 'order_status', new_status)
+            self._versions[pos] = version = version + 1
+
+        for listener in self._listeners:
+            listener(order_id, self.df.at[pos, 'customer_id'])
+
+        if self.journal is not None:
+            self.journal.maybe_compact(self._snapshot)
+        return Transition(True, new_status, version)
+
+    def set_status(self, pos, new_status):
+        """Unconditional transition (admin updates)."""
+        return self.transition(pos, new_status)
+
+    def _apply_entry(self, entry):
+        pos = self._by_id.get(entry.get("order_id"))
+        if pos is None:
+            return
+        for field, value in entry.get("fields", {}).items():
+            self._set(pos, field, value)
+        self._versions[pos] += 1
+
+    def _set(self, pos, field, value):
+        column = self.df[field]
+        if isinstance(column.dtype, pd.CategoricalDtype) and value not in column.cat.categories:
+            # e.g. a status no order had at load time
+            self.df[field] = column.cat.add_categories([value])
+        self.df.at[pos, field] = value
+
+    def _snapshot(self):
+        # Rotate + copy under the write lock so no mutation falls between them
+        with self._write_lock:
+            self.journal.rotate()
+            rows = self.df.copy()
+        # Line items never change, so the products lists are rebuilt outside the lock
+        return self._with_products(rows, np.arange(len(rows)))
+
+    def flush(self):
+        """Folds the journal into the JSON snapshot right now. True once it is on disk."""
+        if self.journal is None:
+            return True
+        return self.journal.compact(self._snapshot)
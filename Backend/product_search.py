@@ -0,0 +1,70 @@
+import numpy as np
+from thefuzz import process, fuzz, utils
+
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """
+    Character-trigram inverted index over product names, built once at load.
+    search() shortlists names by intersecting the query's posting lists (rarest first,
+    skipping trigrams that match almost nothing), then rescores only that shortlist
+    with the same thefuzz scorer search_products always used.
+    Catalogs no bigger than the shortlist are rescored in full, so results are identical.
+    """
+
+    def __init__(self, names, shortlist=256):
+        self.names = list(names)
+        self.shortlist = shortlist
+        # name -> first row (same row the old `products_df[... == name].iloc[0]` picked)
+        self.first_row = {}
+        for pos, name in enumerate(self.names):
+            self.first_row.setdefault(name, pos)
+
+        postings = {}
+        for pos, name in enumerate(self.names):
+            for gram in _trigrams(utils.full_process(name)):
+                postings.setdefault(gram, []).append(pos)
+        self._postings = {gram: np.asarray(rows, dtype=np.int32) for gram, rows in postings.items()}
+
+    def __len__(self):
+        return len(self.names)
+
+    def candidates(self, query, limit=3):
+        """Row positions worth rescoring, in catalog order (keeps thefuzz tie-breaking)."""
+        if len(self.names) <= self.shortlist:
+            return range(len(self.names))
+        lists = sorted(
+            (self._postings[g] for g in _trigrams(utils.full_process(query)) if g in self._postings), key=len
+        )
+        if not lists:
+            return range(len(self.names))  # nothing to narrow on (e.g. 1-2 chars): exact scan
+
+        # Intersect rarest-first; a trigram that would leave < limit names is treated as a typo and skipped
+        rows, used = lists[0], 1
+        for postings in lists[1:]:
+            narrowed = _intersect(rows, postings)
+            if len(narrowed) >= limit:
+                rows, used = narrowed, used + 1
+        if used * 2 >= len(lists):
+            return rows[:self.shortlist].tolist()
+
+        # Query disagrees with every name on most trigrams: rank by shared-trigram count instead
+        hits = np.bincount(np.concatenate(lists), minlength=len(self.names))
+        k = min(self.shortlist, int(np.count_nonzero(hits)))
+        return np.sort(np.argpartition(hits, -k)[-k:]).tolist()
+
+    def search(self, query, limit=3):
+        """Same output as process.extract(query, names, limit, scorer=fuzz.partial_ratio)."""
+        rows = self.candidates(query, limit)
+        return process.extract(query, [self.names[r] for r in rows], limit=limit, scorer=fuzz.partial_ratio)
+
+
+def _intersect(small, large):
+    """Sorted-array intersection in O(len(small) * log(len(large)))."""
+    at = np.searchsorted(large, small)
+    at[at == len(large)] = 0
+    return small[large[at] == small]
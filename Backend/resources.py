@@ -0,0 +1,130 @@
+import os
+import time
+import threading
+from collections import deque
+
+
+class Snapshot:
+    """One generation of reloadable resources; attributes are whatever the loader returned."""
+
+    def __init__(self, version, resources, build_ms):
+        self.__dict__.update(resources)
+        self.version = version
+        self.build_ms = build_ms
+        self.loaded_at = time.time()
+
+
+class ResourceRegistry:
+    """
+    Versioned holder for read-mostly resources (catalog, FAISS/BM25 indexes).
+    - current() is a plain attribute read: readers never block, and a caller that kept a
+      snapshot keeps using it after a swap (in-flight turns finish on the old version)
+    - reload() builds the next snapshot off to the side, then swaps the reference;
+      a failed build leaves the live snapshot untouched
+    - watch() polls the mtimes of `watch_paths` and reloads once they stop changing
+    - subscribe(listener): listener(snapshot) runs after every successful reload()
+    """
+
+    def __init__(self, loader, watch_paths=()):
+        self._loader = loader
+        self.watch_paths = list(watch_paths)
+        self._current = None
+        self._version = 0
+        self._reload_lock = threading.Lock()   # one build at a time; never taken by readers
+        self._signature = None
+        self._listeners = []
+
+        self._reloads = 0
+        self._failures = 0
+        self._last_error = None
+        self._build_ms = deque(maxlen=100)
+        self._swap_ms = deque(maxlen=100)
+
+    def current(self):
+        return self._current
+
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+    # --- RELOAD ---
+    def reload(self):
+        """Load and publish a new snapshot. Raises (keeping the old one live) if the loader fails."""
+        with self._reload_lock:
+            signature = self._paths_signature()
+            start = time.perf_counter()
+            try:
+                resources = self._loader()
+            except Exception as e:
+                self._signature = signature   # don't retry until the files change again
+                self._failures += 1
+                self._last_error = f"{type(e).__name__}: {e}"
+                raise
+            snapshot = self._publish(resources, (time.perf_counter() - start) * 1000)
+            self._signature = signature
+            self._reloads += 1
+            self._last_error = None
+        for listener in self._listeners:
+            listener(snapshot)
+        return snapshot
+
+    def publish(self, resources):
+        """Swap in resources built elsewhere (e.g. empty fallbacks when the first load fails)."""
+        with self._reload_lock:
+            return self._publish(resources, 0.0)
+
+    def _publish(self, resources, build_ms):
+        snapshot = Snapshot(self._version + 1, resources, build_ms)
+        start = time.perf_counter()
+        self._current = snapshot   # single reference assignment: atomic for readers
+        self._version = snapshot.version
+        self._swap_ms.append((time.perf_counter() - start) * 1000)
+        self._build_ms.append(build_ms)
+        return snapshot
+
+    # --- FILE WATCHER ---
+    def _paths_signature(self):
+        signature = []
+        for path in self.watch_paths:
+            try:
+                stat = os.stat(path)
+                signature.append((path, stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append((path, None, None))
+        return tuple(signature)
+
+    def watch(self, poll_s=2.0):
+        """Background poller; a change must hold still for one poll (build-rag writes several files)."""
+        def loop():
+            pending = None
+            while True:
+                time.sleep(poll_s)
+                signature = self._paths_signature()
+                if signature == self._signature:
+                    pending = None
+                elif signature != pending:
+                    pending = signature
+                else:
+                    pending = None
+                    try:
+                        snapshot = self.reload()
+                        print(f"🔁 Resources reloaded (v{snapshot.version}, {snapshot.build_ms:.0f} ms build)")
+                    except Exception as e:
+                        print(f"⚠️ Reload failed, keeping v{self._version}: {e}")
+
+        thread = threading.Thread(target=loop, daemon=True, name="resource-watcher")
+        thread.start()
+        return thread
+
+    # --- METRICS ---
+    def metrics(self):
+        snapshot = self._current
+        return {
+            "version": snapshot.version if snapshot else 0,
+            "loaded_at": snapshot.loaded_at if snapshot else None,
+            "reloads": self._reloads,
+            "failures": self._failures,
+            "last_error": self._last_error,
+            "last_build_ms": self._build_ms[-1] if self._build_ms else 0.0,
+            "last_swap_ms": self._swap_ms[-1] if self._swap_ms else 0.0,
+            "max_swap_ms": max(self._swap_ms) if self._swap_ms else 0.0,
+        }
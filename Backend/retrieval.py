@@ -0,0 +1,165 @@
+import os
+import re
+import json
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from langchain_core.documents import Document
+
+BM25_FILE = "bm25.json"
+TOKEN = re.compile(r"[a-z0-9]+")
+
+# Dense and sparse lanes of a query run side by side
+_lanes = ThreadPoolExecutor(max_workers=8, thread_name_prefix="retrieval")
+
+
+def tokenize(text):
+    return TOKEN.findall(str(text).lower())
+
+
+# --- 1. SPARSE INDEX ---
+class BM25Index:
+    """
+    Okapi BM25 over the same documents as a FAISS store (built by build-rag.py).
+    Postings are keyed by FAISS row; `fetch(row)` returns the Document, so a loaded index
+    reads hits from the index's LazyDocstore instead of keeping a second copy of the text.
+    """
+
+    def __init__(self, fetch, postings, doc_len, k1=1.5, b=0.75):
+        self.fetch = fetch
+        self.k1 = k1
+        self.b = b
+        self.doc_len = np.asarray(doc_len, dtype=np.float32)
+        self.avg_len = float(self.doc_len.mean()) if len(self.doc_len) else 0.0
+        n = len(self.doc_len)
+        # term -> (doc rows, term frequencies, idf)
+        self.postings = {}
+        for term, (rows, tfs) in postings.items():
+            rows = np.asarray(rows, dtype=np.int32)
+            tfs = np.asarray(tfs, dtype=np.float32)
+            idf = math.log(1 + (n - len(rows) + 0.5) / (len(rows) + 0.5))
+            self.postings[term] = (rows, tfs, idf)
+
+    def __len__(self):
+        return len(self.doc_len)
+
+    @classmethod
+    def from_documents(cls, docs, fetch=None, **kwargs):
+        """Index `docs` (row i = docs[i]); fetch defaults to the list itself."""
+        docs = list(docs)
+        postings = {}
+        doc_len = []
+        for row, doc in enumerate(docs):
+            tokens = tokenize(doc.page_content)
+            doc_len.append(len(tokens))
+            counts = {}
+            for t in tokens:
+                counts[t] = counts.get(t, 0) + 1
+            for term, tf in counts.items():
+                rows, tfs = postings.setdefault(term, ([], []))
+                rows.append(row)
+                tfs.append(tf)
+        return cls(fetch or docs.__getitem__, postings, doc_len, **kwargs)
+
+    def search(self, query, k=10):
+        """Top-k Documents by BM25 score (only documents sharing a term with the query)."""
+        if not len(self):
+            return []
+        scores = np.zeros(len(self), dtype=np.float32)
+        norm = self.k1 * (1 - self.b + self.b * self.doc_len / max(self.avg_len, 1e-9))
+        for term in set(tokenize(query)):
+            if term not in self.postings:
+                continue
+            rows, tfs, idf = self.postings[term]
+            scores[rows] += idf * tfs * (self.k1 + 1) / (tfs + norm[rows])
+        hits = np.flatnonzero(scores)
+        top = hits[np.argsort(-scores[hits], kind="stable")][:k]
+        return [self.fetch(int(row)) for row in top]
+
+    # --- PERSISTENCE ---
+    def save(self, index_dir):
+        """Statistics and postings only; the text stays in the index's docs.jsonl."""
+        payload = {
+            "k1": self.k1, "b": self.b,
+            "doc_len": self.doc_len.astype(int).tolist(),
+            "postings": {term: [rows.tolist(), tfs.astype(int).tolist()] for term, (rows, tfs, _) in self.postings.items()},
+        }
+        with open(os.path.join(index_dir, BM25_FILE), "w", encoding="utf-8") as f:
+            json.dump(payload, f)
+
+    @classmethod
+    def load(cls, index_dir, fetch):
+        with open(os.path.join(index_dir, BM25_FILE), "r", encoding="utf-8") as f:
+            payload = json.load(f)
+        if "docs" in payload:
+            raise ValueError("bm25.json predates row-keyed postings (run build-rag.py --bm25-only)")
+        return cls(fetch, payload["postings"], payload["doc_len"], k1=payload["k1"], b=payload["b"])
+
+
+def load_bm25(index_dir, vector_store):
+    """
+    bm25.json from build-rag.py, reading documents through the vector store's docstore.
+    A missing, outdated or mismatched file is rebuilt in memory from the docstore.
+    """
+    n = vector_store.index.ntotal
+    fetch = lambda row: vector_store.docstore.search(vector_store.index_to_docstore_id[row])
+    if os.path.exists(os.path.join(index_dir, BM25_FILE)):
+        try:
+            bm25 = BM25Index.load(index_dir, fetch)
+            if len(bm25) == n:
+                return bm25
+            problem = f"covers {len(bm25)} documents, the index has {n}"
+        except (ValueError, KeyError) as e:
+            problem = str(e)
+    else:
+        problem = "missing"
+    print(f"   ⚠️ {BM25_FILE} in {os.path.basename(index_dir)}: {problem}; building it from the vector store (run build-rag.py).")
+    return BM25Index.from_documents([fetch(row) for row in range(n)], fetch=fetch)
+
+
+# --- 2. FUSION ---
+def reciprocal_rank_fusion(rankings, key, k=60):
+    """
+    Standard RRF: score(d) = sum over rankings of 1 / (k + rank). Returns docs best first.
+    A key repeated within one ranking (duplicate catalog names) counts once, at its best rank.
+    """
+    scores, docs = {}, {}
+    for ranking in rankings:
+        seen = set()
+        for rank, doc in enumerate(ranking):
+            doc_key = key(doc)
+            if doc_key in seen:
+                continue
+            seen.add(doc_key)
+            scores[doc_key] = scores.get(doc_key, 0.0) + 1.0 / (k + rank + 1)
+            docs.setdefault(doc_key, doc)
+    return [docs[d] for d in sorted(scores, key=scores.get, reverse=True)]
+
+
+class HybridRetriever:
+    """
+    One query -> dense (FAISS) and sparse (BM25) lanes in parallel -> RRF.
+    `allow` filters each lane before fusion; `extra_rankings` adds more lanes (e.g. fuzzy names).
+    """
+
+    def __init__(self, vector_store, bm25, key=lambda doc: doc.page_content, fetch_k=20, rrf_k=60):
+        self.vector_store = vector_store
+        self.bm25 = bm25
+        self.key = key
+        self.fetch_k = fetch_k
+        self.rrf_k = rrf_k
+
+    def search(self, query, k=3, allow=None, extra_rankings=()):
+        # Filtering drops candidates, so look further down each lane
+        fetch_k = self.fetch_k * 5 if allow else self.fetch_k
+        lanes = []
+        if self.vector_store is not None:
+            lanes.append(_lanes.submit(self.vector_store.similarity_search, query, k=fetch_k))
+        if self.bm25 is not None:
+            lanes.append(_lanes.submit(self.bm25.search, query, fetch_k))
+        rankings = [lane.result() for lane in lanes] + list(extra_rankings)
+
+        if allow is not None:
+            rankings = [[d for d in ranking if allow(d)] for ranking in rankings]
+        return reciprocal_rank_fusion(rankings, self.key, self.rrf_k)[:k]
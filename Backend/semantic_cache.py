@@ -0,0 +1,94 @@
+import copy
+import time
+import threading
+
+import numpy as np
+
+
+class SemanticCache:
+    """
+    Whole-turn answers for near-duplicate utterances ("how long do refunds take" ~
+    "how many days until I get my refund").
+    - embed_fn turns the utterance into a vector; entries live in a fixed-size matrix of
+      unit vectors and a lookup is one matrix-vector product (exact nearest neighbour,
+      microseconds at these sizes)
+    - a hit needs cosine similarity >= threshold and the same `version` as the entry
+      (catalog snapshot), within ttl_s
+    - at max_entries the least recently used entry's slot is reused
+    What is safe to store is the caller's decision; this class only matches text.
+    """
+
+    def __init__(self, embed_fn, threshold=0.92, max_entries=1000, ttl_s=3600):
+        self.embed_fn = embed_fn
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._vectors = None                          # (max_entries, dim), allocated on first store
+        self._live = np.zeros(max_entries, dtype=bool)
+        self._entries = [None] * max_entries          # slot -> (text, value, version, expires_at, last_used)
+
+        self._lookups = 0
+        self._hits = 0
+        self._stores = 0
+        self._evictions = 0
+        self._similarity = 0.0
+
+    def _embed(self, text):
+        vector = np.asarray(self.embed_fn(text), dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def lookup(self, text, version=None):
+        """Cached value for the closest stored utterance, or None."""
+        vector = self._embed(text)
+        now = time.monotonic()
+        with self._lock:
+            self._lookups += 1
+            if self._vectors is None or not self._live.any():
+                return None
+            scores = np.where(self._live, self._vectors @ vector, -1.0)
+            # Best first among the matches; stale ones are freed and the next one is tried
+            candidates = np.flatnonzero(scores >= self.threshold)
+            for slot in candidates[np.argsort(-scores[candidates], kind="stable")].tolist():
+                _, value, entry_version, expires_at, _ = self._entries[slot]
+                if expires_at < now or entry_version != version:
+                    self._free(slot)
+                    continue
+                self._entries[slot] = self._entries[slot][:4] + (now,)
+                self._hits += 1
+                self._similarity += float(scores[slot])
+                return copy.deepcopy(value)
+            return None
+
+    def store(self, text, value, version=None):
+        vector = self._embed(text)
+        now = time.monotonic()
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, len(vector)), dtype=np.float32)
+            if self._live.all():
+                slot = min(range(self.max_entries), key=lambda s: self._entries[s][4])
+                self._evictions += 1
+            else:
+                slot = int(np.argmin(self._live))
+            self._vectors[slot] = vector
+            self._live[slot] = True
+            self._entries[slot] = (text, copy.deepcopy(value), version, now + self.ttl_s, now)
+            self._stores += 1
+
+    def _free(self, slot):
+        self._live[slot] = False
+        self._entries[slot] = None
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "entries": int(self._live.sum()),
+                "lookups": self._lookups,
+                "hits": self._hits,
+                "hit_rate": self._hits / self._lookups if self._lookups else 0.0,
+                "avg_hit_similarity": self._similarity / self._hits if self._hits else 0.0,
+                "stores": self._stores,
+                "evictions": self._evictions,
+                "threshold": self.threshold,
+            }
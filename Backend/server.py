@@ -1,10 +1,85 @@
-from fastapi import FastAPI, BackgroundTasks # Import BackgroundTasks
+import os
+import json
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import FastAPI, BackgroundTasks, HTTPException, Request, WebSocket, WebSocketDisconnect # Import BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 import main  
 import ai    
+from startup import startup
+from tracing import tracer
+from audio_ingest import MAX_UTTERANCE_SECONDS, PCMRingBuffer, make_decoder
 
 app = FastAPI()
 
+# Whisper, the embedding model, orders and indexes load in parallel background threads
+# while the server comes up; /ready reports when they're in and how long each took
+startup.start()
+
+
+@app.on_event("shutdown")
+async def save_orders():
+    # Fold the order journal into the JSON snapshot and close it (waits for a running compaction)
+    await asyncio.to_thread(ai.shutdown)
+
+
+# --- EXECUTORS (keep blocking work off the event loop) ---
+# One physical mic -> one recorder at a time
+record_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="record")
+# Streaming partial/final decodes block on the ASR pool (main.asr_service()); whole clips
+# are awaited directly (main.transcribe_async), so queued clips can be batched
+asr_executor = ThreadPoolExecutor(max_workers=main.ASR_WORKERS, thread_name_prefix="whisper")
+
+
+# --- ADMISSION CONTROL ---
+class AdmissionGate:
+    """At most max_active requests in the pipeline, at most max_waiting queued behind them."""
+
+    def __init__(self, max_active, max_waiting):
+        self.max_waiting = max_waiting
+        self._slots = asyncio.Semaphore(max_active)
+        self._waiting = 0
+
+    async def __aenter__(self):
+        if self._slots.locked() and self._waiting >= self.max_waiting:
+            raise HTTPException(status_code=503, detail="Server busy, try again shortly.")
+        self._waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self._waiting -= 1
+
+    async def __aexit__(self, *exc):
+        self._slots.release()
+
+
+class AdmittedStream(StreamingResponse):
+    """StreamingResponse holding a gate slot taken by the handler; frees it when the response ends."""
+
+    def __init__(self, gate, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._gate = gate
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self._gate.__aexit__(None, None, None)
+
+
+gate = AdmissionGate(
+    max_active=int(os.getenv("MAX_ACTIVE_REQUESTS", 16)),
+    max_waiting=int(os.getenv("MAX_QUEUED_REQUESTS", 64)),
+)
+
+# customer_id is taken from the request as-is (demo): put authentication in front of this
+# server in production. A session_id stays bound to the customer that opened it.
+@app.exception_handler(PermissionError)
+async def session_owner_mismatch(request, exc):
+    return JSONResponse(status_code=403, content={"detail": str(exc)})
+
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -13,41 +88,360 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 200 once every eager resource is loaded, 503 until then; per-resource timings either way."""
+    report = startup.report()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
+
 @app.get("/reset-chat")
-async def reset_chat():
-    print("🔄 UI REFRESH: Clearing AI Context...")
+async def reset_chat(session_id: str, customer_id: str):
+    print(f"🔄 UI REFRESH: Clearing AI Context for session {session_id}...")
     try:
-        # Assuming you have a reset function in your ai.py
-        ai.reset_session() 
+        # Only the owner can wipe a conversation (403 otherwise, see handle_foreign_session)
+        ai.reset_session(session_id, customer_id)
         return {"status": "success", "message": "Context cleared."}
+    except PermissionError:
+        raise
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
 
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus scrape endpoint: request and per-stage latency histograms (record, asr, llm, tool, tts, ...)."""
+    return PlainTextResponse(tracer.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/traces/{trace_id}")
+async def get_trace(trace_id: str):
+    """Span breakdown of one recent request (the trace_id every agent response carries)."""
+    trace = tracer.get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired trace id.")
+    return trace
+
+
+@app.get("/metrics/asr")
+async def asr_metrics():
+    """ASR pool: profile, replicas, queue depth, batch sizes and audio-seconds per second."""
+    asr = startup.peek("asr")
+    if asr is None:
+        return {"status": "unavailable"}
+    return asr.metrics()
+
+
+@app.get("/metrics/embeddings")
+async def embedding_metrics():
+    """Query-embedding cache hit rate, batch size and latency."""
+    embeddings = startup.peek("embeddings")
+    if embeddings is None:
+        return {"status": "unavailable"}
+    return embeddings.metrics()
+
+
+@app.get("/metrics/tools")
+async def tool_metrics():
+    """Tool-result cache: per-tool hits, misses, invalidations and latency saved."""
+    return ai.tool_cache.metrics()
+
+
+@app.get("/metrics/response-cache")
+async def response_cache_metrics():
+    """Semantic response cache (SEMANTIC_CACHE=1): entries, hit rate, evictions."""
+    if ai.response_cache is None:
+        return {"status": "disabled"}
+    return ai.response_cache.metrics()
+
+
+@app.get("/metrics/intent-router")
+async def intent_router_metrics():
+    """Utterances answered by the local intent router vs. sent to the LLM."""
+    if ai.intent_router is None:
+        return {"status": "disabled"}
+    return ai.intent_router.metrics()
+
+
+@app.post("/reload")
+async def reload_resources():
+    """Rebuild catalog + FAISS/BM25 in the background and swap them in; in-flight turns keep the old snapshot."""
+    loop = asyncio.get_running_loop()
+    try:
+        snapshot = await loop.run_in_executor(None, ai.reload_catalog)
+    except Exception as e:
+        return {"status": "error", "message": str(e), **ai.catalog.metrics()}
+    return {"status": "success", "version": snapshot.version, "build_ms": snapshot.build_ms, **ai.catalog.metrics()}
+
+
+@app.get("/metrics/resources")
+async def resource_metrics():
+    """Live catalog/index version, reload counts and swap timings."""
+    return ai.catalog.metrics()
+
+
 @app.get("/run-agent")
-async def run_agent(background_tasks: BackgroundTasks):
+async def run_agent(
+    background_tasks: BackgroundTasks,
+    session_id: str = ai.DEFAULT_SESSION_ID,
+    customer_id: str = ai.CURRENT_USER_ID,
+):
     print("\n⚡ API CALL: Processing Voice Request...")
-    
-    # 1. Record
-    audio_data = main.record_manual_api(duration=5)
-    
+    with tracer.trace("/run-agent") as trace:
+        async with gate:
+            loop = asyncio.get_running_loop()
+
+            # 1. Record
+            audio_data = await loop.run_in_executor(record_executor, tracer.bind(main.record_manual_api), 5)
+
+            if len(audio_data) == 0:
+                return {"bot_text": "I didn't hear anything.", "type": None, "items": [], "trace_id": trace.trace_id}
+
+            # 2. Transcribe 
+            # MAKE SURE THIS VARIABLE NAME IS 'user_text'
+            user_text = await main.transcribe_async(audio_data)
+            print(f"👤 User: {user_text}")
+
+            # 3. Brain
+            # Now 'user_text' exists and can be passed here
+            structured_response = await ai.process_user_input_async(user_text, session_id=session_id, customer_id=customer_id)
+
+        structured_response["user_text"] = user_text
+        structured_response["trace_id"] = trace.trace_id
+
+        # 4. Background Audio (sync task -> Starlette runs it in its threadpool)
+        # Its "tts" span lands on this trace after the response has gone out
+        bot_message_text = structured_response.get("bot_text", "")
+        if bot_message_text:
+            background_tasks.add_task(tracer.bind(main.speak_blocking), bot_message_text)
+
+        return structured_response
+
+
+# --- STREAMING (Server-Sent Events) ---
+async def _stream_turn(user_text, session_id, customer_id, speak):
+    """
+    Events for one turn: transcript -> tool results / text deltas -> done.
+    With speak=True, the server speaker starts on the first complete sentence.
+    """
+    yield {"event": "transcript", "text": user_text}
+
+    deltas = asyncio.Queue()
+
+    async def spoken_text():
+        while (delta := await deltas.get()) is not None:
+            yield delta
+
+    if speak:
+        # First use opens the audio device (lazy resource): keep that off the event loop
+        speech = await asyncio.get_running_loop().run_in_executor(None, main.speech_pipeline)
+        speaker = asyncio.create_task(_speak_stream(speech, spoken_text()))
+        speaker.add_done_callback(_log_tts_failure)
+    try:
+        async for event in ai.stream_user_input_async(user_text, session_id=session_id, customer_id=customer_id):
+            if event["event"] == "delta":
+                deltas.put_nowait(event["text"])
+            elif event["event"] == "done":
+                event["user_text"] = user_text
+                event["trace_id"] = tracer.current_trace_id()
+            yield event
+    finally:
+        deltas.put_nowait(None)
+
+
+async def _speak_stream(speech, text):
+    with tracer.span("tts", mode="stream"):
+        await speech.speak_stream(text)
+
+
+def _log_tts_failure(task):
+    if not task.cancelled() and task.exception():
+        print(f"❌ TTS error: {task.exception()}")
+
+
+def _sse(event):
+    return f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+
+
+@app.get("/run-agent/stream")
+async def run_agent_stream(
+    session_id: str = ai.DEFAULT_SESSION_ID,
+    customer_id: str = ai.CURRENT_USER_ID,
+):
+    """/run-agent as an SSE stream: events arrive as soon as each stage produces them."""
+    print("\n⚡ API CALL: Processing Voice Request (streaming)...")
+    # Session owner check up front: once the stream has started it can't become a 403
+    ai.sessions.get(session_id, customer_id)
+
+    async def events():
+        with tracer.trace("/run-agent/stream") as trace:
+            loop = asyncio.get_running_loop()
+            yield _sse({"event": "listening", "trace_id": trace.trace_id})
+            audio_data = await loop.run_in_executor(record_executor, tracer.bind(main.record_manual_api), 5)
+            if len(audio_data) == 0:
+                yield _sse({"event": "done", "bot_text": "I didn't hear anything.", "type": None, "items": [], "user_text": "", "trace_id": trace.trace_id})
+                return
+
+            user_text = await main.transcribe_async(audio_data)
+            print(f"👤 User: {user_text}")
+            async for event in _stream_turn(user_text, session_id, customer_id, speak=True):
+                yield _sse(event)
+
+    # Admission too: a full server must answer 503, not a 200 stream that errors out.
+    # The slot is held until the response finishes (or the client goes away).
+    await gate.__aenter__()
+    return AdmittedStream(gate, events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+# --- CLIENT AUDIO (remote callers, no server mic) ---
+async def _decode(method, *args):
+    """decoder.feed/close, on a thread for decoders that block on a pipe (ffmpeg)."""
+    if getattr(method.__self__, "blocking", False):
+        return await asyncio.to_thread(method, *args)
+    return method(*args)
+
+
+async def _answer(audio_data, session_id, customer_id):
+    """Shared tail of the upload endpoints: transcribe -> brain."""
     if len(audio_data) == 0:
-        return {"bot_text": "I didn't hear anything.", "type": None, "items": []}
+        return {"bot_text": "I didn't hear anything.", "type": None, "items": [], "user_text": "", "trace_id": tracer.current_trace_id()}
 
-    # 2. Transcribe 
-    # MAKE SURE THIS VARIABLE NAME IS 'user_text'
-    user_text = main.transcribe(audio_data) 
-    print(f"👤 User: {user_text}")
+    user_text = await main.transcribe_async(audio_data)
+    return await _reply(user_text, session_id, customer_id)
 
-    # 3. Brain
-    # Now 'user_text' exists and can be passed here
-    structured_response = ai.process_user_input(user_text)
 
+async def _reply(user_text, session_id, customer_id):
+    print(f"👤 User ({session_id}): {user_text}")
+    structured_response = await ai.process_user_input_async(user_text, session_id=session_id, customer_id=customer_id)
     structured_response["user_text"] = user_text
-    
-    # 4. Background Audio
-    bot_message_text = structured_response.get("bot_text", "")
-    if bot_message_text:
-        background_tasks.add_task(main.speak, bot_message_text)
-    
-    return structured_response
\ No newline at end of file
+    structured_response["trace_id"] = tracer.current_trace_id()
+    return structured_response
+
+
+@app.post("/run-agent/audio")
+async def run_agent_audio(
+    request: Request,
+    session_id: str = ai.DEFAULT_SESSION_ID,
+    customer_id: str = ai.CURRENT_USER_ID,
+    sample_rate: int = 16000,
+    channels: int = 1,
+):
+    """
+    Client-recorded utterance in the request body (chunked upload welcome).
+    Content-Type: audio/wav, audio/pcm (s16le, see sample_rate/channels) or audio/ogg|webm|opus.
+    """
+    print(f"\n⚡ API CALL: Audio upload ({session_id})...")
+    try:
+        decoder = make_decoder(request.headers.get("content-type"), sample_rate, channels)
+    except ValueError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+
+    try:
+        with tracer.trace("/run-agent/audio"):
+            async with gate:
+                # Decode while the body is still arriving
+                buffer = PCMRingBuffer()
+                try:
+                    with tracer.span("upload"):
+                        async for chunk in request.stream():
+                            buffer.write(await _decode(decoder.feed, chunk))
+                            if buffer.overflowed:
+                                break
+                        else:
+                            buffer.write(await _decode(decoder.close))
+                except ValueError as e:
+                    raise HTTPException(status_code=400, detail=str(e))
+                # The buffer only keeps the newest audio: answering would drop the start of the question
+                if buffer.overflowed:
+                    raise HTTPException(status_code=413, detail=f"Audio longer than {MAX_UTTERANCE_SECONDS}s.")
+
+                return await _answer(buffer.read(), session_id, customer_id)
+    finally:
+        # Client gone mid-upload, busy server, decode error: don't leave ffmpeg running
+        await _decode(decoder.abort)
+
+
+@app.websocket("/ws/agent")
+async def agent_socket(websocket: WebSocket):
+    """
+    Streaming variant. Protocol per turn:
+      -> {"format": "pcm"|"wav"|"opus", "sample_rate": 16000, "channels": 1}   (optional, text)
+      -> binary audio frames
+      <- {"event": "partial", "stable": "...", "partial": "..."}               (while audio arrives)
+      -> {"event": "end"}                                                      (text)
+      <- the same JSON as /run-agent, or with stream=1 the /run-agent/stream events
+    Query params: session_id, customer_id, partials (default 1), stream (default 0).
+    """
+    await websocket.accept()
+    session_id = websocket.query_params.get("session_id", ai.DEFAULT_SESSION_ID)
+    customer_id = websocket.query_params.get("customer_id", ai.CURRENT_USER_ID)
+    partials = websocket.query_params.get("partials", "1") != "0"
+    stream = websocket.query_params.get("stream", "0") == "1"
+    loop = asyncio.get_running_loop()
+
+    async def send_partial(transcriber):
+        hypothesis = await loop.run_in_executor(asr_executor, transcriber.partial)
+        await websocket.send_json({"event": "partial", **hypothesis})
+
+    decoder = None
+
+    async def new_turn():
+        if decoder is not None:
+            await _decode(decoder.abort)
+        return make_decoder(*audio_format), PCMRingBuffer(), (main.streaming_transcriber() if partials else None)
+
+    audio_format = ("pcm", 16000, 1)
+    decoder, buffer, transcriber = await new_turn()
+    in_flight = None   # at most one partial decode per socket
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+
+            if message.get("bytes") is not None:
+                samples = await _decode(decoder.feed, message["bytes"])
+                buffer.write(samples)
+                if transcriber is not None and transcriber.append(samples):
+                    if in_flight is None or in_flight.done():
+                        in_flight = asyncio.create_task(send_partial(transcriber))
+                continue
+
+            control = json.loads(message.get("text") or "{}")
+            if "format" in control:
+                audio_format = (control["format"], control.get("sample_rate", 16000), control.get("channels", 1))
+                decoder, buffer, transcriber = await new_turn()
+            elif control.get("event") == "end":
+                samples = await _decode(decoder.close)
+                buffer.write(samples)
+                with tracer.trace("/ws/agent") as trace:
+                    async with gate:
+                        if len(buffer) == 0:
+                            await websocket.send_json({"bot_text": "I didn't hear anything.", "type": None, "items": [], "user_text": "", "trace_id": trace.trace_id})
+                        else:
+                            if transcriber is None:
+                                user_text = await main.transcribe_async(buffer.read())
+                            else:
+                                # Most words are already committed, so only the last stretch is decoded here
+                                transcriber.append(samples)
+                                with tracer.span("asr", mode="finalize"):
+                                    if in_flight is not None:
+                                        await in_flight
+                                    user_text = await loop.run_in_executor(asr_executor, transcriber.finalize)
+
+                            if stream:
+                                async for event in _stream_turn(user_text, session_id, customer_id, speak=False):
+                                    await websocket.send_json(event)
+                            else:
+                                await websocket.send_json(await _reply(user_text, session_id, customer_id))
+                decoder, buffer, transcriber = await new_turn()
+    except WebSocketDisconnect:
+        pass
+    except ValueError as e:
+        await websocket.close(code=1003, reason=str(e))
+    except HTTPException as e:
+        await websocket.close(code=1013, reason=e.detail)
+    except PermissionError as e:
+        await websocket.close(code=1008, reason=str(e))
+    finally:
+        await _decode(decoder.abort)
@@ -0,0 +1,101 @@
+import time
+import threading
+from collections import OrderedDict
+
+
+class Session:
+    """One customer conversation: its own chat history and privacy scope."""
+
+    def __init__(self, session_id, customer_id, chat):
+        self.session_id = session_id
+        self.customer_id = customer_id
+        self.chat = chat
+        self.last_used = time.monotonic()
+        # Set once a customer-scoped tool answered in this chat; its later turns may draw on it
+        self.private_context = False
+        # A session handles one turn at a time (chat history is not thread-safe)
+        self.lock = threading.Lock()
+
+
+class SessionManager:
+    """
+    Session store keyed by session ID.
+    - LRU eviction once max_sessions is reached
+    - idle sessions expire after idle_ttl seconds
+    - each chat history is trimmed to max_history messages (bounded memory per session),
+      or compacted by `context` (a ContextBudget) when one is given
+    - a session is pinned to the customer that opened it: presenting its ID with another
+      customer_id raises PermissionError, and so does reset() by anyone but its owner.
+      customer_id itself is trusted input, so authenticate it before it reaches here.
+    """
+
+    def __init__(self, chat_factory, max_sessions=5000, idle_ttl=1800, max_history=40, context=None):
+        self.chat_factory = chat_factory  # customer_id -> new chat session
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.max_history = max_history
+        self.context = context
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id, customer_id):
+        """Returns the live session (creating it if needed) and marks it most recently used."""
+        now = time.monotonic()
+        with self._lock:
+            self._evict_expired(now)
+            session = self._sessions.get(session_id)
+            if session is not None and session.customer_id != customer_id:
+                # Never share context, and don't let another caller wipe it either
+                raise PermissionError(f"Session '{session_id}' belongs to another customer.")
+            if session is None:
+                session = Session(session_id, customer_id, self.chat_factory(customer_id))
+                self._sessions[session_id] = session
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            else:
+                self._sessions.move_to_end(session_id)
+            session.last_used = now
+            return session
+
+    def reset(self, session_id, customer_id):
+        """Drops the session; only the customer it is pinned to may (PermissionError otherwise)."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return False
+            if session.customer_id != customer_id:
+                raise PermissionError(f"Session '{session_id}' belongs to another customer.")
+            del self._sessions[session_id]
+            return True
+
+    def trim(self, session):
+        """Compacts the history (if a context budget is set), then drops the oldest messages over max_history."""
+        history = session.chat.history
+        if self.context is not None:
+            history = self.context.compact(history)
+            if history is not session.chat.history:
+                session.chat.history = history
+        if len(history) <= self.max_history:
+            return
+        cut = len(history) - self.max_history
+        # Start the kept window on a user text turn so tool call/response pairs stay intact
+        while cut < len(history) and not _is_user_text(history[cut]):
+            cut += 1
+        session.chat.history = history[cut:]
+
+    def _evict_expired(self, now):
+        # OrderedDict is in LRU order, so expired sessions are at the front
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session.last_used < self.idle_ttl:
+                break
+            del self._sessions[session_id]
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+def _is_user_text(content):
+    if content.role != "user":
+        return False
+    return any(getattr(part, "text", None) for part in content.parts)
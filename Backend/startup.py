@@ -0,0 +1,139 @@
+import time
+import threading
+from concurrent.futures import Future
+
+_RAISE = object()
+
+
+class Resource:
+    def __init__(self, name, loader, lazy):
+        self.name = name
+        self.loader = loader
+        self.lazy = lazy
+        self.state = "pending"     # pending -> loading -> ready | failed
+        self.future = Future()
+        self.error = None
+        self.started = None
+        self.finished = None
+
+
+class Startup:
+    """
+    Orchestrates the heavy, import-time-free loads (Whisper, embedding model, orders, indexes).
+    - register(): main.py / ai.py declare each resource and its loader
+    - start(): every eager resource loads on its own background thread, concurrently
+    - get(): returns the value, waiting if it is still loading; a lazy (or not yet started)
+      resource is loaded on the caller's thread on first use. Loaders may get() their
+      dependencies, so ordering falls out of the calls.
+    - report(): per-resource state and timings, for /ready
+    - recover(): a failed resource that was fixed later (e.g. a hot reload) becomes ready
+    """
+
+    def __init__(self):
+        self._resources = {}
+        self._lock = threading.Lock()
+        self._created = time.perf_counter()
+        self._started = None
+        self._announced = False
+
+    def register(self, name, loader, lazy=False):
+        self._resources[name] = Resource(name, loader, lazy)
+
+    def start(self):
+        """Kick off the eager resources (idempotent)."""
+        with self._lock:
+            if self._started is not None:
+                return
+            self._started = time.perf_counter()
+        for res in list(self._resources.values()):
+            if not res.lazy:
+                threading.Thread(target=self._load, args=(res,), daemon=True, name=f"load-{res.name}").start()
+
+    def get(self, name, default=_RAISE, timeout=None):
+        res = self._resources[name]
+        if res.state == "pending":
+            self._load(res)
+        try:
+            return res.future.result(timeout)
+        except Exception:
+            if default is _RAISE or res.state != "failed":
+                raise
+            return default
+
+    def peek(self, name):
+        """Value if already loaded, else None (never waits or triggers a load; safe on the event loop)."""
+        res = self._resources[name]
+        return res.future.result() if res.state == "ready" else None
+
+    def recover(self, name, value):
+        """Marks a failed resource ready with `value`; no-op in any other state."""
+        res = self._resources[name]
+        with self._lock:
+            if res.state != "failed":
+                return False
+            res.future = Future()
+            res.future.set_result(value)
+            res.error = None
+            res.state = "ready"
+        print(f"   ✅ {res.name} recovered")
+        return True
+
+    def _load(self, res):
+        with self._lock:
+            if res.state != "pending":
+                return
+            res.state = "loading"
+        res.started = time.perf_counter()
+        try:
+            value = res.loader()
+        except Exception as e:
+            res.finished = time.perf_counter()
+            res.error = f"{type(e).__name__}: {e}"
+            res.state = "failed"
+            print(f"⚠️ {res.name} failed to load after {res.finished - res.started:.2f}s: {res.error}")
+            res.future.set_exception(e)
+        else:
+            res.finished = time.perf_counter()
+            res.state = "ready"
+            print(f"   ✅ {res.name} loaded in {res.finished - res.started:.2f}s")
+            res.future.set_result(value)
+        self._announce()
+
+    def _announce(self):
+        eager = [r for r in self._resources.values() if not r.lazy]
+        with self._lock:
+            if self._announced or self._started is None or any(r.finished is None for r in eager):
+                return
+            self._announced = True
+        wall = max(r.finished for r in eager) - self._started
+        serial = sum(r.finished - r.started for r in eager)
+        failed = [r.name for r in eager if r.state == "failed"]
+        status = f"with failures: {', '.join(failed)}" if failed else "System Ready"
+        print(f"✅ Startup {status} in {wall:.2f}s (serial load time {serial:.2f}s)")
+
+    # --- READINESS ---
+    def ready(self):
+        return all(r.state == "ready" for r in self._resources.values() if not r.lazy)
+
+    def report(self):
+        def ms(t, since):
+            return round((t - since) * 1000, 1) if t is not None and since is not None else None
+
+        origin = self._started or self._created
+        return {
+            "ready": self.ready(),
+            "resources": {
+                r.name: {
+                    "state": r.state,
+                    "lazy": r.lazy,
+                    "started_at_ms": ms(r.started, origin),
+                    "load_ms": ms(r.finished, r.started),
+                    "error": r.error,
+                }
+                for r in self._resources.values()
+            },
+        }
+
+
+# Process-wide orchestrator shared by main.py, ai.py and server.py
+startup = Startup()
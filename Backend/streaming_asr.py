@@ -0,0 +1,100 @@
+import re
+import threading
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+
+def _norm(word):
+    return re.sub(r"[^\w']", "", word.lower())
+
+
+class StreamingTranscriber:
+    """
+    Incremental Whisper over a growing utterance (local-agreement policy).
+    - every `step_s` of new audio, the uncommitted tail is re-decoded (greedy, fast)
+    - words that two consecutive hypotheses agree on are committed and their audio is dropped,
+      so each pass only decodes the part that is still changing
+    - finalize() decodes the short remaining tail with the full beam
+
+    append() is safe to call while a decode runs on another thread; run one decode at a time.
+    """
+
+    def __init__(self, model, step_s=0.5, max_tail_s=15.0, partial_beam_size=1, final_beam_size=5):
+        self.model = model
+        self.step = int(step_s * SAMPLE_RATE)
+        self.max_tail = int(max_tail_s * SAMPLE_RATE)
+        self.partial_beam_size = partial_beam_size
+        self.final_beam_size = final_beam_size
+
+        self._tail = np.zeros(0, dtype=np.int16)   # audio not yet covered by committed words
+        self._since_decode = 0
+        self._committed = []                       # committed words (with leading spaces, as Whisper emits)
+        self._previous = []                        # last hypothesis for the tail: [(start, end, word)]
+        self._lock = threading.Lock()
+
+    @property
+    def committed_text(self):
+        return "".join(self._committed).strip()
+
+    def append(self, samples):
+        """Adds audio. Returns True when enough new audio arrived for another partial decode."""
+        with self._lock:
+            self._tail = np.concatenate((self._tail, samples))
+            self._since_decode += len(samples)
+            return self._since_decode >= self.step
+
+    def partial(self):
+        """Re-decodes the tail and returns {"stable": committed text, "partial": unconfirmed words}."""
+        with self._lock:
+            audio = self._tail
+            self._since_decode = 0
+        words = self._decode(audio, self.partial_beam_size)
+
+        with self._lock:
+            return self._commit(words, len(audio))
+
+    def _commit(self, words, decoded_len):
+        # Commit the prefix this hypothesis shares with the previous one
+        agreed = 0
+        for (_, _, a), (_, _, b) in zip(words, self._previous):
+            if _norm(a) != _norm(b):
+                break
+            agreed += 1
+        # Tail too long to keep re-decoding: trust everything but the last word
+        if decoded_len > self.max_tail:
+            agreed = max(agreed, len(words) - 1)
+
+        if agreed:
+            self._committed.extend(w for _, _, w in words[:agreed])
+            # Audio appended during the decode sits after `decoded_len`, so this cut is still valid
+            cut = int(words[agreed - 1][1] * SAMPLE_RATE)
+            self._tail = self._tail[cut:]
+            words = [(s - words[agreed - 1][1], e - words[agreed - 1][1], w) for s, e, w in words[agreed:]]
+        self._previous = words
+
+        return {"stable": self.committed_text, "partial": "".join(w for _, _, w in words).strip()}
+
+    def finalize(self):
+        """Final transcript: committed words + a full-beam decode of what's left."""
+        with self._lock:
+            audio = self._tail
+        words = self._decode(audio, self.final_beam_size)
+        with self._lock:
+            self._committed.extend(w for _, _, w in words)
+            self._tail = np.zeros(0, dtype=np.int16)
+            self._previous = []
+            return self.committed_text
+
+    def _decode(self, audio, beam_size):
+        if len(audio) < SAMPLE_RATE // 10:
+            return []
+        segments, _ = self.model.transcribe(
+            audio.astype(np.float32) / 32768.0,
+            beam_size=beam_size,
+            word_timestamps=True,
+            condition_on_previous_text=False,
+            # Committed words give Whisper the left context it no longer sees in the audio
+            initial_prompt=self.committed_text[-200:] or None,
+        )
+        return [(w.start, w.end, w.word) for seg in segments for w in (seg.words or [])]
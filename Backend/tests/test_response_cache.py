@@ -0,0 +1,66 @@
+import os
+
+import numpy as np
+import pytest
+
+os.environ["FAKE_LLM"] = "1"
+os.environ["RESOURCE_WATCH_S"] = "0"
+ai = pytest.importorskip("ai")
+from google.generativeai import protos
+from semantic_cache import SemanticCache
+
+
+def embed(text):
+    """Bag of characters: identical questions match, different ones don't."""
+    vector = np.zeros(128, dtype=np.float32)
+    for c in text.lower():
+        vector[ord(c) % 128] += 1
+    return vector
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = SemanticCache(embed, threshold=0.99)
+    monkeypatch.setattr(ai, "response_cache", cache)
+    return cache
+
+
+def tool_turn(session, user_text, tool, result, bot_text):
+    """Appends one automatic-function-calling exchange and offers it to the cache."""
+    start = len(session.chat.history)
+    session.chat.history = [
+        *session.chat.history,
+        protos.Content(role="user", parts=[protos.Part(text=user_text)]),
+        protos.Content(role="model", parts=[protos.Part(function_call=protos.FunctionCall(name=tool, args={}))]),
+        protos.Content(role="user", parts=[protos.Part(
+            function_response=protos.FunctionResponse(name=tool, response={"result": result}))]),
+        protos.Content(role="model", parts=[protos.Part(text=bot_text)]),
+    ]
+    ai._remember_turn(session, start, user_text, {"bot_text": bot_text, "type": None, "items": []}, version=1)
+
+
+def lookup_as(session_id, customer_id, user_text):
+    session = ai.sessions.get(session_id, customer_id)
+    return ai._cached_turn(session.chat, user_text, version=1)
+
+
+def test_public_answer_is_shared(cache):
+    a = ai.sessions.get("cache-public-a", "C0001")
+    tool_turn(a, "how long do refunds take", "get_policy_info", "Refunds take 5-7 days.", "Refunds take 5 to 7 days.")
+    assert lookup_as("cache-public-b", "C0002", "how long do refunds take")["bot_text"] == "Refunds take 5 to 7 days."
+
+
+def test_answer_after_private_history_never_reaches_another_customer(cache):
+    a = ai.sessions.get("cache-private-a", "C0001")
+    tool_turn(a, "status of O0035", "check_order_status", '[{"order_id": "O0035"}]', "It has shipped.")
+    # Public tool, but the model can lean on the order it just saw
+    tool_turn(a, "can I still return it", "get_policy_info", "Returns within 30 days.", "Yes, you have until next week.")
+    assert lookup_as("cache-private-b", "C0002", "can I still return it") is None
+
+
+def test_answer_naming_an_order_is_not_cached(cache):
+    a = ai.sessions.get("cache-id-a", "C0001")
+    tool_turn(a, "what is the return window", "get_policy_info", "Returns within 30 days.",
+              "Your order O0035 can be returned within 30 days, C0001.")
+    assert lookup_as("cache-id-b", "C0002", "what is the return window") is None
+    assert cache.metrics()["stores"] == 0
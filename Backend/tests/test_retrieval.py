@@ -0,0 +1,30 @@
+from langchain_core.documents import Document
+
+from retrieval import BM25Index, HybridRetriever, reciprocal_rank_fusion
+
+
+def product(name, description):
+    return Document(page_content=f"Product: {name}\nDescription: {description}", metadata={"product_name": name})
+
+
+def test_duplicate_key_counts_once_per_ranking():
+    key = lambda doc: doc.metadata["product_name"]
+    exact = product("Aero Earbuds Pro", "")
+    dupes = [product("Nova Speaker Pro", str(i)) for i in range(4)]
+    fused = reciprocal_rank_fusion([[exact, *dupes], [exact, dupes[0]]], key)
+    assert [key(d) for d in fused] == ["Aero Earbuds Pro", "Nova Speaker Pro"]
+
+
+def test_exact_name_wins_over_duplicated_names():
+    # Several catalog rows share a name, as in the shipped catalog
+    catalog = [product("Aero Earbuds Pro", "wireless earbuds with noise cancelling")]
+    for i in range(5):
+        catalog += [
+            product("Nova Speaker Pro", f"portable pro speaker edition {i}"),
+            product("Zenith Headset Pro", f"pro headset edition {i}"),
+        ]
+    retriever = HybridRetriever(None, BM25Index.from_documents(catalog), key=lambda doc: doc.metadata["product_name"])
+    fuzzy = [product("Aero Earbuds Pro", ""), product("Nova Speaker Pro", ""), product("Zenith Headset Pro", "")]
+
+    results = retriever.search("Aero Earbuds Pro", k=3, extra_rankings=[fuzzy])
+    assert results[0].metadata["product_name"] == "Aero Earbuds Pro"
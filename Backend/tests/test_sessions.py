@@ -0,0 +1,35 @@
+import pytest
+
+from sessions import SessionManager
+
+
+class Chat:
+    def __init__(self):
+        self.history = []
+
+
+@pytest.fixture
+def sessions():
+    return SessionManager(lambda customer_id: Chat())
+
+
+def test_session_is_pinned_to_its_customer(sessions):
+    sessions.get("s1", "C0001")
+    with pytest.raises(PermissionError):
+        sessions.get("s1", "C0002")
+
+
+def test_reset_by_another_customer_is_refused(sessions):
+    session = sessions.get("s1", "C0001")
+    session.chat.history.append("private turn")
+    with pytest.raises(PermissionError):
+        sessions.reset("s1", "C0002")
+    assert sessions.get("s1", "C0001") is session
+    assert session.chat.history == ["private turn"]
+
+
+def test_owner_can_reset(sessions):
+    first = sessions.get("s1", "C0001")
+    assert sessions.reset("s1", "C0001") is True
+    assert sessions.get("s1", "C0001") is not first
+    assert sessions.reset("missing", "C0001") is False
@@ -0,0 +1,130 @@
+import json
+import time
+import inspect
+import functools
+import threading
+from collections import OrderedDict
+
+_MISS = object()
+
+
+class ToolCache:
+    """
+    Memoizes read-only agent tools.
+    - key: tool name + bound arguments (defaults applied) + scope()
+      (customer id for personal tools, catalog version for public ones)
+    - every entry carries tags (e.g. ("order", "O0042"), ("customer", "C0010"));
+      invalidate(*tags) drops exactly the entries that depend on them
+    - a result computed while one of its tags was invalidated is not stored, so a
+      read racing a mutation can't put the pre-mutation answer back; invalidation
+      counts are only kept for tags with a read in flight
+    - results rejected by cacheable(result) (errors, "unavailable") are never stored
+    - bounded LRU with a TTL as a safety net
+    """
+
+    def __init__(self, max_entries=4096, ttl_s=600, cacheable=lambda result: True):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.cacheable = cacheable
+        self._entries = OrderedDict()   # key -> (result, tags, cost_s, expires_at)
+        self._by_tag = {}               # tag -> keys
+        self._inflight = {}             # tag -> [invalidation count, reads in flight]
+        self._lock = threading.Lock()
+        self._stats = {}                # tool -> counters
+
+    def wrap(self, fn, scope=lambda: None, tags=lambda args, scope: ()):
+        """Cached version of `fn` (same name, docstring and signature, so the LLM sees the same tool)."""
+        name = fn.__name__
+        signature = inspect.signature(fn)
+        self._stats.setdefault(name, {"hits": 0, "misses": 0, "invalidated": 0, "saved_ms": 0.0})
+
+        @functools.wraps(fn)
+        def cached(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = dict(bound.arguments)
+            tool_scope = scope()
+            key = (name, json.dumps(arguments, sort_keys=True, default=str), tool_scope)
+
+            result = self._get(name, key)
+            if result is not _MISS:
+                return result
+
+            entry_tags = tuple(tags(arguments, tool_scope))
+            with self._lock:
+                generations = [self._begin_read(t) for t in entry_tags]
+            try:
+                start = time.perf_counter()
+                result = fn(*args, **kwargs)
+                if self.cacheable(result):
+                    self._put(name, key, result, entry_tags, generations, time.perf_counter() - start)
+            finally:
+                with self._lock:
+                    for tag in entry_tags:
+                        self._end_read(tag)
+            return result
+
+        return cached
+
+    # --- ENTRIES ---
+    def _get(self, name, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            stats = self._stats[name]
+            if entry is None or entry[3] < time.monotonic():
+                if entry is not None:
+                    self._drop(key)
+                stats["misses"] += 1
+                return _MISS
+            self._entries.move_to_end(key)
+            stats["hits"] += 1
+            stats["saved_ms"] += entry[2] * 1000
+            return entry[0]
+
+    def _begin_read(self, tag):
+        state = self._inflight.setdefault(tag, [0, 0])
+        state[1] += 1
+        return state[0]
+
+    def _end_read(self, tag):
+        state = self._inflight[tag]
+        state[1] -= 1
+        if state[1] == 0:
+            del self._inflight[tag]   # nobody left to compare against: forget the count
+
+    def _put(self, name, key, result, tags, generations, cost_s):
+        with self._lock:
+            if any(self._inflight[t][0] != g for t, g in zip(tags, generations)):
+                return   # invalidated while we were computing it
+            self._entries[key] = (result, tags, cost_s, time.monotonic() + self.ttl_s)
+            for tag in tags:
+                self._by_tag.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, key):
+        _, tags, _, _ = self._entries.pop(key)
+        for tag in tags:
+            keys = self._by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_tag[tag]
+
+    def invalidate(self, *tags):
+        with self._lock:
+            for tag in tags:
+                if tag in self._inflight:
+                    self._inflight[tag][0] += 1
+                for key in list(self._by_tag.get(tag, ())):
+                    self._drop(key)
+                    self._stats[key[0]]["invalidated"] += 1
+
+    # --- METRICS ---
+    def metrics(self):
+        with self._lock:
+            tools = {}
+            for name, s in self._stats.items():
+                lookups = s["hits"] + s["misses"]
+                tools[name] = {**s, "saved_ms": round(s["saved_ms"], 1), "hit_rate": s["hits"] / lookups if lookups else 0.0}
+            return {"entries": len(self._entries), "tracked_tags": len(self._inflight), "tools": tools}
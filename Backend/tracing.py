@@ -0,0 +1,239 @@
+import os
+import time
+import uuid
+import bisect
+import functools
+import threading
+import contextvars
+from collections import OrderedDict
+
+# Latency buckets (seconds): 5 ms .. 30 s covers a cache hit up to a slow ASR + LLM turn
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_current = contextvars.ContextVar("trace", default=None)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram in the Prometheus sense (le = upper bound)."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)   # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+
+class Trace:
+    """One request: an id handed back to the client plus the spans recorded under it."""
+
+    def __init__(self, name, trace_id=None):
+        self.trace_id = trace_id or uuid.uuid4().hex[:16]
+        self.name = name
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.duration_ms = None
+        self.spans = []
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "spans": sorted(self.spans, key=lambda span: span["start_ms"]),
+        }
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "labels", "start")
+
+    def __init__(self, tracer, name, labels):
+        self.tracer = tracer
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.tracer._finish(self, time.perf_counter() - self.start, exc_type is not None)
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+class _TraceScope:
+    def __init__(self, tracer, trace):
+        self.tracer = tracer
+        self.trace = trace
+
+    def __enter__(self):
+        self._previous = _current.get()
+        _current.set(self.trace)
+        return self.trace
+
+    def __exit__(self, exc_type, exc, tb):
+        # set() rather than reset(token): async generators may close from another context
+        _current.set(self._previous)
+        self.tracer._end_trace(self.trace, exc_type is not None)
+        return False
+
+
+class Tracer:
+    """
+    Per-request latency tracing.
+    - trace(name) opens a request; the Trace (and its trace_id) is visible to every span
+      in the same context, and to executor threads through bind()
+    - span(stage, **labels) times one stage into a histogram and onto the current trace
+    - traced(fn) wraps a function (the agent tools) in a span named after it
+    - render() is the Prometheus text exposition of every histogram
+    Disabled, span() returns a shared no-op and traced() returns fn itself, so the cost is
+    one attribute check per stage.
+    """
+
+    def __init__(self, enabled=True, buckets=DEFAULT_BUCKETS, max_traces=500, prefix="stockai"):
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self.max_traces = max_traces
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._histograms = {}            # (metric, labels) -> Histogram
+        self._errors = {}                # (metric, labels) -> count
+        self._traces = OrderedDict()     # trace_id -> Trace (most recent max_traces)
+
+    # --- RECORDING ---
+    def trace(self, name, trace_id=None):
+        return _TraceScope(self, Trace(name, trace_id))
+
+    def span(self, name, **labels):
+        if not self.enabled:
+            return _NOOP
+        return _Span(self, name, labels)
+
+    def traced(self, fn, name=None, stage="tool"):
+        if not self.enabled:
+            return fn
+        label = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _Span(self, stage, {stage: label}):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    def bind(self, fn):
+        """fn running under the caller's trace, for run_in_executor (which doesn't copy contextvars)."""
+        trace = _current.get()
+        if trace is None:
+            return fn
+
+        @functools.wraps(fn)
+        def bound(*args, **kwargs):
+            previous = _current.get()
+            _current.set(trace)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _current.set(previous)
+
+        return bound
+
+    def current_trace_id(self):
+        trace = _current.get()
+        return trace.trace_id if trace is not None else None
+
+    def _finish(self, span, seconds, failed):
+        key = ("span_seconds", (("span", span.name),) + tuple(sorted(span.labels.items())))
+        trace = _current.get()
+        with self._lock:
+            self._observe(key, seconds, failed)
+            if trace is not None:
+                trace.spans.append({
+                    "span": span.name,
+                    **span.labels,
+                    "start_ms": round((span.start - trace.start) * 1000, 2),
+                    "duration_ms": round(seconds * 1000, 2),
+                    "error": failed,
+                })
+
+    def _end_trace(self, trace, failed):
+        seconds = time.perf_counter() - trace.start
+        trace.duration_ms = round(seconds * 1000, 2)
+        if not self.enabled:
+            return
+        with self._lock:
+            self._observe(("request_seconds", (("endpoint", trace.name),)), seconds, failed)
+            self._traces[trace.trace_id] = trace
+            while len(self._traces) > self.max_traces:
+                self._traces.popitem(last=False)
+
+    def _observe(self, key, seconds, failed):
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = Histogram(self.buckets)
+        histogram.observe(seconds)
+        if failed:
+            self._errors[key] = self._errors.get(key, 0) + 1
+
+    # --- READING ---
+    def get(self, trace_id):
+        with self._lock:
+            trace = self._traces.get(trace_id)
+            return trace.to_dict() if trace is not None else None
+
+    def render(self):
+        """Prometheus text format (version 0.0.4)."""
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            errors = sorted(self._errors.items())
+        lines = []
+        for metric in sorted({metric for (metric, _), _ in histograms}):
+            name = f"{self.prefix}_{metric}"
+            lines.append(f"# TYPE {name} histogram")
+            for (m, labels), histogram in histograms:
+                if m != metric:
+                    continue
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), histogram.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labels)} {histogram.sum:.6f}")
+                lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+        if errors:
+            name = f"{self.prefix}_errors_total"
+            lines.append(f"# TYPE {name} counter")
+            for (metric, labels), count in errors:
+                lines.append(f"{name}{_labels((('metric', metric),) + labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(pairs):
+    if not pairs:
+        return ""
+    escaped = (
+        k + '="' + str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for k, v in pairs
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+tracer = Tracer(enabled=os.getenv("TRACING", "1") != "0")
@@ -0,0 +1,215 @@
+import io
+import re
+import abc
+import time
+import wave
+import asyncio
+import threading
+
+import numpy as np
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+# --- 1. SENTENCE SPLITTING ---
+class SentenceChunker:
+    """Collects streamed text and hands out complete sentences as soon as they end."""
+
+    def __init__(self):
+        self._pending = ""
+
+    def feed(self, text):
+        self._pending += text
+        parts = SENTENCE_END.split(self._pending)
+        self._pending = parts.pop()
+        return [p.strip() for p in parts if p.strip()]
+
+    def flush(self):
+        rest, self._pending = self._pending.strip(), ""
+        return [rest] if rest else []
+
+
+def split_sentences(text):
+    chunker = SentenceChunker()
+    return chunker.feed(text) + chunker.flush()
+
+
+# --- 2. BACKENDS (text -> audio bytes, streamed in memory) ---
+class TTSBackend(abc.ABC):
+    """Synthesizes one sentence. stream() yields audio byte chunks as they are produced."""
+    audio_format = "mp3"
+
+    @abc.abstractmethod
+    async def stream(self, text):
+        raise NotImplementedError
+        yield b""
+
+
+class EdgeTTSBackend(TTSBackend):
+    """Microsoft Edge neural voices (network)."""
+    audio_format = "mp3"
+
+    def __init__(self, voice="en-US-AriaNeural"):
+        self.voice = voice
+
+    async def stream(self, text):
+        import edge_tts
+        async for chunk in edge_tts.Communicate(text, self.voice).stream():
+            if chunk["type"] == "audio":
+                yield chunk["data"]
+
+
+class StubTTSBackend(TTSBackend):
+    """
+    Offline stand-in: WAV whose length follows the text, after a fake synthesis delay.
+    Lets time-to-first-audio be measured without network or speakers. Silent by default;
+    voiced=True renders a speech-like buzz per word (harmonics + syllable envelope, gaps at
+    spaces) so VAD/endpointing benchmarks have something to detect.
+    """
+    audio_format = "wav"
+
+    def __init__(self, first_chunk_s=0.15, per_char_s=0.004, speech_s_per_char=0.06, sample_rate=16000,
+                 voiced=False):
+        self.first_chunk_s = first_chunk_s
+        self.per_char_s = per_char_s
+        self.speech_s_per_char = speech_s_per_char
+        self.sample_rate = sample_rate
+        self.voiced = voiced
+
+    def pcm(self, text):
+        """int16 mono samples for `text`."""
+        per_char = int(self.sample_rate * self.speech_s_per_char)
+        if not self.voiced:
+            return np.zeros(per_char * len(text), dtype=np.int16)
+        t = np.arange(per_char * len(text)) / self.sample_rate
+        pitch = 130 + 15 * np.sin(2 * np.pi * 0.7 * t)
+        phase = 2 * np.pi * np.cumsum(pitch) / self.sample_rate
+        buzz = sum(np.sin(k * phase) / k for k in range(1, 8))
+        # On for letters, off for spaces/punctuation, with 10 ms ramps and ~4 syllables/s
+        gate = np.repeat([1.0 if c.isalnum() else 0.0 for c in text], per_char)
+        ramp = max(1, int(self.sample_rate * 0.01))
+        gate = np.convolve(gate, np.ones(ramp) / ramp, mode="same")
+        envelope = gate * (0.5 + 0.5 * np.sin(2 * np.pi * 4 * t) ** 2)
+        return (0.25 * 32767 * envelope * buzz / 2.6).astype(np.int16)
+
+    async def stream(self, text):
+        await asyncio.sleep(self.first_chunk_s)
+        buf = io.BytesIO()
+        with wave.open(buf, "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(self.sample_rate)
+            w.writeframes(self.pcm(text).astype("<i2").tobytes())
+        data = buf.getvalue()
+        half = len(data) // 2
+        yield data[:half]
+        await asyncio.sleep(self.per_char_s * len(text))
+        yield data[half:]
+
+
+# --- 3. PLAYERS ---
+class MixerPlayer:
+    """pygame playback from memory. The mixer is initialized once and reused across turns."""
+
+    def __init__(self):
+        import pygame
+        self._pygame = pygame
+        self._init_lock = threading.Lock()
+
+    def play(self, data, audio_format):
+        pygame = self._pygame
+        with self._init_lock:
+            if not pygame.mixer.get_init():
+                pygame.mixer.init()
+        pygame.mixer.music.load(io.BytesIO(data), audio_format)
+        pygame.mixer.music.play()
+        clock = pygame.time.Clock()
+        while pygame.mixer.music.get_busy():
+            clock.tick(20)
+
+
+class NullPlayer:
+    """Silent sink: records when audio would have started (benchmarks / headless servers)."""
+
+    def __init__(self):
+        self.started_at = []
+
+    def play(self, data, audio_format):
+        self.started_at.append(time.perf_counter())
+
+
+# --- 4. PIPELINE ---
+class SpeechPipeline:
+    """
+    Sentence-level pipelining: sentence N+1 is synthesized while sentence N plays,
+    so the first audio starts after one sentence instead of the whole reply.
+    Utterances are serialized (one speaker), so overlapping speak() calls never interleave.
+    """
+
+    def __init__(self, backend, player, lookahead=2):
+        self.backend = backend
+        self.player = player
+        self.lookahead = lookahead
+        self._speaker = threading.Lock()
+
+    async def speak(self, text):
+        async def one_chunk():
+            yield text
+        await self.speak_stream(one_chunk())
+
+    async def speak_stream(self, text_chunks):
+        """Speaks an async stream of text deltas (e.g. LLM tokens) sentence by sentence."""
+        ready = asyncio.Queue(maxsize=self.lookahead)
+
+        async def synthesize():
+            chunker = SentenceChunker()
+            try:
+                async for delta in text_chunks:
+                    for sentence in chunker.feed(delta):
+                        await ready.put(await self._synthesize(sentence))
+                for sentence in chunker.flush():
+                    await ready.put(await self._synthesize(sentence))
+            except Exception:
+                await ready.put(None)   # wake the speaker; the error surfaces from `await producer`
+                raise
+            await ready.put(None)
+
+        # The acquiring thread can't be interrupted, so a cancelled speak_stream marks the
+        # turn abandoned and whichever side ends up holding the lock releases it
+        guard = threading.Lock()
+        state = {"held": False, "abandoned": False}
+
+        def acquire():
+            self._speaker.acquire()
+            with guard:
+                if state["abandoned"]:
+                    self._speaker.release()
+                else:
+                    state["held"] = True
+
+        producer = asyncio.create_task(synthesize())
+        try:
+            await asyncio.to_thread(acquire)
+            while True:
+                audio = await ready.get()
+                if audio is None:
+                    break
+                await asyncio.to_thread(self.player.play, audio, self.backend.audio_format)
+            await producer
+        finally:
+            with guard:
+                state["abandoned"] = True
+                if state["held"]:
+                    self._speaker.release()
+            if not producer.done():
+                producer.cancel()
+                await asyncio.gather(producer, return_exceptions=True)
+
+    async def _synthesize(self, sentence):
+        return b"".join([chunk async for chunk in self.backend.stream(sentence)])
+
+
+def make_backend(name):
+    if name == "stub":
+        return StubTTSBackend()
+    return EdgeTTSBackend()
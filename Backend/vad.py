@@ -0,0 +1,104 @@
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+
+def frame_features(audio, frame_len):
+    """
+    Per-frame energy (dBFS) and spectral flatness, vectorized over the whole block.
+    Speech has high energy and a peaky spectrum (low flatness); hiss/hum is flat.
+    """
+    n_frames = len(audio) // frame_len
+    if n_frames == 0:
+        return np.zeros(0), np.zeros(0)
+    frames = audio[:n_frames * frame_len].astype(np.float32).reshape(n_frames, frame_len) / 32768.0
+
+    rms = np.sqrt(np.mean(frames ** 2, axis=1) + 1e-12)
+    energy_db = 20 * np.log10(rms)
+
+    power = np.abs(np.fft.rfft(frames * np.hanning(frame_len), axis=1)) ** 2 + 1e-12
+    flatness = np.exp(np.mean(np.log(power), axis=1)) / np.mean(power, axis=1)
+    return energy_db, flatness
+
+
+class EnergyVAD:
+    """
+    Streaming endpointer for int16 mono audio.
+    - process(block): feed mic blocks as they arrive; returns True once the utterance has ended
+      (speech seen, then `trailing_silence_ms` of non-speech)
+    - trim(audio): cut leading/trailing silence from a finished clip before Whisper
+    The noise floor adapts on non-speech frames, so it works on quiet and noisy mics.
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE, frame_ms=30, margin_db=12.0, min_energy_db=-55.0,
+                 max_flatness=0.45, trailing_silence_ms=700, min_speech_ms=150, pad_ms=200):
+        self.sample_rate = sample_rate
+        self.frame_len = int(sample_rate * frame_ms / 1000)
+        self.frame_ms = frame_ms
+        self.margin_db = margin_db
+        self.min_energy_db = min_energy_db
+        self.max_flatness = max_flatness
+        self.trailing_silence_ms = trailing_silence_ms
+        self.min_speech_ms = min_speech_ms
+        self.pad_ms = pad_ms
+        self.reset()
+
+    def reset(self):
+        self._noise_db = None
+        self._carry = np.zeros(0, dtype=np.int16)
+        self.speech_ms = 0
+        self.silence_ms = 0
+        self.ended = False
+
+    @property
+    def speech_started(self):
+        return self.speech_ms >= self.min_speech_ms
+
+    def _is_speech(self, energy_db, flatness):
+        if self._noise_db is None:
+            # Assume the first frames are room noise
+            self._noise_db = max(float(np.median(energy_db)), self.min_energy_db - self.margin_db)
+        threshold = max(self._noise_db + self.margin_db, self.min_energy_db)
+        return (energy_db > threshold) & (flatness < self.max_flatness)
+
+    def process(self, block):
+        if self.ended:
+            return True
+        audio = np.concatenate((self._carry, block))
+        energy_db, flatness = frame_features(audio, self.frame_len)
+        self._carry = audio[len(energy_db) * self.frame_len:]
+        if len(energy_db) == 0:
+            return False
+
+        speech = self._is_speech(energy_db, flatness)
+        if (~speech).any():
+            # Slow EMA toward the current non-speech level
+            self._noise_db = 0.95 * self._noise_db + 0.05 * float(np.mean(energy_db[~speech]))
+
+        for is_speech in speech:
+            if is_speech:
+                self.speech_ms += self.frame_ms
+                self.silence_ms = 0
+            elif self.speech_started:
+                self.silence_ms += self.frame_ms
+                if self.silence_ms >= self.trailing_silence_ms:
+                    self.ended = True
+                    break
+        return self.ended
+
+    def trim(self, audio):
+        """Returns audio cut to the first..last speech frame (plus padding). Unchanged if no speech found."""
+        energy_db, flatness = frame_features(audio, self.frame_len)
+        if len(energy_db) == 0:
+            return audio
+        noise_db = self._noise_db
+        self._noise_db = float(np.percentile(energy_db, 10))
+        speech = np.flatnonzero(self._is_speech(energy_db, flatness))
+        self._noise_db = noise_db
+        if len(speech) == 0:
+            return audio
+
+        pad = int(self.sample_rate * self.pad_ms / 1000)
+        start = max(0, speech[0] * self.frame_len - pad)
+        end = min(len(audio), (speech[-1] + 1) * self.frame_len + pad)
+        return audio[start:end]
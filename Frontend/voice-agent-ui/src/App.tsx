@@ -14,6 +14,10 @@ interface SidebarData {
   items: any[];
 }
 
+// One backend conversation per browser tab (keeps customers' contexts apart)
+const SESSION_ID = crypto.randomUUID();
+// Customer the backend serves this tab as (sessions are pinned to it)
+const CUSTOMER_ID = 'C0010';
 
 function App() {
   const [isListening, setIsListening] = useState<boolean>(false);
@@ -31,7 +35,7 @@ function App() {
   const clearAIContext = async () => {
     try {
       console.log("🚀 Initializing Session: Clearing Backend Context...");
-      await fetch("http://127.0.0.1:8000/reset-chat");
+      await fetch(`http://127.0.0.1:8000/reset-chat?session_id=${SESSION_ID}&customer_id=${CUSTOMER_ID}`);
     } catch (error) {
       console.error("Failed to reset AI context on refresh:", error);
     }
@@ -51,49 +55,70 @@ function App() {
     setMessages(prev => [...prev, { sender, text }]);
   };
 
-  // --- THE BACKEND CONNECTION ---
+  // Append streamed text to the last bot bubble
+  const appendToLastBot = (delta: string) => {
+    setMessages(prev => {
+      const last = prev[prev.length - 1];
+      if (last && last.sender === 'bot') {
+        return [...prev.slice(0, -1), { ...last, text: last.text + delta }];
+      }
+      return [...prev, { sender: 'bot', text: delta }];
+    });
+  };
+
+  // --- THE BACKEND CONNECTION (Server-Sent Events) ---
   const toggleMic = async () => {
     if (isListening) return;
 
     setIsListening(true);
-    
-    try {
-      // 1. Call Python FastAPI Server
-      const response = await fetch("http://127.0.0.1:8000/run-agent");
-      
-      if (!response.ok) {
-        throw new Error(`Server Error: {response.status}`);
-      }
 
-      const data = await response.json();
-      
-      // 2. Display User Transcription
-      if (data.user_text) {
-        addMessage('user', data.user_text);
+    // 1. Python FastAPI Server streams: transcript -> tool -> delta... -> done
+    const source = new EventSource(`http://127.0.0.1:8000/run-agent/stream?session_id=${SESSION_ID}&customer_id=${CUSTOMER_ID}`);
+    let gotText = false;
+
+    const finish = () => {
+      source.close();
+      setIsListening(false);
+    };
+
+    // 2. Display User Transcription
+    source.addEventListener('transcript', (e) => {
+      const data = JSON.parse((e as MessageEvent).data);
+      addMessage('user', data.text || "(Silence)");
+    });
+
+    // 3. Update Results Sidebar as soon as a tool returns orders/products
+    source.addEventListener('tool', (e) => {
+      const data = JSON.parse((e as MessageEvent).data);
+      if (data.type && data.items) {
+        setSidebarData({ type: data.type, items: data.items });
+      }
+    });
+
+    // 4. Display AI Response while it is generated
+    source.addEventListener('delta', (e) => {
+      const data = JSON.parse((e as MessageEvent).data);
+      if (!gotText) {
+        gotText = true;
+        addMessage('bot', data.text);
       } else {
-        addMessage('user', "(Silence)");
+        appendToLastBot(data.text);
       }
+    });
 
-      // 3. Display AI Response
-      if (data.bot_text) {
+    source.addEventListener('done', (e) => {
+      const data = JSON.parse((e as MessageEvent).data);
+      if (!gotText && data.bot_text) {
         addMessage('bot', data.bot_text);
       }
+      finish();
+    });
 
-      // 4. Update Results Sidebar with structured data if present
-      // Expecting backend to return { type: 'orders' | 'products', items: [...] }
-      if (data.type && data.items) {
-        setSidebarData({
-          type: data.type,
-          items: data.items
-        });
-      }
-
-    } catch (error) {
-      console.error("Connection failed:", error);
+    source.onerror = () => {
+      console.error("Connection failed");
       addMessage('bot', "⚠️ Error: Connection to Python Brain failed. Ensure server.py is running.");
-    } finally {
-      setIsListening(false); 
-    }
+      finish();
+    };
   };
 
   return (